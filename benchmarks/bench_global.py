@@ -0,0 +1,57 @@
+"""Compare the grid router with two-level (global, then detailed) routing.
+
+Blocks sit on a large regular array and every net joins an output of one
+block to an input of a block up to six columns to the right and six rows
+up or down, so routes are long and cross many channels. Both backends
+route the same nets, each route becoming wiring for the next; reports
+time, nodes expanded, total wire length and, for the global router, the
+nets whose corridor held no path.
+
+Usage (from the repo root, after `pip install -e .`):
+    python benchmarks/bench_global.py [NETS]
+"""
+
+import random
+import sys
+import time
+
+from vhdl_diagramer.routing import Net, WireMap, get_router
+
+PITCH = 300  # block spacing; blocks are 120 x 200
+SIDE = 24    # blocks per row and column
+REACH = 6    # farthest block a net reaches, in columns and rows
+
+
+def make_problem(nets: int, seed: int = 1):
+    rnd = random.Random(seed)
+    blocks = [(c * PITCH, r * PITCH, 120, 200) for c in range(SIDE) for r in range(SIDE)]
+    result = []
+    for i in range(nets):
+        c, r = rnd.randrange(SIDE), rnd.randrange(SIDE)
+        dc = min(SIDE - 1, c + rnd.randint(0, REACH))
+        dr = min(SIDE - 1, max(0, r + rnd.randint(-REACH, REACH)))
+        sx, sy, sw, _ = blocks[c * SIDE + r]
+        dx, dy, _, _ = blocks[dc * SIDE + dr]
+        result.append(Net((sx + sw, sy + rnd.randrange(1, 10) * 20), (dx, dy + rnd.randrange(1, 10) * 20), i))
+    bounds = (-300, SIDE * PITCH, -300, SIDE * PITCH)
+    return blocks, result, bounds
+
+
+def main():
+    nets = int(sys.argv[1]) if len(sys.argv) > 1 else 800
+    blocks, problem, bounds = make_problem(nets)
+    print(f"{nets} nets, {SIDE * SIDE} blocks")
+    for name in ('grid', 'global'):
+        router = get_router(name, 10)
+        occupancy = router.build_occupancy_grid(blocks, *bounds, margin=10)
+        start = time.perf_counter()
+        routes = router.route(problem, occupancy, WireMap(occupancy), bounds)
+        elapsed = time.perf_counter() - start
+        length = sum(abs(x2 - x1) + abs(y2 - y1) for segments in routes for (x1, y1), (x2, y2) in segments)
+        misses = getattr(router, 'corridor_misses', 0)
+        print(f"{name:<7} {elapsed * 1000:9.1f} ms  {router.expanded:9} nodes"
+              f"  {length:8} px of wire  {misses:4} corridor misses")
+
+
+if __name__ == '__main__':
+    main()
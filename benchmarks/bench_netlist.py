@@ -0,0 +1,79 @@
+"""Compare peak Python memory of VHDLParser and the streaming netlist importer.
+
+Usage (from the repo root, after `pip install -e .`):
+    python benchmarks/bench_netlist.py [INSTANCES]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from vhdl_diagramer.netlist import import_netlist
+from vhdl_diagramer.parser import VHDLParser
+
+CELLS = {
+    'AND2': (['A', 'B'], ['Z']),
+    'OR3': (['A', 'B', 'C'], ['Z']),
+    'DFFR': (['D', 'CK', 'RN'], ['Q', 'QN']),
+    'MUX2': (['A', 'B', 'S'], ['Z']),
+}
+
+
+def write_netlist(path: str, instances: int) -> None:
+    """Write a flat gate-level netlist in the style synthesis tools emit."""
+    cells = sorted(CELLS)
+    with open(path, 'w') as f:
+        f.write("library IEEE;\nuse IEEE.STD_LOGIC_1164.all;\n\n")
+        f.write("entity top is\n  port ( clk : in std_logic; rst_n : in std_logic );\nend top;\n\n")
+        f.write("architecture netlist of top is\n")
+        for cell in cells:
+            ins, outs = CELLS[cell]
+            pins = [f"{p} : in std_logic" for p in ins] + [f"{p} : out std_logic" for p in outs]
+            f.write(f"  component {cell}\n    port ( {'; '.join(pins)} );\n  end component;\n")
+        f.write(f"  signal n : std_logic_vector({instances * 2} downto 0);\nbegin\n")
+        for i in range(instances):
+            cell = cells[i % len(cells)]
+            ins, outs = CELLS[cell]
+            assoc = [f"{p} => n({(i * 7 + k) % (instances * 2)})" for k, p in enumerate(ins)]
+            assoc += [f"{p} => n({i * 2 + k})" for k, p in enumerate(outs)]
+            f.write(f"  U{i} : entity work.{cell} port map ( {', '.join(assoc)} );\n")
+        f.write("end netlist;\n")
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def parse_in_memory(path: str):
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        parser = VHDLParser(f.read())
+    parser.parse()
+    return parser.instances
+
+
+def main():
+    instances = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'netlist.vhd')
+        write_netlist(path, instances)
+        print(f"Generated {instances} instances, {os.path.getsize(path) / 1e6:.1f} MB")
+
+        parsed, t_parse, m_parse = measure(lambda: parse_in_memory(path))
+        n_parse = len(parsed)
+        del parsed
+        store, t_stream, m_stream = measure(lambda: import_netlist(path))
+        print(f"VHDLParser : {n_parse:7d} instances  peak {m_parse / 1e6:8.1f} MB  {t_parse:6.2f} s")
+        print(f"streaming  : {len(store):7d} instances  peak {m_stream / 1e6:8.1f} MB  {t_stream:6.2f} s")
+        print(f"memory     : {m_parse / m_stream:8.1f}x less")
+
+
+if __name__ == '__main__':
+    main()
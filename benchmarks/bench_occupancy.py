@@ -0,0 +1,67 @@
+"""Time building the routing occupancy grid for many blocks.
+
+Compares OccupancyGrid's row-slice rasterization with the per-cell,
+per-block loop it replaced. The old loop is far too slow for the full grid,
+so it is timed on a band of rows and extrapolated.
+
+Usage (from the repo root, after `pip install -e .`):
+    python benchmarks/bench_occupancy.py [BLOCKS] [CELLS_PER_SIDE]
+"""
+
+import random
+import sys
+import time
+
+from vhdl_diagramer.routing import OccupancyGrid
+
+STEP = 10
+MARGIN = 10
+
+
+def make_blocks(count: int, extent: int, seed: int = 1):
+    rnd = random.Random(seed)
+    return [(rnd.randrange(0, extent), rnd.randrange(0, extent),
+             rnd.randrange(60, 300), rnd.randrange(60, 400)) for _ in range(count)]
+
+
+def legacy_rows(blocks, xmin, xmax, ys):
+    """The old dict-building loop, restricted to the rows in `ys`."""
+    occupancy = {}
+    for gx in range(xmin, xmax + 1, STEP):
+        for gy in ys:
+            blocked = False
+            for (bx, by, bw, bh) in blocks:
+                if (bx - MARGIN) <= gx <= (bx + bw + MARGIN) and \
+                   (by - MARGIN) <= gy <= (by + bh + MARGIN):
+                    blocked = True
+                    break
+            occupancy[(gx, gy)] = blocked
+    return occupancy
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    side = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    extent = (side - 1) * STEP
+    blocks = make_blocks(count, extent)
+
+    start = time.perf_counter()
+    grid = OccupancyGrid(0, extent, 0, extent, STEP)
+    for (bx, by, bw, bh) in blocks:
+        grid.block_rect(bx - MARGIN, by - MARGIN, bx + bw + MARGIN, by + bh + MARGIN)
+    raster = time.perf_counter() - start
+    print(f"{count} blocks, {side}x{side} cells ({len(grid)}), "
+          f"{sum(grid.cells) / len(grid):.0%} blocked")
+    print(f"OccupancyGrid: {raster * 1000:10.1f} ms")
+
+    sample = [y * STEP for y in range(0, side, max(1, side // 10))][:10]
+    start = time.perf_counter()
+    old = legacy_rows(blocks, 0, extent, sample)
+    legacy = (time.perf_counter() - start) * side / len(sample)
+    assert all(grid.get(cell) == blocked for cell, blocked in old.items())
+    print(f"dict loop:     {legacy * 1000:10.1f} ms (extrapolated from {len(sample)} rows)")
+    print(f"speedup:       {legacy / raster:10.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Route a block array with the PathFinder backend on 1, 2, 4 and 8 workers.
+
+Blocks sit on a regular array and every net joins a free pin on one block
+to a free pin on a block at most two positions away, as in a real
+diagram. The routes must be identical for every worker count; reports
+time, negotiation rounds and the edges still shared at the end.
+
+Usage (from the repo root, after `pip install -e .`):
+    python benchmarks/bench_pathfinder.py [NETS] [WORKERS ...]
+"""
+
+import random
+import sys
+import time
+
+from vhdl_diagramer.pathfinder import PathFinderRouter
+from vhdl_diagramer.routing import Net, WireMap
+
+STEP = 20
+PITCH = 300  # block spacing; blocks are 120 x 200
+SIDE = 12    # blocks per row and column
+
+
+def make_problem(nets: int, seed: int = 1):
+    rnd = random.Random(seed)
+    blocks = [(c * PITCH, r * PITCH, 120, 200) for c in range(SIDE) for r in range(SIDE)]
+    used = set()
+    result = []
+    while len(result) < nets:
+        c, r = rnd.randrange(SIDE), rnd.randrange(SIDE)
+        dc, dr = min(SIDE - 1, max(0, c + rnd.randint(0, 2))), min(SIDE - 1, max(0, r + rnd.randint(-2, 2)))
+        sx, sy, sw, sh = blocks[c * SIDE + r]
+        dx, dy, _, dh = blocks[dc * SIDE + dr]
+        src = (sx + sw, sy + rnd.randrange(1, sh // STEP) * STEP)
+        dst = (dx, dy + rnd.randrange(1, dh // STEP) * STEP)
+        if src in used or dst in used:
+            continue
+        used |= {src, dst}
+        result.append(Net(src, dst, len(result)))
+    bounds = (-300, SIDE * PITCH, -300, SIDE * PITCH)
+    return blocks, result, bounds
+
+
+def main():
+    nets = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    counts = [int(a) for a in sys.argv[2:]] or [1, 2, 4, 8]
+    blocks, problem, bounds = make_problem(nets)
+    print(f"{nets} nets, {SIDE * SIDE} blocks")
+
+    results = {}
+    for workers in counts:
+        router = PathFinderRouter(STEP, workers=workers)
+        occupancy = router.build_occupancy_grid(blocks, *bounds, margin=10)
+        start = time.perf_counter()
+        results[workers] = router.route(problem, occupancy, WireMap(occupancy), bounds)
+        elapsed = time.perf_counter() - start
+        print(f"{workers:2} workers {elapsed * 1000:9.1f} ms  {router.iterations:3} rounds"
+              f"  {router.conflicts:5} shared edges")
+    first = results[counts[0]]
+    assert all(routes == first for routes in results.values()), 'routes depend on the worker count'
+    print("routes are identical for every worker count")
+
+
+if __name__ == '__main__':
+    main()
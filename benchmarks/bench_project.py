@@ -0,0 +1,61 @@
+"""Time project loading of a synthetic multi-file tree at several worker counts.
+
+Usage (from the repo root, after `pip install -e .`):
+    python benchmarks/bench_project.py [FILES] [MAX_WORKERS]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from vhdl_diagramer.project import load_project
+
+
+def make_tree(root: str, files: int, ports: int = 24, instances: int = 30) -> None:
+    """Write `files` entity/architecture pairs, spread over a few subdirectories.
+
+    Every architecture instantiates entities from other files, so each file
+    looks like a mid-sized block of a real design.
+    """
+    for i in range(files):
+        sub = os.path.join(root, f"lib_{i % 8}")
+        os.makedirs(sub, exist_ok=True)
+        lines = [f"ENTITY block_{i} IS", "    PORT("]
+        lines += [f"        in_{p} : IN STD_LOGIC_VECTOR(7 DOWNTO 0);" for p in range(ports // 2)]
+        lines += [f"        out_{p} : OUT STD_LOGIC_VECTOR(7 DOWNTO 0);" for p in range(ports // 2 - 1)]
+        lines += ["        done : OUT STD_LOGIC", "    );", f"END ENTITY block_{i};", "",
+                  f"ARCHITECTURE struct OF block_{i} IS"]
+        lines += [f"    SIGNAL s_{k} : STD_LOGIC_VECTOR(7 DOWNTO 0);" for k in range(instances)]
+        lines.append("BEGIN")
+        for k in range(instances):
+            lines.append(f"    u_{k}: ENTITY work.block_{(i + k + 1) % files}")
+            lines.append("    PORT MAP(")
+            lines += [f"        in_{p} => s_{(k + p) % instances}," for p in range(ports // 2)]
+            lines.append("        done => open")
+            lines.append("    );")
+        lines.append("END ARCHITECTURE struct;")
+        with open(os.path.join(sub, f"block_{i}.vhd"), 'w') as f:
+            f.write("\n".join(lines) + "\n")
+
+
+def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+    with tempfile.TemporaryDirectory() as root:
+        make_tree(root, files)
+        print(f"Generated {files} files, cpu_count={os.cpu_count()}")
+        base = None
+        workers = 1
+        while workers <= max_workers:
+            start = time.perf_counter()
+            library = load_project([root], max_workers=workers)
+            elapsed = time.perf_counter() - start
+            base = base or elapsed
+            print(f"workers={workers:<3} entities={len(library)} "
+                  f"time={elapsed * 1000:8.1f} ms  speedup={base / elapsed:5.2f}x")
+            workers *= 2
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Replay a recorded routing trace against router backends.
+
+Record a trace by running the app with `--trace-routing FILE` (or setting
+config.ROUTE_TRACE); every distinct routing request draw() makes is
+written to it. This replays the requests in order, one RouteSession
+carrying over between them as in the app, first with the backend each
+was recorded with and then with each backend named. Reports routing
+time, the slowest frame, nodes expanded, heap pushes and total wire
+length, and how each net's length in the last frame compares with the
+recorded backend's route.
+
+Usage (from the repo root, after `pip install -e .`):
+    python benchmarks/bench_replay.py TRACE [BACKEND ...]
+"""
+
+import sys
+
+from vhdl_diagramer.routing import ROUTERS
+from vhdl_diagramer.trace import read_trace, replay
+
+
+def wire_length(segments) -> int:
+    return sum(abs(x2 - x1) + abs(y2 - y1) for (x1, y1), (x2, y2) in segments)
+
+
+def run(frames, backend=None):
+    seconds = slowest = 0.0
+    expanded = pushes = 0
+    last = None
+    for frame in replay(frames, backend):
+        seconds += frame.seconds
+        slowest = max(slowest, frame.seconds)
+        expanded += frame.expanded
+        pushes += frame.pushes
+        last = frame
+    lengths = {key: wire_length(segments) for key, segments in zip(last.snapshot.keys, last.routes)}
+    return seconds, slowest, expanded, pushes, lengths
+
+
+def main():
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    frames = list(read_trace(sys.argv[1]))
+    if not frames:
+        sys.exit(f"{sys.argv[1]}: no routing requests recorded")
+    backends = sys.argv[2:] or sorted(ROUTERS)
+    recorded = sorted({frame.router for frame in frames})
+    print(f"{len(frames)} frames, {len(frames[-1].nets)} nets in the last, recorded with {', '.join(recorded)}")
+    results = run(frames)
+    reference = results[4]
+    for name in ['recorded'] + backends:
+        if name != 'recorded':
+            results = run(frames, name)
+        seconds, slowest, expanded, pushes, lengths = results
+        delta = sum(lengths[key] - reference[key] for key in lengths)
+        longer = sum(lengths[key] > reference[key] for key in lengths)
+        shorter = sum(lengths[key] < reference[key] for key in lengths)
+        print(f"{name:<10} {seconds * 1000:9.1f} ms  slowest {slowest * 1000:7.1f} ms  {expanded:9} nodes"
+              f"  {pushes:9} pushes  {sum(lengths.values()):8} px  {delta:+7} px"
+              f"  ({longer} nets longer, {shorter} shorter)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Time an incremental reroute after moving one block.
+
+Routes many short nets between neighbouring blocks of a block array with a
+RouteSession, then moves one block and routes again: only the nets on that
+block and those whose wires cross its old or new position are searched.
+Then undoes the move, which should take its routes from the route cache,
+and times the same edit routed from scratch for comparison.
+
+Usage (from the repo root, after `pip install -e .`):
+    python benchmarks/bench_reroute.py [NETS] [BACKEND]
+"""
+
+import random
+import sys
+import time
+
+from vhdl_diagramer.routing import Net, OccupancyGrid, RouteSession, get_router
+
+STEP = 20
+PITCH = 200  # block spacing; blocks are 80 x 120
+
+
+def make_design(nets: int, seed: int = 1):
+    """A square block array with nets from each block to a nearby one."""
+    rnd = random.Random(seed)
+    side = max(2, int((nets / 4) ** 0.5))
+    blocks = [(c * PITCH, r * PITCH, 80, 120) for c in range(side) for r in range(side)]
+    pairs = []
+    for i in range(nets):
+        src = rnd.randrange(len(blocks))
+        c, r = divmod(src, side)
+        dc, dr = rnd.choice([(1, 0), (1, 1), (1, -1), (0, 1), (-1, 0)])
+        dst = min(max(c + dc, 0), side - 1) * side + min(max(r + dr, 0), side - 1)
+        pairs.append((src, rnd.randrange(6), dst, rnd.randrange(6), i))
+    return blocks, pairs
+
+
+def build(blocks, pairs):
+    nets = []
+    keys = []
+    for src, sp, dst, dp, signal in pairs:
+        sx, sy, sw, _ = blocks[src]
+        dx, dy, _, _ = blocks[dst]
+        nets.append(Net((sx + sw, sy + STEP * (sp + 1)), (dx, dy + STEP * (dp + 1)), signal))
+        keys.append(signal)
+    rects = [(x - 10, y - 10, x + w + 10, y + h + 10) for x, y, w, h in blocks]
+    xs = [r[0] for r in rects] + [r[2] for r in rects]
+    ys = [r[1] for r in rects] + [r[3] for r in rects]
+    bounds = ((min(xs) - 300) // STEP * STEP, (max(xs) + 300) // STEP * STEP,
+              (min(ys) - 300) // STEP * STEP, (max(ys) + 300) // STEP * STEP)
+    occupancy = OccupancyGrid(*bounds, STEP)
+    for rect in rects:
+        occupancy.block_rect(*rect)
+    return keys, nets, occupancy, rects, bounds
+
+
+def main():
+    nets = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    backend = sys.argv[2] if len(sys.argv) > 2 else 'grid'
+    blocks, pairs = make_design(nets)
+    router = get_router(backend, STEP)
+    session = RouteSession()
+    print(f"{nets} nets, {len(blocks)} blocks, backend {backend}")
+
+    start = time.perf_counter()
+    session.route(router, *build(blocks, pairs))
+    print(f"full route        {(time.perf_counter() - start) * 1000:9.1f} ms")
+
+    # Move a block in the middle of the array half a pitch to the right
+    moved = len(blocks) // 2
+    x, y, w, h = blocks[moved]
+    blocks[moved] = (x + PITCH // 2, y, w, h)
+    problem = build(blocks, pairs)
+
+    start = time.perf_counter()
+    session.route(router, *problem)
+    elapsed = time.perf_counter() - start
+    print(f"incremental       {elapsed * 1000:9.1f} ms  "
+          f"({session.rerouted} rerouted, {session.kept} kept)")
+
+    # Undo the move: the routes from before come back from the route cache
+    blocks[moved] = (x, y, w, h)
+    start = time.perf_counter()
+    session.route(router, *build(blocks, pairs))
+    elapsed = time.perf_counter() - start
+    print(f"undo              {elapsed * 1000:9.1f} ms  "
+          f"({session.rerouted} rerouted, {session.reused} from cache, {session.kept} kept)")
+
+    start = time.perf_counter()
+    RouteSession().route(get_router(backend, STEP), *problem)
+    print(f"same edit, full   {(time.perf_counter() - start) * 1000:9.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Route one synthetic problem with every registered routing backend.
+
+Each backend routes the same random nets over the same obstacle grid, each
+route becoming existing wiring for the next. Reports time and, for search
+backends, nodes expanded per second, and how many searches succeeded at
+each search window level; the A* backends must agree exactly. Backends
+that route all nets together (PathFinder) are only run when named; see
+bench_pathfinder.py.
+
+Usage (from the repo root, after `pip install -e .`):
+    python benchmarks/bench_routing.py [NETS] [BLOCKS] [BACKEND ...]
+"""
+
+import random
+import sys
+import time
+
+from vhdl_diagramer.routing import ROUTERS, Net, WireMap, get_router
+
+STEP = 20
+SIZE = 4000  # grid extent in both directions
+
+
+def make_problem(nets: int, blocks: int, seed: int = 1):
+    """Blocks, plus nets between points just outside their left and right edges."""
+    rnd = random.Random(seed)
+    rects = [(rnd.randrange(0, SIZE - 300) // STEP * STEP, rnd.randrange(0, SIZE - 300) // STEP * STEP,
+              rnd.randrange(3, 15) * STEP, rnd.randrange(3, 15) * STEP) for _ in range(blocks)]
+    result = []
+    for _ in range(nets):
+        sx, sy, sw, sh = rnd.choice(rects)
+        dx, dy, _, dh = rnd.choice(rects)
+        src = (sx + sw, sy + rnd.randrange(sh // STEP) * STEP)
+        dst = (dx, dy + rnd.randrange(dh // STEP) * STEP)
+        result.append(Net(src, dst, rnd.randrange(nets // 3 + 1)))
+    return rects, result
+
+
+def main():
+    nets = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    blocks = int(sys.argv[2]) if len(sys.argv) > 2 else 150
+    names = sys.argv[3:] or [name for name, cls in ROUTERS.items() if not cls.routes_jointly]
+    rects, problem = make_problem(nets, blocks)
+    bounds = (0, SIZE, 0, SIZE)
+    print(f"{nets} nets, {blocks} blocks")
+
+    results = {}
+    for name in names:
+        router = get_router(name, STEP)
+        occupancy = router.build_occupancy_grid(rects, *bounds, margin=10)
+        wires = WireMap(occupancy)
+        start = time.perf_counter()
+        results[name] = router.route(problem, occupancy, wires, bounds)
+        elapsed = time.perf_counter() - start
+        line = f"{name:<10} {elapsed * 1000:9.1f} ms"
+        expanded = getattr(router, 'expanded', None)
+        if expanded is not None:
+            line += f"  {expanded:9} nodes  {expanded / elapsed:12,.0f} nodes/s"
+        print(line)
+        if router.window_levels:
+            levels = sorted(router.window_levels.items(), key=lambda item: str(item[0]))
+            print(f"{'':<10} search windows: " + ', '.join(f"{level}: {n}" for level, n in levels))
+    if 'astar' in results and 'grid' in results:
+        assert results['astar'] == results['grid'], 'astar and grid routes differ'
+        print("astar and grid routes are identical")
+
+
+if __name__ == '__main__':
+    main()
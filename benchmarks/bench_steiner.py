@@ -0,0 +1,52 @@
+"""Compare per-connection routing with Steiner tree routing on a fanout net.
+
+A clock-like signal leaves one block and feeds every block of an array, as
+one connection per sink. Routed per connection, each sink is a full search
+from the source; routed as a tree, each sink is a search from the wiring
+already laid, which usually meets it close by. Reports time, nodes
+expanded and the number of grid cells the signal's wires cover.
+
+Usage (from the repo root, after `pip install -e .`):
+    python benchmarks/bench_steiner.py [SINKS]
+"""
+
+import sys
+import time
+
+from vhdl_diagramer.routing import Net, OccupancyGrid, RouteSession, get_router
+
+STEP = 20
+PITCH = 200  # block spacing; blocks are 80 x 120
+
+
+def make_problem(sinks: int):
+    side = max(1, int(sinks ** 0.5 + 0.999))
+    blocks = [(200 + c * PITCH, r * PITCH, 80, 120) for c in range(side) for r in range(side)][:sinks]
+    source = (0, (side * PITCH) // 2 // STEP * STEP, 80, 120)
+    src = (source[0] + source[2], source[1] + STEP)
+    nets = [Net(src, (x, y + STEP), 0) for x, y, _, _ in [source] + blocks][1:]
+    rects = [(x - 10, y - 10, x + w + 10, y + h + 10) for x, y, w, h in [source] + blocks]
+    bounds = (-300, 200 + side * PITCH + 300, -300, side * PITCH + 300)
+    occupancy = OccupancyGrid(*bounds, STEP)
+    for rect in rects:
+        occupancy.block_rect(*rect)
+    return list(range(len(nets))), nets, occupancy, rects, bounds
+
+
+def main():
+    sinks = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    problem = make_problem(sinks)
+    print(f"1 signal, {sinks} sinks")
+    for trees in (False, True):
+        router = get_router('grid', STEP)
+        session = RouteSession()
+        start = time.perf_counter()
+        session.route(router, *problem, trees=trees)
+        elapsed = time.perf_counter() - start
+        cells = sum(1 for _ in session.wires.items())
+        label = 'steiner tree' if trees else 'per connection'
+        print(f"{label:<15} {elapsed * 1000:9.1f} ms  {router.expanded:9} nodes  {cells:6} wire cells")
+
+
+if __name__ == '__main__':
+    main()
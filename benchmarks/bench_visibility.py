@@ -0,0 +1,54 @@
+"""Compare the grid and visibility-graph routers on a block array.
+
+Blocks sit on a regular array, as in a drawn diagram, and every net joins
+an output of one block to an input of a block at most two columns to the
+right. Both backends route the same nets, each route becoming wiring for
+the next; reports time, nodes expanded and total wire length, on a fine
+and a coarse grid.
+
+Usage (from the repo root, after `pip install -e .`):
+    python benchmarks/bench_visibility.py [NETS]
+"""
+
+import random
+import sys
+import time
+
+from vhdl_diagramer.routing import Net, WireMap, get_router
+
+PITCH = 300  # block spacing; blocks are 120 x 200
+SIDE = 12    # blocks per row and column
+
+
+def make_problem(nets: int, seed: int = 1):
+    rnd = random.Random(seed)
+    blocks = [(c * PITCH, r * PITCH, 120, 200) for c in range(SIDE) for r in range(SIDE)]
+    result = []
+    for i in range(nets):
+        c, r = rnd.randrange(SIDE), rnd.randrange(SIDE)
+        dc, dr = min(SIDE - 1, c + rnd.randint(0, 2)), min(SIDE - 1, max(0, r + rnd.randint(-2, 2)))
+        sx, sy, sw, _ = blocks[c * SIDE + r]
+        dx, dy, _, _ = blocks[dc * SIDE + dr]
+        result.append(Net((sx + sw, sy + rnd.randrange(1, 10) * 20), (dx, dy + rnd.randrange(1, 10) * 20), i))
+    bounds = (-300, SIDE * PITCH, -300, SIDE * PITCH)
+    return blocks, result, bounds
+
+
+def main():
+    nets = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    blocks, problem, bounds = make_problem(nets)
+    print(f"{nets} nets, {SIDE * SIDE} blocks")
+    for step in (10, 20):
+        for name in ('grid', 'visibility'):
+            router = get_router(name, step)
+            occupancy = router.build_occupancy_grid(blocks, *bounds, margin=10)
+            start = time.perf_counter()
+            routes = router.route(problem, occupancy, WireMap(occupancy), bounds)
+            elapsed = time.perf_counter() - start
+            length = sum(abs(x2 - x1) + abs(y2 - y1) for segments in routes for (x1, y1), (x2, y2) in segments)
+            print(f"step {step:2}  {name:<10} {elapsed * 1000:9.1f} ms  {router.expanded:9} nodes"
+                  f"  {length:8} px of wire")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from vhdl_diagramer import cache as cache_module
+from vhdl_diagramer.cache import ParseCache
+
+EXAMPLE = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'RC4_sync_top.vhd')
+
+
+def _design(n):
+    return ("ARCHITECTURE rtl OF top IS\n    SIGNAL s : STD_LOGIC;\nBEGIN\n"
+            + "\n".join(f"    u{i}: entity work.cell port map(a => s, y => s);" for i in range(n))
+            + "\nEND ARCHITECTURE rtl;\n")
+
+
+class TestParseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = ParseCache(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_hit_skips_parsing(self):
+        with open(EXAMPLE, 'r', encoding='utf-8', errors='ignore') as f:
+            text = f.read()
+        first = self.cache.parse(text)
+        with mock.patch.object(cache_module.VHDLParser, 'parse') as parse:
+            second = self.cache.parse(text)
+            parse.assert_not_called()
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        self.assertEqual([i.name for i in second.instances], [i.name for i in first.instances])
+        self.assertEqual(second.signals, first.signals)
+        self.assertEqual(second.assignments, first.assignments)
+        self.assertEqual([p.name for p in second.top_level_ports],
+                         [p.name for p in first.top_level_ports])
+        # Results are fresh objects; editing one diagram must not leak into the cache.
+        self.assertIsNot(second.instances[0], first.instances[0])
+        inst = second.instances[0]
+        self.assertIs(inst.original_ports[0], inst.ports[0])
+
+    def test_key_depends_on_text_and_version(self):
+        key = self.cache.key('a <= b;')
+        self.assertNotEqual(key, self.cache.key('a <= c;'))
+        with mock.patch.object(cache_module, 'PARSER_VERSION', -1):
+            self.assertNotEqual(key, self.cache.key('a <= b;'))
+
+    def test_corrupt_entry_is_reparsed(self):
+        text = _design(2)
+        self.cache.parse(text)
+        path = os.path.join(self.tmp.name, self.cache.key(text) + '.pickle')
+        with open(path, 'wb') as f:
+            f.write(b'not a pickle')
+        parser = self.cache.parse(text)
+        self.assertEqual(len(parser.instances), 2)
+        self.assertEqual(self.cache.misses, 2)
+
+    def test_evicts_least_recently_used(self):
+        texts = [_design(n) for n in range(1, 4)]
+        for text in texts:
+            self.cache.parse(text)
+        paths = [os.path.join(self.tmp.name, self.cache.key(t) + '.pickle') for t in texts]
+        for age, path in enumerate(paths):
+            os.utime(path, ns=(age * 10**9, age * 10**9))
+        # Touch the oldest entry so the middle one becomes least recently used.
+        self.cache.get(texts[0])
+
+        self.cache.max_bytes = os.path.getsize(paths[0]) + os.path.getsize(paths[2])
+        self.cache.evict()
+        self.assertEqual([os.path.exists(p) for p in paths], [True, False, True])
+
+
+if __name__ == '__main__':
+    unittest.main()
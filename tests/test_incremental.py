@@ -0,0 +1,78 @@
+import unittest
+
+from vhdl_diagramer.models import Instance
+from vhdl_diagramer.parser import VHDLParser
+from vhdl_diagramer.utils import carry_over_groups
+
+DESIGN = """
+ARCHITECTURE rtl OF top IS
+    COMPONENT cell IS PORT(a : IN STD_LOGIC; y : OUT STD_LOGIC); END COMPONENT;
+    SIGNAL s0, s1, s2 : STD_LOGIC;
+BEGIN
+    u0: entity work.cell port map(a => s0, y => s1);
+    u1: entity work.cell port map(a => s1, y => s2); -- tail comment
+    u2: entity work.other port map(x => s2);
+END ARCHITECTURE rtl;
+"""
+
+
+def parse(text, previous=None):
+    parser = VHDLParser(text, previous=previous)
+    parser.parse()
+    return parser
+
+
+class TestIncrementalParse(unittest.TestCase):
+
+    def setUp(self):
+        self.first = parse(DESIGN)
+        self.first.instances[0].x = 120
+
+    def test_unchanged_instances_are_kept(self):
+        # Whitespace and comment edits do not count as changes
+        text = DESIGN.replace('-- tail comment', '').replace('u0: entity', 'u0 :  entity')
+        second = parse(text.replace('x => s2', 'x => s0'), self.first)
+        self.assertEqual(second.reused, 2)
+        self.assertIs(second.instances[0], self.first.instances[0])
+        self.assertIs(second.instances[1], self.first.instances[1])
+        self.assertIsNot(second.instances[2], self.first.instances[2])
+        self.assertEqual(second.instances[0].x, 120)
+        self.assertEqual(second.instances[2].ports[0].signal, 's0')
+
+    def test_declaration_change_invalidates(self):
+        text = DESIGN.replace('a : IN STD_LOGIC', 'a : OUT STD_LOGIC')
+        second = parse(text, self.first)
+        self.assertEqual(second.reused, 1)  # only u2, whose entity is not 'cell'
+        self.assertEqual(second.instances[0].ports[0].direction, 'OUT')
+
+    def test_adopt_unchanged(self):
+        second = parse(DESIGN.replace('a => s1', 'a => s0'))
+        self.assertEqual(second.adopt_unchanged(self.first), 2)
+        self.assertIs(second.instances[0], self.first.instances[0])
+        self.assertIs(second.instances[2], self.first.instances[2])
+
+
+class TestCarryOverGroups(unittest.TestCase):
+
+    def test_groups_survive_with_remaining_children(self):
+        a, b, c, d = (Instance(name=n, entity='cell', ports=[]) for n in 'abcd')
+        inner = Instance(name='inner', entity='GROUP', ports=[], is_group=True, children=[b, c])
+        outer = Instance(name='outer', entity='GROUP', ports=[], is_group=True, children=[a, inner])
+        empty = Instance(name='empty', entity='GROUP', ports=[], is_group=True, children=[d])
+        for child, parent in ((a, outer), (inner, outer), (b, inner), (c, inner), (d, empty)):
+            child.parent = parent
+
+        new_c = Instance(name='c', entity='cell', ports=[])
+        new_d = Instance(name='d', entity='cell', ports=[])
+        new_e = Instance(name='e', entity='cell', ports=[])
+        result = carry_over_groups([outer, empty], [a, b, new_c, new_d, new_e])
+
+        self.assertEqual([i.name for i in result], ['c', 'd', 'e', 'outer'])
+        self.assertEqual(outer.children, [a, inner])
+        self.assertEqual(inner.children, [b])
+        self.assertIsNone(new_c.parent)
+        self.assertIs(b.parent, inner)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+
+from vhdl_diagramer.netlist import import_netlist, iter_statements
+
+NETLIST = """
+library IEEE; use IEEE.STD_LOGIC_1164.all;
+entity top is port ( clk : in std_logic; q : out std_logic ); end top;
+architecture netlist of top is
+  component DFF
+    port ( D : in std_logic; CK : in std_logic; Q : out std_logic );
+  end component;
+  signal n1, n2 : std_logic;  -- comment with ; and port map ( inside
+begin
+  U1 : DFF port map ( D => n1, CK => clk, Q => n2 );
+  /* block comment; U9 : DFF port map (D => x); */
+  U2 : entity work.DFF generic map ( INIT => "0;1" ) port map ( D => n2, CK => clk, Q => q );
+  U3 : component BUF port map ( A => n2, Z => n1 );
+  U4 : BUF port map ( A => n2, Z => n1
+end netlist;
+"""
+
+
+class TestNetlist(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'netlist.vhd')
+        with open(self.path, 'w') as f:
+            f.write(NETLIST)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_statements_split_at_top_level(self):
+        statements = list(iter_statements(self.path))
+        self.assertTrue(all(s.rstrip().endswith(b';') for s in statements))
+        component = [s for s in statements if b'component DFF' in s]
+        self.assertEqual(len(component), 1)
+        self.assertIn(b'Q : out std_logic )', component[0])
+
+    def test_import(self):
+        store = import_netlist(self.path)
+        self.assertEqual(len(store), 4)
+        u1, u2, u3, u4 = store.instances()
+        self.assertEqual((u1.name, u1.entity), ('U1', 'DFF'))
+        self.assertEqual([(p.name, p.signal) for p in u1.ports],
+                         [('D', 'n1'), ('CK', 'clk'), ('Q', 'n2')])
+        # 'D' and 'CK' would be guessed INOUT; the component declaration says IN.
+        self.assertEqual([p.direction for p in u2.ports], ['IN', 'IN', 'OUT'])
+        self.assertEqual((u3.name, u3.entity), ('U3', 'BUF'))
+        # Unterminated port map: recovered up to the end of the statement
+        self.assertEqual([p.signal for p in u4.ports], ['n2', 'n1 end netlist'])
+        self.assertEqual(store.entity_counts(), {'DFF': 2, 'BUF': 2})
+        # Repeated names are stored once
+        self.assertEqual(store.pool.strings.count('n2'), 1)
+
+    def test_external_port_modes(self):
+        store = import_netlist(self.path, {'buf': {'a': 'IN', 'z': 'OUT'}})
+        self.assertEqual([p.direction for p in store.instance(2).ports], ['IN', 'OUT'])
+
+    def test_empty_file(self):
+        open(self.path, 'w').close()
+        self.assertEqual(len(import_netlist(self.path)), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
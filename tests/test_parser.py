@@ -0,0 +1,149 @@
+import os
+import unittest
+
+from vhdl_diagramer.lexer import tokenize
+from vhdl_diagramer.models import EntityDecl, PortDecl
+from vhdl_diagramer.parser import VHDLParser
+
+SAMPLE = """
+ENTITY top IS
+    PORT(
+        clk, rst : IN  STD_LOGIC; -- clock and reset
+        dout     : OUT STD_LOGIC_VECTOR(7 DOWNTO 0)
+    );
+END ENTITY top;
+
+ARCHITECTURE rtl OF top IS
+    SIGNAL a, b : STD_LOGIC := '0';
+    SIGNAL bus_s : STD_LOGIC_VECTOR(7 downto 0); -- SIGNAL fake : bit;
+    CONSTANT WIDTH : INTEGER := 8;
+BEGIN
+    a <= clk;
+    u_core: entity work.core
+        generic map(W => WIDTH)
+        port map(
+            clk  => clk, -- port map(comment => ignored)
+            din  => bus_s(3 downto 0),
+            dout => dout
+        );
+END ARCHITECTURE rtl;
+"""
+
+
+class TestLexer(unittest.TestCase):
+
+    def test_comments_and_whitespace_dropped(self):
+        toks = tokenize("a -- b\n/* c */ d")
+        self.assertEqual(toks.texts, ['a', 'd'])
+
+    def test_keywords_are_case_folded(self):
+        toks = tokenize("Signal sig : std_logic;")
+        self.assertEqual(toks.folded[0], 'SIGNAL')
+        self.assertEqual(toks.texts[1], 'sig')
+        self.assertFalse(toks.is_name(0))
+        self.assertTrue(toks.is_name(1))
+
+    def test_literals(self):
+        toks = tokenize("x <= \"--not a comment\"; y <= '0'; z <= clk'event;")
+        self.assertIn('"--not a comment"', toks.texts)
+        self.assertIn("'0'", toks.texts)
+        # attribute tick is a delimiter, not the start of a character literal
+        self.assertEqual(toks.texts[-4:], ['clk', "'", 'event', ';'])
+
+    def test_span_text(self):
+        toks = tokenize("STD_LOGIC_VECTOR( 7   DOWNTO 0 ) -- trailing")
+        self.assertEqual(toks.span_text(0, len(toks)), 'STD_LOGIC_VECTOR(7 DOWNTO 0)')
+
+
+class TestParser(unittest.TestCase):
+
+    def setUp(self):
+        self.parser = VHDLParser(SAMPLE)
+        self.parser.parse()
+
+    def test_declarations(self):
+        self.assertEqual(self.parser.signals['a'], 'STD_LOGIC')
+        self.assertEqual(self.parser.signals['b'], 'STD_LOGIC')
+        self.assertEqual(self.parser.signals['bus_s'], 'STD_LOGIC_VECTOR(7 downto 0)')
+        self.assertNotIn('fake', self.parser.signals)
+        self.assertEqual(self.parser.constants['WIDTH'], 'INTEGER := 8')
+
+    def test_top_level_ports(self):
+        ports = [(p.name, p.direction) for p in self.parser.top_level_ports]
+        self.assertEqual(ports, [('clk', 'IN'), ('rst', 'IN'), ('dout', 'OUT')])
+
+    def test_assignments(self):
+        self.assertEqual(self.parser.assignments, [('a', 'clk')])
+
+    def test_instances(self):
+        self.assertEqual(len(self.parser.instances), 1)
+        inst = self.parser.instances[0]
+        self.assertEqual((inst.name, inst.entity), ('u_core', 'core'))
+        signals = [(p.name, p.signal) for p in inst.ports]
+        self.assertEqual(signals, [('clk', 'clk'), ('din', 'bus_s(3 downto 0)'), ('dout', 'dout')])
+        self.assertEqual(inst.original_ports, inst.ports)
+
+    def test_example_design(self):
+        path = os.path.join(os.path.dirname(__file__), '..', 'RC4_sync_top.vhd')
+        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            parser = VHDLParser(f.read())
+        parser.parse()
+        # Commented-out instances must not be picked up
+        self.assertEqual([i.name for i in parser.instances],
+                         ['UART_RX_inst', 'UART_TX_inst', 'uart_controller_inst',
+                          'cipher_ctrl_inst', 'RC4_TOP_inst'])
+        self.assertEqual(len(parser.top_level_ports), 6)
+        self.assertEqual(len(parser.assignments), 4)
+
+
+DECLARED = """
+ENTITY fifo IS
+    PORT(
+        done    : IN  STD_LOGIC;
+        index_o : OUT STD_LOGIC_VECTOR(3 DOWNTO 0)
+    );
+END ENTITY fifo;
+
+ARCHITECTURE rtl OF top IS
+    COMPONENT cell IS
+        PORT(din : OUT STD_LOGIC; data : IN STD_LOGIC_VECTOR(7 DOWNTO 0));
+    END COMPONENT cell;
+BEGIN
+    u_fifo: entity work.fifo port map(done => s1, index_o => s2);
+    u_cell: entity work.CELL port map(din => s3, data(3 downto 0) => s4, dout => s5);
+    u_ext: entity work.ext port map(x => s6);
+END ARCHITECTURE rtl;
+"""
+
+
+class TestDeclaredDirections(unittest.TestCase):
+
+    def directions(self, parser):
+        return {i.name: [p.direction for p in i.ports] for i in parser.instances}
+
+    def test_declarations_beat_heuristic(self):
+        parser = VHDLParser(DECLARED)
+        parser.parse()
+        self.assertIn('cell', parser.components)
+        self.assertEqual(parser.port_modes['fifo'], {'done': 'IN', 'index_o': 'OUT'})
+        # 'done' and 'index_o' would be guessed OUT and IN; 'dout' is undeclared
+        # so it still falls back to the heuristic.
+        self.assertEqual(self.directions(parser), {
+            'u_fifo': ['IN', 'OUT'],
+            'u_cell': ['OUT', 'IN', 'OUT'],
+            'u_ext': ['INOUT'],
+        })
+
+    def test_external_library(self):
+        library = {'ext': EntityDecl('ext', [PortDecl('x', 'OUT')]),
+                   'fifo': EntityDecl('fifo', [PortDecl('done', 'OUT')])}
+        parser = VHDLParser(DECLARED, library=library)
+        parser.parse()
+        directions = self.directions(parser)
+        self.assertEqual(directions['u_ext'], ['OUT'])
+        # Local declarations take precedence over the library
+        self.assertEqual(directions['u_fifo'], ['IN', 'OUT'])
+
+
+if __name__ == '__main__':
+    unittest.main()
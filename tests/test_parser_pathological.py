@@ -0,0 +1,122 @@
+import time
+import unittest
+
+from vhdl_diagramer.lexer import tokenize
+from vhdl_diagramer.parser import VHDLParser
+
+# Hard upper bounds, in seconds. Each input below is a few hundred kB to a few
+# MB; a linear scanner handles them in well under a second, while the old
+# regex stages took minutes on several of them.
+TIME_LIMIT = 5.0
+
+
+def _parse(text):
+    parser = VHDLParser(text)
+    start = time.perf_counter()
+    parser.parse()
+    return parser, time.perf_counter() - start
+
+
+def _wrap(body, decls=''):
+    return ("ENTITY top IS PORT(clk : IN STD_LOGIC); END ENTITY top;\n"
+            "ARCHITECTURE rtl OF top IS\n" + decls + "BEGIN\n" + body + "\nEND ARCHITECTURE rtl;\n")
+
+
+class TestPathologicalInput(unittest.TestCase):
+
+    def assertFast(self, elapsed):
+        self.assertLess(elapsed, TIME_LIMIT, f"parse took {elapsed:.2f}s")
+
+    def test_huge_port_map(self):
+        assoc = ",\n".join(f"  p{i} => s{i}" for i in range(10000))
+        parser, elapsed = _parse(_wrap(f"u0: entity work.big port map(\n{assoc}\n);"))
+        self.assertFast(elapsed)
+        self.assertEqual(len(parser.instances), 1)
+        self.assertEqual(len(parser.instances[0].ports), 10000)
+
+    def test_huge_generic_map(self):
+        generics = ", ".join(f"G{i} => ({i}, ({i} + 1))" for i in range(10000))
+        parser, elapsed = _parse(_wrap(f"u0: entity work.big generic map({generics}) port map(a => b);"))
+        self.assertFast(elapsed)
+        self.assertEqual([p.name for p in parser.instances[0].ports], ['a'])
+
+    def test_unclosed_port_maps(self):
+        body = "\n".join(f"u{i}: entity work.cell port map(a => s{i}, b => (t{i}" for i in range(5000))
+        parser, elapsed = _parse(_wrap(body))
+        self.assertFast(elapsed)
+        self.assertEqual(len(parser.instances), 5000)
+        self.assertEqual(parser.instances[1].ports[0].signal, 's1')
+
+    def test_unbalanced_closing_parens(self):
+        body = "\n".join(f"u{i}: entity work.cell port map(a => s{i})));" for i in range(5000))
+        parser, elapsed = _parse(_wrap(body))
+        self.assertFast(elapsed)
+        self.assertEqual(len(parser.instances), 5000)
+        self.assertEqual(parser.instances[-1].ports[0].signal, 's4999')
+
+    def test_deep_nesting(self):
+        depth = 50000
+        expr = "(" * depth + "x" + ")" * depth
+        parser, elapsed = _parse(_wrap(f"u0: entity work.cell port map(a => {expr}, b => y);"))
+        self.assertFast(elapsed)
+        self.assertEqual([p.name for p in parser.instances[0].ports], ['a', 'b'])
+
+    def test_unterminated_declarations(self):
+        decls = "\n".join(f"SIGNAL s{i} : STD_LOGIC := '0'" for i in range(20000))
+        decls += "\nCONSTANT C : INTEGER := 1\n"
+        parser, elapsed = _parse(_wrap("a <= b;", decls))
+        self.assertFast(elapsed)
+
+    def test_unterminated_entity_declarations(self):
+        for clause in ("PORT(a : IN x;", "GENERIC(W : INTEGER := 8);"):
+            with self.subTest(clause=clause):
+                text = "\n".join(f"ENTITY e{i} IS {clause}" for i in range(10000))
+                parser, elapsed = _parse(text + "\nENTITY last IS PORT(q : OUT y); END ENTITY last;\n")
+                self.assertFast(elapsed)
+                self.assertEqual(len(parser.entities), 10001)
+                self.assertEqual([p.name for p in parser.entities['last'].ports], ['q'])
+
+    def test_unterminated_component_declarations(self):
+        decls = "\n".join(f"COMPONENT c{i} PORT(a : IN x;" for i in range(10000))
+        decls += "\nCOMPONENT last PORT(q : OUT y); END COMPONENT;\n"
+        parser, elapsed = _parse(_wrap("a <= b;", decls))
+        self.assertFast(elapsed)
+        self.assertEqual(len(parser.components), 10001)
+        self.assertEqual([p.name for p in parser.components['last'].ports], ['q'])
+
+    def test_truncated_architecture_body(self):
+        # A half-saved file: no END, the last assignment cut short
+        parser, _ = _parse("architecture a of b is begin x <= y")
+        self.assertEqual(parser.assignments, [])
+        parser, _ = _parse("architecture a of b is begin p <= q; x <= y")
+        self.assertEqual(parser.assignments, [('p', 'q')])
+
+    def test_lexer_unterminated_literals_and_comments(self):
+        text = ('"' + 'x' * 200000 + "\n") * 5 + "/*" + " * " * 100000
+        start = time.perf_counter()
+        tokens = tokenize(text)
+        self.assertFast(time.perf_counter() - start)
+        self.assertGreater(len(tokens), 0)
+
+    def test_scales_linearly(self):
+        def instances(n):
+            return _wrap("\n".join(f"u{i}: entity work.cell generic map(W => ({i})) port map(a => (s{i}"
+                                   for i in range(n)))
+
+        def entities(n):
+            return "\n".join(f"ENTITY e{i} IS PORT(a : IN x;" for i in range(n))
+
+        def components(n):
+            return _wrap("a <= b;", "\n".join(f"COMPONENT c{i} PORT(a : IN x;" for i in range(n)))
+
+        for source in (instances, entities, components):
+            with self.subTest(source.__name__):
+                _, small = _parse(source(2000))
+                _, large = _parse(source(16000))
+                # 8x the input; allow generous slack for timer noise but catch
+                # anything quadratic, which would be ~64x.
+                self.assertLess(large, max(small, 0.01) * 24)
+
+
+if __name__ == '__main__':
+    unittest.main()
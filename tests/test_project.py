@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+
+from vhdl_diagramer.models import Instance, Port
+from vhdl_diagramer.project import find_vhdl_files, load_project
+
+CELL = """
+ENTITY cell IS
+    PORT(
+        a, b : IN  STD_LOGIC_VECTOR(3 DOWNTO 0);
+        y    : OUT STD_LOGIC;
+        q    : BUFFER STD_LOGIC := '0'
+    );
+END ENTITY cell;
+"""
+
+TOP = """
+ENTITY top IS PORT(clk : IN STD_LOGIC); END ENTITY top;
+ARCHITECTURE rtl OF top IS
+    SIGNAL s : STD_LOGIC;
+BEGIN
+    u0: entity work.cell port map(a => s, b => s, y => s, q => open);
+END ARCHITECTURE rtl;
+"""
+
+
+class TestProject(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        os.makedirs(os.path.join(root, 'sub'))
+        os.makedirs(os.path.join(root, '.git'))
+        for rel, text in (('cell.vhd', CELL), ('sub/top.VHDL', TOP),
+                          ('sub/cell_copy.vhd', CELL.replace('BUFFER', 'IN')),
+                          ('.git/ignored.vhd', CELL), ('notes.txt', TOP)):
+            with open(os.path.join(root, rel), 'w') as f:
+                f.write(text)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_find_files(self):
+        files = [os.path.relpath(f, self.tmp.name) for f in find_vhdl_files([self.tmp.name])]
+        self.assertEqual(files, ['cell.vhd', os.path.join('sub', 'cell_copy.vhd'),
+                                 os.path.join('sub', 'top.VHDL')])
+
+    def check_library(self, library):
+        self.assertEqual(len(library), 2)
+        self.assertIn('CELL', library)
+        cell = library.get('cell')
+        self.assertEqual(cell.source, os.path.join(self.tmp.name, 'cell.vhd'))
+        self.assertEqual([(p.name, p.direction, p.type) for p in cell.ports], [
+            ('a', 'IN', 'STD_LOGIC_VECTOR(3 DOWNTO 0)'),
+            ('b', 'IN', 'STD_LOGIC_VECTOR(3 DOWNTO 0)'),
+            ('y', 'OUT', 'STD_LOGIC'),
+            ('q', 'OUT', 'STD_LOGIC'),
+        ])
+        self.assertEqual(library.duplicates,
+                         [('cell', os.path.join(self.tmp.name, 'sub', 'cell_copy.vhd'))])
+
+    def test_serial_load(self):
+        self.check_library(load_project([self.tmp.name], max_workers=1))
+
+    def test_process_pool_load(self):
+        self.check_library(load_project([self.tmp.name], max_workers=2))
+
+    def test_unreadable_file_is_reported(self):
+        missing = os.path.join(self.tmp.name, 'missing.vhd')
+        library = load_project([self.tmp.name, missing], max_workers=1)
+        self.assertIn(missing, library.errors)
+        self.assertEqual(len(library), 2)
+
+    def test_apply_directions(self):
+        library = load_project([self.tmp.name], max_workers=1)
+        ports = [Port('y', 'IN', 's'), Port('Q', 'IN', 's'), Port('extra', 'IN', 's')]
+        inst = Instance(name='u0', entity='Cell', ports=ports)
+        self.assertEqual(library.apply_directions([inst]), 2)
+        self.assertEqual([p.direction for p in ports], ['OUT', 'OUT', 'IN'])
+
+
+if __name__ == '__main__':
+    unittest.main()
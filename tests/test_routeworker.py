@@ -0,0 +1,83 @@
+import random
+import unittest
+
+from vhdl_diagramer.routeworker import RouteSnapshot, RouteWorker
+from vhdl_diagramer.routing import Net, OccupancyGrid, RouteSession, get_router
+
+
+def _snapshot(version=1, router='grid', seed=3):
+    rnd = random.Random(seed)
+    blocks = [(rnd.randrange(0, 30) * 20, rnd.randrange(0, 30) * 20, 60, 80) for _ in range(12)]
+    nets = []
+    for _ in range(20):
+        sx, sy, sw, _ = rnd.choice(blocks)
+        dx, dy, _, _ = rnd.choice(blocks)
+        nets.append(Net((sx + sw, sy + 10), (dx, dy + 20), rnd.randrange(5)))
+    obstacles = tuple((x - 10, y - 10, x + w + 10, y + h + 10) for x, y, w, h in blocks)
+    return RouteSnapshot(version, router, 20, True, 0, tuple(range(len(nets))), tuple(nets),
+                         obstacles, (-100, 800, -100, 800))
+
+
+def _route_here(snapshot):
+    occupancy = OccupancyGrid(*snapshot.bounds, snapshot.grid_step)
+    for rect in snapshot.obstacles:
+        occupancy.block_rect(*rect)
+    session = RouteSession()
+    routes = session.route(get_router(snapshot.router, snapshot.grid_step), list(snapshot.keys),
+                           list(snapshot.nets), occupancy, list(snapshot.obstacles), snapshot.bounds,
+                           trees=snapshot.trees)
+    return routes, session.wires.junctions()
+
+
+class TestRouteWorker(unittest.TestCase):
+
+    def test_routes_on_the_worker_thread(self):
+        snapshot = _snapshot()
+        worker = RouteWorker().start()
+        try:
+            worker.submit(snapshot)
+            result = None
+            for _ in range(500):
+                result = worker.poll()
+                if result is not None:
+                    break
+                worker._stop.wait(0.01)
+        finally:
+            worker.stop()
+        self.assertIsNotNone(result)
+        self.assertIsNone(result.error)
+        self.assertEqual(result.version, 1)
+        self.assertEqual((result.routes, result.junctions), _route_here(snapshot))
+
+    def test_newer_snapshot_supersedes(self):
+        worker = RouteWorker()
+        worker.check_interval = 0
+        first = _snapshot(1)
+        moved = _snapshot(2, seed=4)
+        worker.submit(moved)
+        self.assertIsNone(worker.route(first))  # gives up after one net
+        self.assertEqual(len(worker.session.records), 1)
+        self.assertEqual(worker._take(), moved)
+        result = worker.route(moved)
+        self.assertEqual(result.version, 2)
+        self.assertEqual(result.routes, _route_here(moved)[0])
+
+    def test_stop_abandons_the_pass(self):
+        worker = RouteWorker()
+        worker.check_interval = 0
+        worker._stop.set()
+        self.assertIsNone(worker.route(_snapshot()))
+        self.assertEqual(len(worker.session.records), 1)
+
+    def test_same_job_ignores_version(self):
+        self.assertTrue(_snapshot(1).same_job(_snapshot(7)))
+        self.assertFalse(_snapshot(1).same_job(_snapshot(1, seed=4)))
+        self.assertFalse(_snapshot(1).same_job(None))
+
+    def test_error_is_returned(self):
+        result = RouteWorker().route(_snapshot(router='no-such-router'))
+        self.assertIsInstance(result.error, ValueError)
+
+
+if __name__ == '__main__':
+    unittest.main()
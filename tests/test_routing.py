@@ -0,0 +1,700 @@
+import heapq
+import random
+import unittest
+
+from vhdl_diagramer.globalroute import TileGrid
+from vhdl_diagramer.pathfinder import PathFinderRouter
+from vhdl_diagramer.routing import (ROUTERS, GridAStar, Net, OccupancyGrid, RouteCache, RouteRecord,
+                                    RouteSession, Router, SteinerTree, WireMap, get_router)
+
+
+def brute_force(blocks, xmin, xmax, ymin, ymax, step, margin):
+    return {(gx, gy): any((bx - margin) <= gx <= (bx + bw + margin) and
+                          (by - margin) <= gy <= (by + bh + margin)
+                          for (bx, by, bw, bh) in blocks)
+            for gx in range(xmin, xmax + 1, step) for gy in range(ymin, ymax + 1, step)}
+
+
+def _crosses(segments, rect):
+    x1, y1, x2, y2 = rect
+    return any(min(ax, bx) <= x2 and max(ax, bx) >= x1 and min(ay, by) <= y2 and max(ay, by) >= y1
+               for (ax, ay), (bx, by) in segments)
+
+
+class TestOccupancyGrid(unittest.TestCase):
+
+    def test_matches_per_cell_loop(self):
+        rnd = random.Random(3)
+        blocks = [(rnd.randrange(-50, 400), rnd.randrange(-50, 400),
+                   rnd.randrange(5, 120), rnd.randrange(5, 120)) for _ in range(25)]
+        grid = Router(grid_step=20).build_occupancy_grid(blocks, -40, 400, -20, 380, margin=10)
+        expected = brute_force(blocks, -40, 400, -20, 380, 20, 10)
+        self.assertEqual(len(grid), len(expected))
+        for cell, blocked in expected.items():
+            self.assertEqual(grid[cell], blocked, cell)
+
+    def test_missing_cells(self):
+        grid = OccupancyGrid(0, 100, 0, 100, 20)
+        self.assertFalse(grid.get((40, 60)))
+        self.assertTrue(grid.get((40, 65)))          # off the lattice
+        self.assertTrue(grid.get((120, 0)))          # outside
+        self.assertFalse(grid.get((-20, 0), False))
+        with self.assertRaises(KeyError):
+            grid[(0, -20)]
+
+    def test_index_round_trip(self):
+        grid = OccupancyGrid(-40, 60, 20, 100, 20)
+        for i in range(len(grid)):
+            self.assertEqual(grid.index(*grid.cell(i)), i)
+
+    def test_block_rect_clips_and_accepts_floats(self):
+        grid = OccupancyGrid(0, 100, 0, 100, 20)
+        grid.block_rect(-500.5, 35.5, 25, 60)
+        blocked = sorted(grid.cell(i) for i, v in enumerate(grid.cells) if v)
+        self.assertEqual(blocked, [(0, 40), (0, 60), (20, 40), (20, 60)])
+        grid.block_rect(41, 0, 59, 100)  # no lattice column inside
+        self.assertEqual(sum(grid.cells), 4)
+        self.assertEqual(grid.rects, [(0, 1, 2, 3)])
+
+    def test_distance_transform(self):
+        grid = OccupancyGrid(0, 100, 0, 100, 20)
+        grid.block_rect(0, 0, 60, 100)  # columns 0-3 blocked, 4-5 free
+        distance, nearest = grid.distance_transform()
+        self.assertEqual(distance[grid.index(0, 40)], 4)
+        self.assertEqual(grid.cell(nearest[grid.index(0, 40)]), (80, 40))
+        self.assertEqual(grid.nearest_free(grid.index(80, 40)), grid.index(80, 40))
+        grid.block_rect(80, 0, 100, 100)
+        self.assertEqual(grid.nearest_free(grid.index(0, 40)), -1)
+
+
+def reference_path(start, goal, occupancy, wires, signal, bounds, step, penalty, exempt, sources=()):
+    """The dict and tuple based A* that GridAStar replaced.
+
+    Extra `sources` start at cost 0 along with `start`.
+    """
+    xmin, xmax, ymin, ymax = bounds
+
+    def heuristic(a, b):
+        return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+    def cost(cell):
+        if exempt and (cell == start or cell == goal):
+            return 1
+        if occupancy.get(cell, True):
+            return 100000000
+        existing = wires.get(cell, set())
+        if signal in existing:
+            return 1
+        return 1 + len(existing) * penalty
+
+    open_set = [(heuristic(s, goal), 0, s) for s in {start, *sources}]
+    heapq.heapify(open_set)
+    came_from = {}
+    g_score = {s: 0 for s in {start, *sources}}
+    closed = set()
+    while open_set:
+        _, g, current = heapq.heappop(open_set)
+        if current in closed:
+            continue
+        if current == goal:
+            path = [current]
+            while current in came_from:
+                current = came_from[current]
+                path.append(current)
+            path.reverse()
+            return path
+        closed.add(current)
+        cx, cy = current
+        for neighbor in ((cx + step, cy), (cx - step, cy), (cx, cy + step), (cx, cy - step)):
+            if not (xmin <= neighbor[0] <= xmax and ymin <= neighbor[1] <= ymax):
+                continue
+            if neighbor in closed:
+                continue
+            move_cost = cost(neighbor)
+            if move_cost >= 1000000:
+                continue
+            tentative_g = g + move_cost
+            if neighbor not in g_score or tentative_g < g_score[neighbor]:
+                came_from[neighbor] = current
+                g_score[neighbor] = tentative_g
+                heapq.heappush(open_set, (tentative_g + heuristic(neighbor, goal), tentative_g, neighbor))
+    return None
+
+
+class TestGridAStar(unittest.TestCase):
+
+    def make_grid(self, seed):
+        rnd = random.Random(seed)
+        grid = OccupancyGrid(-100, 500, 0, 400, 20)
+        for _ in range(12):
+            x, y = rnd.randrange(-100, 500), rnd.randrange(0, 400)
+            grid.block_rect(x, y, x + rnd.randrange(20, 120), y + rnd.randrange(20, 120))
+        return grid, rnd
+
+    def random_cell(self, grid, rnd):
+        return grid.cell(rnd.randrange(len(grid)))
+
+    def check_against_reference(self, exempt, penalty):
+        for seed in range(6):
+            grid, rnd = self.make_grid(seed)
+            engine = GridAStar(grid, wire_penalty=penalty, exempt_ends=exempt)
+            wires = WireMap(grid)
+            bounds = (-60, 480, 0, 380)  # narrower than the grid
+            for net in range(25):
+                signal = rnd.randrange(6)
+                start, goal = self.random_cell(grid, rnd), self.random_cell(grid, rnd)
+                expected = reference_path(start, goal, grid, wires, signal, bounds, 20, penalty, exempt)
+                self.assertEqual(engine.find_path(start, goal, wires, signal, *bounds), expected,
+                                 (seed, net, start, goal))
+                for a, b in zip(expected or (), (expected or ())[1:]):
+                    wires.mark_segment(a, b, signal)
+            self.assertGreater(engine.expanded, 0)
+
+    def test_identical_to_reference(self):
+        self.check_against_reference(exempt=True, penalty=500)
+
+    def test_identical_to_reference_without_exemption(self):
+        self.check_against_reference(exempt=False, penalty=10)
+
+    def test_multi_source(self):
+        for seed in range(4):
+            grid, rnd = self.make_grid(seed)
+            engine = GridAStar(grid)
+            wires = WireMap(grid)
+            bounds = (-100, 500, 0, 400)
+            for _ in range(10):
+                sources = sorted({rnd.randrange(len(grid)) for _ in range(rnd.randrange(1, 40))})
+                signal = rnd.randrange(3)
+                goal = self.random_cell(grid, rnd)
+                cells = [grid.cell(i) for i in sources]
+                expected = reference_path(cells[0], goal, grid, wires, signal, bounds, 20, 500, True, cells)
+                self.assertEqual(engine.find_path_from(sources, goal, wires, signal, *bounds), expected)
+                for a, b in zip(expected or (), (expected or ())[1:]):
+                    wires.mark_segment(a, b, signal)
+
+    def test_off_grid_ends(self):
+        grid = OccupancyGrid(0, 100, 0, 100, 20)
+        engine = GridAStar(grid)
+        self.assertIsNone(engine.find_path((0, 0), (10, 0), None, 0, 0, 100, 0, 100))
+        self.assertEqual(engine.find_path((0, 0), (40, 0), None, 0, 0, 100, 0, 100),
+                         [(0, 0), (20, 0), (40, 0)])
+
+
+class TestWireMap(unittest.TestCase):
+
+    def test_segments_and_off_grid_points(self):
+        grid = OccupancyGrid(0, 100, 0, 100, 20)
+        wires = WireMap(grid)
+        wires.mark_segment((0, 40), (60, 40), 3)
+        wires.mark_segment((60, 40), (60, 0), 4)
+        wires.mark_segment((5, 7), (5, 27), 5)  # not on the lattice
+        self.assertEqual(set(wires.get((60, 40))), {3, 4})
+        self.assertEqual(wires.get((80, 40)), ())
+        self.assertEqual(set(wires.get((5, 27))), {5})
+        cells = dict(wires.items())
+        self.assertEqual(len(cells), 4 + 2 + 2)
+        self.assertEqual(set(cells[(20, 40)]), {3})
+
+    def test_paths_are_stored_as_runs(self):
+        grid = OccupancyGrid(0, 100, 0, 100, 20)
+        wires = WireMap(grid)
+        path = [(0, 40), (20, 40), (40, 40), (60, 40), (60, 20), (60, 0), (40, 0)]
+        wires.mark_points(path, 3)
+        self.assertEqual(wires.horizontal, {40: [(0, 60, 3)], 0: [(40, 60, 3)]})
+        self.assertEqual(wires.vertical, {60: [(0, 40, 3)]})
+        self.assertEqual(sum(1 for n in wires.cover if n), len(path))
+        self.assertEqual(wires.at(grid.index(20, 40)), {3: 1})
+        wires.unmark_points(path, 3)
+        self.assertEqual((wires.horizontal, wires.vertical), ({}, {}))
+        self.assertFalse(any(wires.cover))
+
+    def test_junctions(self):
+        wires = WireMap(OccupancyGrid(0, 100, 0, 100, 20))
+        wires.mark_points([(0, 40), (100, 40)], 3)
+        wires.mark_points([(40, 40), (40, 100)], 3)  # T on signal 3
+        wires.mark_points([(60, 0), (60, 100)], 4)   # crosses 3: no junction
+        self.assertEqual(wires.junctions(), [((40, 40), 3)])
+
+
+class TestRouterBackends(unittest.TestCase):
+
+    def problem(self, seed):
+        rnd = random.Random(seed)
+        blocks = [(rnd.randrange(0, 30) * 20, rnd.randrange(0, 30) * 20, 60, 80) for _ in range(10)]
+        nets = []
+        for _ in range(15):
+            sx, sy, sw, _ = rnd.choice(blocks)
+            dx, dy, _, _ = rnd.choice(blocks)
+            nets.append(Net((sx + sw, sy + 10), (dx, dy + 20), rnd.randrange(5)))
+        return blocks, nets
+
+    def route(self, name, blocks, nets):
+        router = get_router(name, 20)
+        bounds = (-100, 800, -100, 800)
+        occupancy = router.build_occupancy_grid(blocks, *bounds, margin=10)
+        return router.route(nets, occupancy, WireMap(occupancy), bounds)
+
+    def test_registry(self):
+        self.assertEqual(sorted(ROUTERS), ['astar', 'global', 'grid', 'manhattan', 'pathfinder', 'visibility'])
+        self.assertIsInstance(get_router('grid'), Router)
+        with self.assertRaises(ValueError):
+            get_router('nope')
+
+    def test_grid_matches_astar(self):
+        for seed in range(4):
+            blocks, nets = self.problem(seed)
+            self.assertEqual(self.route('grid', blocks, nets), self.route('astar', blocks, nets))
+
+    def test_segments_connect_ports(self):
+        blocks, nets = self.problem(7)
+        for name in ROUTERS:
+            for net, segments in zip(nets, self.route(name, blocks, nets)):
+                self.assertEqual(segments[0][0], net.src)
+                self.assertEqual(segments[-1][1], net.dst)
+                for (a, b), (c, _) in zip(segments, segments[1:]):
+                    self.assertEqual(b, c)
+                for (x1, y1), (x2, y2) in segments:
+                    self.assertTrue(x1 == x2 or y1 == y2)
+
+    def test_fixed_path_and_wire_marking(self):
+        router = get_router('grid', 20)
+        occupancy = router.build_occupancy_grid([], 0, 400, 0, 400)
+        wires = WireMap(occupancy)
+        net = Net((40, 100), (300, 200), 3, path=[(60, 100), (60, 300), (280, 300), (280, 200)])
+        segments = router.route_net(net, occupancy, wires, (0, 400, 0, 400))
+        self.assertEqual(segments, [((40, 100), (60, 100)), ((60, 100), (60, 300)),
+                                    ((60, 300), (280, 300)), ((280, 300), (280, 200)),
+                                    ((280, 200), (300, 200))])
+        self.assertEqual(set(wires.get((60, 200))), {3})
+
+    def test_search_windows(self):
+        router = get_router('grid', 20)
+        bounds = (0, 4000, 0, 4000)
+        # A wall longer than the first window: found in the second one
+        occupancy = router.build_occupancy_grid([(1100, 600, 20, 800)], *bounds, margin=0)
+        segments = router.route_net(Net((1000, 1000), (1300, 1000), 1), occupancy, WireMap(occupancy), bounds)
+        self.assertEqual(router.window_levels, {1: 1})
+        self.assertTrue(all(y < 600 or y > 1400 for (x, y), _ in segments if x == 1100))
+        # An enclosed port: every window fails, within the net's budget
+        router = get_router('grid', 20)
+        router.max_expansions = 3000
+        ring = [(1900, 1900, 200, 20), (1900, 2080, 200, 20), (1900, 1900, 20, 200), (2080, 1900, 20, 200)]
+        occupancy = router.build_occupancy_grid(ring, *bounds, margin=0)
+        router.route_net(Net((1000, 1000), (2020, 2000), 1), occupancy, WireMap(occupancy), bounds)
+        self.assertEqual(router.window_levels, {'failed': 1})
+        self.assertLessEqual(router.expanded, 3000)
+        # A small pocket is found without searching
+        router = get_router('grid', 20)
+        occupancy = router.build_occupancy_grid([(1960, 1960, 80, 80)], *bounds, margin=0)
+        occupancy.cells[occupancy.index(2000, 2000)] = 0
+        router.route_net(Net((1000, 1000), (2020, 2000), 1), occupancy, WireMap(occupancy), bounds)
+        self.assertEqual((router.window_levels, router.expanded), ({'enclosed': 1}, 0))
+
+    def test_buried_stub_moves_to_nearest_free_cell(self):
+        router = get_router('grid', 20)
+        bounds = (0, 1000, 0, 1000)
+        # The destination's stub lies deep inside another block
+        occupancy = router.build_occupancy_grid([(300, 300, 200, 200)], *bounds, margin=0)
+        self.assertEqual(router.find_free_cell((380, 400), occupancy), (300 - 20, 400))
+        self.assertEqual(router.find_free_cell((-55, 1200), occupancy), (0, 1000))
+        net = Net((100, 100), (400, 400), 1)
+        self.assertEqual(router.stubs(net, occupancy), ((120, 100), (280, 400)))
+        segments = router.route_net(net, occupancy, WireMap(occupancy), bounds)
+        self.assertEqual(router.window_levels, {0: 1})
+        # Searched to the free cell, then straight in to the port
+        (x, y), end = segments[-1]
+        self.assertEqual((y, end), (400, (400, 400)))
+        self.assertLessEqual(x, 280)
+
+    def test_manhattan_ignores_obstacles(self):
+        router = get_router('manhattan', 20)
+        occupancy = router.build_occupancy_grid([(100, 0, 100, 400)], 0, 400, 0, 400)
+        segments = router.route_net(Net((0, 40), (380, 300), 1), occupancy, WireMap(occupancy),
+                                    (0, 400, 0, 400))
+        self.assertEqual(segments, [((0, 40), (180, 40)), ((180, 40), (180, 300)), ((180, 300), (380, 300))])
+
+
+class TestVisibilityRouter(unittest.TestCase):
+
+    def test_detours_around_a_block(self):
+        router = get_router('visibility', 20)
+        bounds = (0, 1000, 0, 1000)
+        occupancy = router.build_occupancy_grid([(400, 300, 100, 300)], *bounds, margin=10)
+        segments = router.route_net(Net((100, 400), (800, 400), 1), occupancy, WireMap(occupancy), bounds)
+        self.assertEqual(segments, [((100, 400), (380, 400)), ((380, 400), (380, 280)), ((380, 280), (780, 280)),
+                                    ((780, 280), (780, 400)), ((780, 400), (800, 400))])
+        self.assertLess(router.expanded, 10)
+
+    def test_routes_stay_on_free_cells(self):
+        blocks, nets = TestRouterBackends().problem(3)
+        for name in ('grid', 'visibility'):
+            router = get_router(name, 20)
+            bounds = (-100, 800, -100, 800)
+            occupancy = router.build_occupancy_grid(blocks, *bounds, margin=10)
+            wires = WireMap(occupancy)
+            for net in nets:
+                router.route_net(net, occupancy, wires, bounds)
+            if name == 'grid':
+                grid_expanded = router.expanded
+        self.assertLess(router.expanded, grid_expanded)
+        for net in nets:
+            start_stub, goal_stub = router.stubs(net)
+            wires = WireMap(occupancy)
+            path = router.find_path(start_stub, goal_stub, occupancy, wires, net.signal, *bounds)
+            if path is None:
+                continue
+            wires.mark_points(path, net.signal)
+            inner = {cell for cell, _ in wires.items()} - {start_stub, goal_stub}
+            self.assertFalse(any(occupancy[cell] for cell in inner))
+
+
+class TestGlobalRouting(unittest.TestCase):
+
+    def test_tile_capacity_and_usage(self):
+        grid = OccupancyGrid(0, 990, 0, 990, 10)  # 100 x 100 cells, 10 x 10 tiles
+        grid.block_rect(0, 0, 99, 99)
+        grid.block_rect(100, 0, 149, 99)
+        tiles = TileGrid(grid, 10)
+        self.assertEqual((tiles.capacity[0], tiles.capacity[10], tiles.capacity[20]), (0.0, 5.0, 10.0))
+        wires = WireMap(grid)
+        points = [(200, 20), (200, 300), (500, 300)]
+        wires.mark_points(points, 1)
+        tiles.add_points(points)
+        added = list(tiles.usage)
+        tiles.count_wires(wires)
+        self.assertEqual(tiles.usage, added)
+        self.assertAlmostEqual(sum(added), 59 / 10)
+
+    def test_tile_route_avoids_congestion(self):
+        tiles = TileGrid(OccupancyGrid(0, 990, 0, 990, 10), 10)
+        self.assertEqual(tiles.route(2, 82, (0, 9, 0, 9), 4.0), [2, 12, 22, 32, 42, 52, 62, 72, 82])
+        tiles.usage[42] = 10.0
+        chain = tiles.route(2, 82, (0, 9, 0, 9), 4.0)
+        self.assertNotIn(42, chain)
+        self.assertEqual(len(chain), 11)
+        mask = tiles.corridor(chain, 1)
+        self.assertTrue(all(mask[t] for t in chain))
+        self.assertEqual(mask[45], 0)
+
+    def test_routes_stay_in_corridor(self):
+        router = get_router('global', 20)
+        router.tile_size = 5
+        blocks, nets = TestRouterBackends().problem(5)
+        bounds = (-100, 800, -100, 800)
+        occupancy = router.build_occupancy_grid(blocks, *bounds, margin=10)
+        wires = WireMap(occupancy)
+        for net in nets:
+            router.route_net(net, occupancy, wires, bounds)
+        self.assertEqual(router.corridor_misses, 0)
+        tiles = router.tile_grid(occupancy, wires)
+        start_stub, goal_stub = router.stubs(nets[0])
+        s, t = occupancy.index(*start_stub), occupancy.index(*goal_stub)
+        chain = tiles.route(tiles.tile(s), tiles.tile(t), (0, tiles.cols - 1, 0, tiles.rows - 1), 4.0)
+        mask = tiles.corridor(chain, router.corridor_margin)
+        path = router.find_path(start_stub, goal_stub, occupancy, wires, nets[0].signal, *bounds)
+        self.assertTrue(all(mask[tiles.tile(occupancy.index(*p))] for p in path))
+
+
+class TestRouteSession(unittest.TestCase):
+
+    def setUp(self):
+        self.router = get_router('grid', 20)
+        self.bounds = (-100, 800, -100, 800)
+        rnd = random.Random(3)
+        self.blocks = [(rnd.randrange(0, 30) * 20, rnd.randrange(0, 30) * 20, 60, 80) for _ in range(12)]
+        self.nets = []
+        for _ in range(20):
+            sx, sy, sw, _ = rnd.choice(self.blocks)
+            dx, dy, _, _ = rnd.choice(self.blocks)
+            self.nets.append(Net((sx + sw, sy + 10), (dx, dy + 20), rnd.randrange(5)))
+        self.keys = list(range(len(self.nets)))
+
+    def route(self, session, rects):
+        occupancy = OccupancyGrid(*self.bounds, 20)
+        for rect in rects:
+            occupancy.block_rect(*rect)
+        return session.route(self.router, self.keys, self.nets, occupancy, rects, self.bounds)
+
+    def rects(self, blocks):
+        return [(x - 10, y - 10, x + w + 10, y + h + 10) for x, y, w, h in blocks]
+
+    def test_unchanged_keeps_everything(self):
+        session = RouteSession()
+        first = self.route(session, self.rects(self.blocks))
+        self.assertEqual(session.rerouted, len(self.nets))
+        # Same result as routing from scratch
+        occupancy = self.router.build_occupancy_grid(self.blocks, *self.bounds, margin=10)
+        self.assertEqual(first, self.router.route(self.nets, occupancy, WireMap(occupancy), self.bounds))
+        self.assertEqual(self.route(session, self.rects(self.blocks)), first)
+        self.assertEqual((session.kept, session.rerouted), (len(self.nets), 0))
+
+    def test_progressive_routing(self):
+        rects = self.rects(self.blocks)
+        expected = self.route(RouteSession(), rects)
+        session = RouteSession()
+        occupancy = OccupancyGrid(*self.bounds, 20)
+        for rect in rects:
+            occupancy.block_rect(*rect)
+        previews = session.begin(self.router, self.keys, self.nets, occupancy, rects, self.bounds)
+        self.assertEqual(session.pending, len(self.nets))
+        start_stub, goal_stub = self.router.stubs(self.nets[0])
+        manhattan = self.router.full_points(self.nets[0], start_stub, self.router.manhattan(start_stub, goal_stub))
+        self.assertEqual(previews[0], self.router.segments(manhattan))
+        done = session.step(0)  # one net per step with no time to spare
+        self.assertEqual(done, [0])
+        self.assertEqual(session.routes[0], expected[0])
+        # Starting over mid-way keeps the nets routed so far
+        self.route(session, rects)
+        self.assertEqual((session.kept, session.rerouted), (1, len(self.nets) - 1))
+        self.assertEqual(session.routes, expected)
+        self.assertEqual(session.pending, 0)
+
+    def test_only_crossing_nets_are_rerouted(self):
+        session = RouteSession()
+        first = self.route(session, self.rects(self.blocks))
+        # A new obstacle in free space that some routes run through
+        new_rect = (300, 300, 360, 360)
+        crossing = {i for i, segments in enumerate(first)
+                    if any(min(a[0], b[0]) <= 360 and max(a[0], b[0]) >= 300
+                           and min(a[1], b[1]) <= 360 and max(a[1], b[1]) >= 300 for a, b in segments)}
+        self.assertTrue(crossing)
+        second = self.route(session, self.rects(self.blocks) + [new_rect])
+        self.assertEqual(session.rerouted, len(crossing))
+        for i, (old, new) in enumerate(zip(first, second)):
+            if i not in crossing:
+                self.assertIs(old, new)
+
+        # The wire map holds exactly the current routes
+        expected = WireMap(session.wires.grid)
+        for record in session.records.values():
+            expected.mark_points(record.points, record.net.signal)
+        self.assertEqual(dict(session.wires.items()), dict(expected.items()))
+
+    def test_changed_net_and_router_reroute(self):
+        session = RouteSession()
+        rects = self.rects(self.blocks)
+        self.route(session, rects)
+        net = self.nets[4]
+        self.nets[4] = net._replace(path=[(net.src[0] + 20, net.src[1]), (net.dst[0] - 20, net.src[1]),
+                                          (net.dst[0] - 20, net.dst[1] // 20 * 20)])
+        self.route(session, rects)
+        self.assertEqual(session.rerouted, 1)
+        self.router = get_router('grid', 20)
+        self.route(session, rects)
+        self.assertEqual(session.rerouted, len(self.nets))
+
+    def test_cache_reuses_routes_after_undo(self):
+        # Whole-grid searches: in a small window a net rerouted around the
+        # moved block may settle clear of both positions and be kept
+        self.router.window_margin = None
+        session = RouteSession()
+        rects = self.rects(self.blocks)
+        first = self.route(session, rects)
+        expanded = self.router.expanded
+        self.assertEqual(self.route(session, rects), first)
+        self.assertEqual(self.router.expanded, expanded)  # no pathfinding
+
+        moved = list(self.blocks)
+        x, y, w, h = moved[0]
+        moved[0] = (x + 100, y + 60, w, h)
+        detours = self.route(session, self.rects(moved))
+        self.assertGreater(session.rerouted, 0)
+        expanded = self.router.expanded
+        undone = self.route(session, rects)
+        self.assertEqual((session.kept + session.reused, session.rerouted), (len(self.nets), 0))
+        self.assertEqual(self.router.expanded, expanded)
+        # Nets not restored as they were are detours kept from the moved
+        # layout (RouteSession does not re-optimize kept routes); those must
+        # stay clear of both spots of the block
+        spots = self.rects([self.blocks[0], moved[0]])
+        for old, detour, route in zip(first, detours, undone):
+            if route != old:
+                self.assertEqual(route, detour)
+                self.assertFalse(any(_crosses(route, rect) for rect in spots))
+
+    def test_undo_restores_every_route(self):
+        self.router.window_margin = None
+        session = RouteSession()
+        rects = self.rects(self.blocks)
+        first = self.route(session, rects)
+        # A block none of whose displaced nets settles clear of both spots
+        moved = list(self.blocks)
+        x, y, w, h = moved[1]
+        moved[1] = (x + 100, y + 60, w, h)
+        self.route(session, self.rects(moved))
+        self.assertGreater(session.rerouted, 0)
+        expanded = self.router.expanded
+        self.assertEqual(self.route(session, rects), first)
+        self.assertEqual((session.kept + session.reused, session.rerouted), (len(self.nets), 0))
+        self.assertEqual(self.router.expanded, expanded)
+
+    def test_buried_stubs_are_routed(self):
+        # The output's stub cell lies deep inside the block next to it
+        blocks = [(100, 100, 60, 80), (180, 60, 200, 200)]
+        net = Net((160, 120), (600, 400), 1)
+        rects = self.rects(blocks)
+        occupancy = OccupancyGrid(*self.bounds, 20)
+        for rect in rects:
+            occupancy.block_rect(*rect)
+        self.assertTrue(occupancy[self.router.stubs(net)[0]])
+        [route] = RouteSession().route(self.router, ['n'], [net], occupancy, rects, self.bounds)
+        for stub in self.router.stubs(net, occupancy):
+            self.assertFalse(occupancy[stub])
+            self.assertTrue(any(_crosses([segment], (*stub, *stub)) for segment in route))
+
+    def test_cache_fingerprint_and_lru(self):
+        cache = RouteCache(size=2)
+        net = Net((0, 0), (100, 0), 1)
+        record = RouteRecord(net, [(0, 0), (100, 0)], [((0, 0), (100, 0))], (0, 0, 100, 0))
+        near, far = (40, 20, 60, 40), (500, 500, 600, 600)
+        cache.put(['a'], [record], [near, far], 20)
+        self.assertEqual(cache.get(['a'], [net], [far, near], 20), [record])
+        self.assertEqual(cache.get(['a'], [net], [near], 20), [record])  # far away: irrelevant
+        self.assertIsNone(cache.get(['a'], [net], [far], 20))
+        self.assertIsNone(cache.get(['a'], [net._replace(dst=(120, 0))], [near], 20))
+        cache.put(['b'], [record], [], 20)
+        cache.get(['a'], [net], [near], 20)
+        cache.put(['c'], [record], [], 20)  # evicts 'b', the least recently used
+        self.assertIsNotNone(cache.get(['a'], [net], [near], 20))
+        self.assertIsNone(cache.get(['b'], [net], [], 20))
+
+    def test_wire_counts(self):
+        wires = WireMap(OccupancyGrid(0, 100, 0, 100, 20))
+        wires.mark_points([(0, 40), (60, 40)], 3)
+        wires.mark_points([(20, 40), (20, 0)], 3)
+        wires.unmark_points([(0, 40), (60, 40)], 3)
+        self.assertEqual(set(wires.get((20, 40))), {3})
+        self.assertEqual(wires.get((40, 40)), ())
+
+
+class TestSteinerRouting(unittest.TestCase):
+
+    def fanout(self, sinks=12):
+        """One source block feeding a column of sink blocks."""
+        blocks = [(0, 200, 60, 80)] + [(300 + (i % 2) * 160, i * 100, 60, 80) for i in range(sinks)]
+        rects = [(x - 10, y - 10, x + w + 10, y + h + 10) for x, y, w, h in blocks]
+        nets = [Net((60, 220), (x, y + 20), 7) for x, y, _, _ in blocks[1:]]
+        bounds = (-200, 800, -200, 100 * sinks + 200)
+        occupancy = OccupancyGrid(*bounds, 20)
+        for rect in rects:
+            occupancy.block_rect(*rect)
+        return list(range(sinks)), nets, occupancy, rects, bounds
+
+    def test_tree_connects_every_sink(self):
+        results = {}
+        for trees in (False, True):
+            router = get_router('grid', 20)
+            session = RouteSession()
+            keys, nets, occupancy, rects, bounds = problem = self.fanout()
+            routes = session.route(router, *problem, trees=trees)
+            for net, segments in zip(nets, routes):
+                self.assertEqual(segments[0][0], net.src)
+                self.assertEqual(segments[-1][1], net.dst)
+                for (a, b), (c, _) in zip(segments, segments[1:]):
+                    self.assertEqual(b, c)
+                for (x1, y1), (x2, y2) in segments:
+                    self.assertTrue(x1 == x2 or y1 == y2)
+            results[trees] = router.expanded, sum(1 for _ in session.wires.items())
+        # Branches are short searches from the tree, and share its wires
+        self.assertLess(results[True][0], results[False][0] / 2)
+        self.assertLessEqual(results[True][1], results[False][1])
+
+    def test_tree_is_rerouted_whole(self):
+        session = RouteSession()
+        router = get_router('grid', 20)
+        keys, nets, occupancy, rects, bounds = self.fanout()
+        session.route(router, keys, nets, occupancy, rects, bounds, trees=True)
+        self.assertEqual(session.route(router, keys, nets, occupancy, rects, bounds, trees=True),
+                         [r.segments for r in session.records.values()])
+        self.assertEqual(session.rerouted, 0)
+
+        # Drop one sink: the rest of its tree is rerouted, and the wire map
+        # still matches the routes exactly
+        session.route(router, keys[:-1], nets[:-1], occupancy, rects, bounds, trees=True)
+        self.assertEqual(session.rerouted, len(nets) - 1)
+        expected = WireMap(occupancy)
+        for record in session.records.values():
+            expected.mark_points(record.points, record.net.signal)
+        self.assertEqual(dict(session.wires.items()), dict(expected.items()))
+
+        # Bring it back: it branches off the tree that is there
+        session.route(router, keys, nets, occupancy, rects, bounds, trees=True)
+        self.assertEqual((session.kept, session.rerouted), (len(nets) - 1, 1))
+
+    def test_tree_chain(self):
+        grid = OccupancyGrid(0, 200, 0, 200, 20)
+        tree = SteinerTree(grid)
+        branch = [(100, 40), (100, 100), (140, 100)]
+        tree.add_routes([[(0, 40), (100, 40), (100, 0)], branch])
+        self.assertEqual(tree.chain((140, 100))[:7],
+                         [(0, 40), (20, 40), (40, 40), (60, 40), (80, 40), (100, 40), (100, 60)])
+        self.assertEqual(tree.chain((140, 100))[-1], (140, 100))
+        self.assertEqual(tree.indices, sorted(grid.index(*p) for p in tree.parent))
+
+
+class TestPathFinder(unittest.TestCase):
+
+    def problem(self, seed):
+        """Blocks on an array, nets between distinct pins of nearby blocks."""
+        rnd = random.Random(seed)
+        blocks = [(c * 200, r * 200, 80, 120) for c in range(4) for r in range(4)]
+        nets, used = [], set()
+        while len(nets) < 30:
+            sx, sy, sw, sh = rnd.choice(blocks)
+            dx, dy, _, dh = rnd.choice(blocks)
+            src, dst = (sx + sw, sy + rnd.randrange(1, 6) * 20), (dx, dy + rnd.randrange(1, 6) * 20)
+            if not used & {src, dst}:
+                used |= {src, dst}
+                nets.append(Net(src, dst, len(nets) // 2))
+        return blocks, nets
+
+    def route(self, blocks, nets, **kwargs):
+        router = PathFinderRouter(20, **kwargs)
+        router.min_parallel_nets = 1
+        self.addCleanup(router.close)
+        bounds = (-200, 900, -200, 900)
+        occupancy = router.build_occupancy_grid(blocks, *bounds, margin=10)
+        return router, router.route(nets, occupancy, WireMap(occupancy), bounds)
+
+    def test_no_overlapping_wires(self):
+        blocks, nets = self.problem(1)
+        router, routes = self.route(blocks, nets, workers=1)
+        self.assertEqual(router.conflicts, 0)
+        owners = {}
+        for net, segments in zip(nets, routes):
+            for (x1, y1), (x2, y2) in segments:
+                dx, dy = (x2 > x1) - (x2 < x1), (y2 > y1) - (y2 < y1)
+                for i in range(max(abs(x2 - x1), abs(y2 - y1)) // 20):
+                    a = (x1 + dx * 20 * i, y1 + dy * 20 * i)
+                    b = (a[0] + dx * 20, a[1] + dy * 20)
+                    owners.setdefault(frozenset((a, b)), set()).add(net.signal)
+        self.assertTrue(all(len(signals) == 1 for signals in owners.values()))
+
+    def test_routes_do_not_depend_on_workers(self):
+        blocks, nets = self.problem(2)
+        _, one = self.route(blocks, nets, workers=1)
+        _, two = self.route(blocks, nets, workers=2)
+        self.assertEqual(one, two)
+
+    def test_searches_are_counted_and_windowed(self):
+        blocks, nets = self.problem(1)
+        router, _ = self.route(blocks, nets, workers=1)
+        self.assertGreater(router.expanded, 0)
+        self.assertGreaterEqual(router.pushes, router.expanded)
+        self.assertGreater(router.window_levels[0], 0)
+
+    def test_find_path_routes_one_net(self):
+        router = PathFinderRouter(20)
+        occupancy = router.build_occupancy_grid([(100, 0, 80, 120)], 0, 400, -100, 300, margin=10)
+        wires = WireMap(occupancy)
+        path = router.find_path((60, 60), (240, 60), occupancy, wires, 0, 0, 400, -100, 300)
+        self.assertEqual((path[0], path[-1]), ((60, 60), (240, 60)))
+        self.assertFalse(any(occupancy[p] for p in path))
+        self.assertTrue(all(abs(a[0] - b[0]) + abs(a[1] - b[1]) == 20 for a, b in zip(path, path[1:])))
+        expanded = router.expanded
+        self.assertIsNone(router.find_path((60, 60), (240, 60), occupancy, wires, 0, 0, 400, -100, 300, limit=5))
+        self.assertEqual(router.expanded - expanded, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+
+from vhdl_diagramer.models import Port
+from vhdl_diagramer.parser import VHDLParser
+from vhdl_diagramer.symbols import SymbolTable
+
+DESIGN = """
+ENTITY top IS PORT(clk : IN STD_LOGIC; q : OUT STD_LOGIC); END ENTITY;
+ARCHITECTURE rtl OF top IS
+    SIGNAL s0, s1 : STD_LOGIC;
+BEGIN
+    q <= s1;
+    u0: entity work.cell port map(a => clk, y => s0);
+    u1: entity work.cell port map(a => s0, y => s1);
+END ARCHITECTURE rtl;
+"""
+
+
+class TestSymbolTable(unittest.TestCase):
+
+    def test_dense_ids(self):
+        table = SymbolTable()
+        self.assertEqual([table.intern(s) for s in ('a', 'b', 'a', 'c')], [0, 1, 0, 2])
+        self.assertEqual(len(table), 3)
+        self.assertEqual(table.name(1), 'b')
+        self.assertEqual(table.get('missing'), -1)
+        self.assertEqual(len(table), 3)
+
+    def test_bind_fixes_missing_and_stale_ids(self):
+        table = SymbolTable()
+        port = Port(name='a', direction='IN', signal='x')
+        self.assertEqual(table.bind(port), 0)
+        self.assertEqual(port.signal_id, 0)
+        port.signal = 'y'  # renamed after interning
+        self.assertEqual(table.bind(port), 1)
+        self.assertEqual(port.signal_id, 1)
+
+
+class TestParserSymbols(unittest.TestCase):
+
+    def test_ports_carry_ids(self):
+        parser = VHDLParser(DESIGN)
+        parser.parse()
+        symbols = parser.symbols
+        u0, u1 = parser.instances
+        self.assertEqual(u0.ports[1].signal_id, u1.ports[0].signal_id)
+        for inst in parser.instances:
+            for port in inst.ports:
+                self.assertEqual(symbols.name(port.signal_id), port.signal)
+        for port in parser.top_level_ports:
+            self.assertEqual(symbols.name(port.signal_id), port.name)
+        for dest, src in parser.assignments:
+            self.assertNotEqual(symbols.get(dest), -1)
+            self.assertNotEqual(symbols.get(src), -1)
+
+    def test_reparse_shares_table(self):
+        first = VHDLParser(DESIGN)
+        first.parse()
+        second = VHDLParser(DESIGN.replace('a => s0', 'a => s9'), previous=first)
+        second.parse()
+        self.assertIs(second.symbols, first.symbols)
+        self.assertIs(second.instances[0], first.instances[0])
+        self.assertEqual(second.symbols.name(second.instances[1].ports[0].signal_id), 's9')
+
+    def test_reparse_into_copy_leaves_table_alone(self):
+        first = VHDLParser(DESIGN)
+        first.parse()
+        names = list(first.symbols.strings)
+        second = VHDLParser(DESIGN.replace('a => s0', 'a => s9'), previous=first,
+                            symbols=first.symbols.copy())
+        second.parse()
+        self.assertEqual(first.symbols.strings, names)
+        self.assertIs(second.instances[0], first.instances[0])
+        for inst in second.instances:
+            for port in inst.ports:
+                self.assertEqual(second.symbols.name(port.signal_id), port.signal)
+
+    def test_adopted_instances_are_rebound(self):
+        first = VHDLParser(DESIGN)
+        first.parse()
+        second = VHDLParser(DESIGN.replace('a => s0', 'a => s9'))
+        second.parse()
+        second.adopt_unchanged(first)
+        for inst in second.instances:
+            for port in inst.ports:
+                self.assertEqual(second.symbols.name(port.signal_id), port.signal)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import threading
+import unittest
+
+from vhdl_diagramer.parser import PROGRESS_INTERVAL, VHDLParser
+from vhdl_diagramer.tasks import BackgroundTask, TaskCancelled
+
+
+def _design(n):
+    return ("ARCHITECTURE rtl OF top IS BEGIN\n"
+            + "\n".join(f"u{i}: entity work.cell port map(a => s{i});" for i in range(n))
+            + "\nEND ARCHITECTURE rtl;\n")
+
+
+class TestBackgroundTask(unittest.TestCase):
+
+    def test_result_and_progress(self):
+        def work(report):
+            report('half', 0.5)
+            report('all', 1.0)
+            return 42
+        task = BackgroundTask(work).start()
+        self.assertTrue(task.wait(5))
+        self.assertEqual(task.result, 42)
+        self.assertEqual(task.poll(), [('half', 0.5), ('all', 1.0)])
+        self.assertEqual(task.poll(), [])
+        self.assertFalse(task.cancelled)
+
+    def test_error_is_captured(self):
+        def work(report):
+            raise ValueError('bad input')
+        task = BackgroundTask(work).start()
+        task.wait(5)
+        self.assertIsInstance(task.error, ValueError)
+
+    def test_cancel_stops_at_next_report(self):
+        started = threading.Event()
+        resume = threading.Event()
+        steps = []
+
+        def work(report):
+            started.set()
+            resume.wait(5)
+            for i in range(100):
+                report('step', i / 100)
+                steps.append(i)
+            return 'finished'
+
+        task = BackgroundTask(work).start()
+        started.wait(5)
+        task.cancel()
+        resume.set()
+        task.wait(5)
+        self.assertTrue(task.cancelled)
+        self.assertIsNone(task.result)
+        self.assertEqual(steps, [])
+
+    def test_cancel_aborts_parser(self):
+        parser = VHDLParser(_design(PROGRESS_INTERVAL * 4))
+        seen = []
+
+        def progress(stage, fraction):
+            seen.append(stage)
+            if fraction > 0.5:
+                raise TaskCancelled()
+
+        with self.assertRaises(TaskCancelled):
+            parser.parse(progress)
+        self.assertLess(len(parser.instances), PROGRESS_INTERVAL * 4)
+        self.assertEqual(seen[:3], ['Lexing', 'Declarations', 'Instances'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+
+from vhdl_diagramer.routeworker import RouteSnapshot
+from vhdl_diagramer.routing import Net, OccupancyGrid, RouteSession, get_router
+from vhdl_diagramer.trace import TraceRecorder, read_trace, replay
+
+
+def _snapshot(shift=0):
+    blocks = [(0, 0, 80, 120), (200 + shift, 40, 80, 120), (400, 0, 80, 120)]
+    obstacles = tuple((x - 10, y - 10, x + w + 10, y + h + 10) for x, y, w, h in blocks)
+    obstacles += ((512.5, -5, 717.5, 35),)  # a pin hitbox off the grid
+    nets = (Net((80, 40), (200 + shift, 80), 0),
+            Net((80, 60), (400, 40), 1),
+            Net((280 + shift, 80), (400, 60), 0, [(300, 80), (300, 60)]))
+    keys = (('u0', 'y', 'u1', 'a'), ('u0', 'z', 'u2', 'a'), ('u1', 'y', 'u2', 'b'))
+    return RouteSnapshot(0, 'grid', 20, True, 0, keys, nets, obstacles, (-100, 600, -100, 300))
+
+
+class TestTrace(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.trace')
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_round_trip_skips_repeats(self):
+        with TraceRecorder(self.path) as trace:
+            self.assertTrue(trace.record(_snapshot()))
+            self.assertFalse(trace.record(_snapshot()._replace(version=5)))
+            self.assertTrue(trace.record(_snapshot(40)))
+        frames = list(read_trace(self.path))
+        self.assertEqual(frames, [_snapshot(), _snapshot(40)._replace(version=1)])
+
+    def test_truncated_trace_keeps_complete_frames(self):
+        with TraceRecorder(self.path) as trace:
+            trace.record(_snapshot())
+            trace.record(_snapshot(40))
+        with open(self.path, 'r+b') as f:
+            f.truncate(os.path.getsize(self.path) - 3)
+        self.assertEqual(list(read_trace(self.path)), [_snapshot()])
+
+    def test_not_a_trace(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'not a trace at all')
+        with self.assertRaises(ValueError):
+            list(read_trace(self.path))
+
+    def test_replay_routes_like_a_session(self):
+        snapshots = [_snapshot(), _snapshot(40)]
+        session = RouteSession()
+        router = get_router('grid', 20)
+        expected = []
+        for snapshot in snapshots:
+            occupancy = OccupancyGrid(*snapshot.bounds, snapshot.grid_step)
+            for rect in snapshot.obstacles:
+                occupancy.block_rect(*rect)
+            expected.append(session.route(router, list(snapshot.keys), list(snapshot.nets), occupancy,
+                                          list(snapshot.obstacles), snapshot.bounds, trees=True))
+        frames = list(replay(snapshots))
+        self.assertEqual([frame.routes for frame in frames], expected)
+        self.assertGreater(frames[0].expanded, 0)
+        self.assertGreaterEqual(frames[0].pushes, frames[0].expanded)
+        self.assertEqual([frame.expanded for frame in replay(snapshots, 'manhattan')], [0, 0])
+
+
+if __name__ == '__main__':
+    unittest.main()
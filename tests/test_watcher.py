@@ -0,0 +1,97 @@
+import os
+import tempfile
+import unittest
+
+from vhdl_diagramer.models import EntityDecl
+from vhdl_diagramer.project import EntityLibrary
+from vhdl_diagramer.watcher import FileWatcher
+
+
+class TestFileWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.paths = []
+        for i in range(10):
+            path = os.path.join(self.tmp.name, f'f{i}.vhd')
+            with open(path, 'w') as f:
+                f.write('-- v1\n')
+            self.paths.append(path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def touch(self, path, text, mtime_ns):
+        with open(path, 'w') as f:
+            f.write(text)
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+    def test_change_is_reported_after_debounce(self):
+        watcher = FileWatcher(self.paths, debounce=1.0, stats_per_tick=100)
+        self.assertEqual(watcher.tick(0.0), 10)
+        self.assertEqual(watcher.poll(), [])
+
+        self.touch(self.paths[3], '-- v2\n', 10**9)
+        watcher.tick(1.0)   # change seen
+        watcher.tick(1.5)   # still settling
+        self.assertEqual(watcher.poll(), [])
+        self.touch(self.paths[3], '-- v3, longer\n', 2 * 10**9)
+        watcher.tick(1.9)   # changed again: debounce restarts
+        watcher.tick(2.5)
+        self.assertEqual(watcher.poll(), [])
+        watcher.tick(3.0)
+        self.assertEqual(watcher.poll(), [self.paths[3]])
+        watcher.tick(4.0)
+        self.assertEqual(watcher.poll(), [])
+
+    def test_stats_per_tick_is_bounded(self):
+        watcher = FileWatcher(self.paths, debounce=0.0, stats_per_tick=3)
+        self.assertEqual(watcher.tick(0.0), 3)
+        # A change to the last file is found once the round-robin reaches it
+        self.touch(self.paths[9], '-- v2\n', 10**9)
+        seen = []
+        for t in range(1, 6):
+            self.assertLessEqual(watcher.tick(float(t)), 3)
+            seen += watcher.poll()
+        self.assertEqual(seen, [self.paths[9]])
+
+    def test_missing_file_waits_for_recreation(self):
+        watcher = FileWatcher(self.paths[:1], debounce=0.0)
+        os.remove(self.paths[0])
+        watcher.tick(0.0)
+        watcher.tick(1.0)
+        self.assertEqual(watcher.poll(), [])
+        self.touch(self.paths[0], '-- back\n', 10**9)
+        watcher.tick(2.0)
+        watcher.tick(3.0)
+        self.assertEqual(watcher.poll(), [self.paths[0]])
+
+    def test_thread(self):
+        watcher = FileWatcher(self.paths[:1], interval=0.01, debounce=0.0).start()
+        try:
+            self.touch(self.paths[0], '-- v2\n', 10**9)
+            for _ in range(500):
+                if watcher.poll():
+                    break
+                watcher._stop.wait(0.01)
+            else:
+                self.fail('change not reported')
+        finally:
+            watcher.stop()
+
+
+class TestLibraryReplaceFile(unittest.TestCase):
+
+    def test_replace_file(self):
+        library = EntityLibrary()
+        library.add(EntityDecl('a', source='x.vhd'))
+        library.add(EntityDecl('b', source='x.vhd'))
+        library.add(EntityDecl('c', source='y.vhd'))
+        library.errors['x.vhd'] = 'old error'
+        library.replace_file('x.vhd', [EntityDecl('b', source='x.vhd'), EntityDecl('d', source='x.vhd')])
+        self.assertEqual(sorted(library.entities), ['b', 'c', 'd'])
+        self.assertEqual(library.errors, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
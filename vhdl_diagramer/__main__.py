@@ -12,11 +12,14 @@ import sys
 def main():
     parser = argparse.ArgumentParser(description='VHDL Diagrammer')
     parser.add_argument('--debug', action='store_true', help='Enable debug output')
+    parser.add_argument('--trace-routing', metavar='FILE', help='Record every routing request to FILE')
     args = parser.parse_args()
     
     if args.debug:
         config.DEBUG = True
         print("Debug mode enabled")
+    if args.trace_routing:
+        config.ROUTE_TRACE = args.trace_routing
 
     print("VHDL Diagramer running!")
 
@@ -0,0 +1,135 @@
+# ============================================================================
+# cache.py - Persistent on-disk cache of parse results
+# ============================================================================
+
+import hashlib
+import os
+import pickle
+
+from typing import Callable, Optional
+
+from .parser import PARSER_VERSION, VHDLParser
+
+CACHE_DIR = os.path.expanduser("~/.vhdl_diagrammer_cache")
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Parser attributes that make up a parse result.
+RESULT_FIELDS = ('instances', 'signals', 'variables', 'constants',
+                 'top_level_ports', 'assignments', 'entities', 'components', 'port_modes',
+                 'statement_keys', 'symbols')
+
+
+class ParseCache:
+    """Content-addressed cache of VHDLParser results.
+
+    Entries are pickle files named by the SHA-256 of the parser version and
+    the source text, so an edited file or a newer parser simply misses. A hit
+    refreshes the entry's mtime; when the directory grows past `max_bytes`
+    the entries with the oldest mtime are deleted first (LRU).
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, vhdl_text: str) -> str:
+        h = hashlib.sha256(f"vhdl-diagramer-parser-{PARSER_VERSION}\0".encode())
+        h.update(vhdl_text.encode('utf-8', errors='surrogatepass'))
+        return h.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + '.pickle')
+
+    def get(self, vhdl_text: str) -> Optional[VHDLParser]:
+        """Return a parser filled from the cache, or None on a miss."""
+        path = self._path(self.key(vhdl_text))
+        try:
+            with open(path, 'rb') as f:
+                result = pickle.load(f)
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            # Truncated or stale entry: drop it and parse again.
+            print(f"Discarding unreadable cache entry {path}: {e}")
+            self._remove(path)
+            return None
+        parser = VHDLParser(vhdl_text)
+        for name in RESULT_FIELDS:
+            setattr(parser, name, result[name])
+        return parser
+
+    def put(self, parser: VHDLParser) -> None:
+        """Store a parsed result and evict old entries if over the size cap."""
+        result = {name: getattr(parser, name) for name in RESULT_FIELDS}
+        path = self._path(self.key(parser.text))
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp, 'wb') as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Error writing parse cache: {e}")
+            self._remove(tmp)
+            return
+        self.evict()
+
+    def parse(self, vhdl_text: str,
+              progress: Optional[Callable[[str, float], None]] = None) -> VHDLParser:
+        """Parse vhdl_text, reusing a cached result when one exists."""
+        parser = self.get(vhdl_text)
+        if parser is not None:
+            self.hits += 1
+            return parser
+        self.misses += 1
+        parser = VHDLParser(vhdl_text)
+        parser.parse(progress)
+        self.put(parser)
+        return parser
+
+    def evict(self) -> None:
+        """Delete least recently used entries until the cache fits max_bytes."""
+        entries = []
+        total = 0
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if not entry.name.endswith('.pickle'):
+                        continue
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime_ns, entry.path, st.st_size))
+                    total += st.st_size
+        except OSError:
+            return
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, path, size in entries:
+            if total <= self.max_bytes:
+                break
+            if self._remove(path):
+                total -= size
+
+    def clear(self) -> None:
+        """Remove every cache entry."""
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.name.endswith('.pickle'):
+                        self._remove(entry.path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
@@ -8,6 +8,44 @@ MIN_BLOCK_WIDTH = 150
 MIN_BLOCK_HEIGHT = 90
 GRID_STEP = 10
 SIGNAL_PANEL_WIDTH = 280
+# Imported netlists with more instances than this are summarized, not drawn.
+NETLIST_DRAW_LIMIT = 2000
+
+# File watching: seconds between polls, seconds a change must be stable
+# before reloading, and files stat'ed per poll.
+WATCH_INTERVAL = 0.5
+WATCH_DEBOUNCE = 0.3
+WATCH_STATS_PER_TICK = 64
+
+# Wire routing backend, a key of routing.ROUTERS: 'grid' (A* on flat cell
+# indices), 'astar' (reference A*), 'visibility' (A* on a sparse graph of
+# lines around the blocks), 'global' (tile corridors first, then A* inside
+# them), 'pathfinder' (negotiated congestion, all nets together) or
+# 'manhattan' (fast preview).
+ROUTER_BACKEND = 'grid'
+
+# Routes kept for nets that left the diagram (moved, collapsed, hidden), so
+# undo and view toggles can reuse them; least recently used are dropped.
+ROUTE_CACHE_SIZE = 4096
+
+# Route each signal's sinks as one Steiner tree grown from its source,
+# instead of one independent path per connection.
+STEINER_ROUTING = True
+
+# Route on a worker thread: draw() shows the routes as they were (or
+# Manhattan previews for changed nets) and redraws when the worker's
+# result comes back, checked every ROUTE_POLL_MS milliseconds.
+ROUTE_IN_BACKGROUND = True
+ROUTE_POLL_MS = 20
+
+# Without the worker: seconds of routing per UI frame. draw() shows
+# Manhattan previews at once and routes the nets in idle-time slices of
+# this length; None routes everything before draw() returns.
+ROUTE_FRAME_BUDGET = 0.016
+
+# File to record every routing request of the session in (see trace.py),
+# for replaying with benchmarks/bench_replay.py; None records nothing.
+ROUTE_TRACE = None
 
 # Color schemes
 COLORS = {
@@ -0,0 +1,201 @@
+# ============================================================================
+# globalroute.py - Two-level routing: tile corridors, then detailed A*
+# ============================================================================
+
+import heapq
+import math
+
+from typing import List, Optional, Tuple
+
+from .routing import GridRouter, OccupancyGrid, Point, WireMap, register_router
+
+
+class TileGrid:
+    """An OccupancyGrid cut into `size` x `size` tiles, with track estimates.
+
+    Tiles are numbered column-major like cells. A tile's capacity is its
+    free cells divided by `size`, roughly the wires that fit through it;
+    its usage is its wired cells divided by `size`, the tracks already
+    taken. Usage is counted from a WireMap and then kept up to date with
+    add_points() as nets are routed.
+    """
+
+    def __init__(self, grid: OccupancyGrid, size: int):
+        self.grid = grid
+        self.size = size
+        self.cols = -(-grid.cols // size)
+        self.rows = -(-grid.rows // size)
+        free = [0] * (self.cols * self.rows)
+        cells, rows = grid.cells, grid.rows
+        for c in range(grid.cols):
+            column = cells[c * rows:(c + 1) * rows]
+            base = c // size * self.rows
+            for tr in range(self.rows):
+                run = column[tr * size:(tr + 1) * size]
+                free[base + tr] += len(run) - run.count(1)
+        self.capacity = [n / size for n in free]
+        self.usage = [0.0] * len(free)
+
+    def tile(self, i: int) -> int:
+        """Tile of grid cell i."""
+        c, r = divmod(i, self.grid.rows)
+        return c // self.size * self.rows + r // self.size
+
+    def count_wires(self, wires: WireMap) -> None:
+        usage = [0.0] * len(self.usage)
+        unit = 1.0 / self.size
+        tile = self.tile
+        for i, segments in enumerate(wires.cover):
+            if segments:
+                usage[tile(i)] += unit
+        self.usage = usage
+
+    def add_points(self, points: List[Point]) -> None:
+        """Count the grid cells under a polyline as wired."""
+        grid, unit = self.grid, 1.0 / self.size
+        step = grid.step
+        for (x1, y1), (x2, y2) in zip(points, points[1:]):
+            if x1 != x2 and y1 != y2:
+                continue
+            dx, dy = (x2 > x1) - (x2 < x1), (y2 > y1) - (y2 < y1)
+            for k in range(max(abs(x2 - x1), abs(y2 - y1)) // step):
+                i = grid.index(x1 + dx * step * k, y1 + dy * step * k)
+                if i >= 0:
+                    self.usage[self.tile(i)] += unit
+        i = grid.index(*points[-1]) if points else -1
+        if i >= 0:
+            self.usage[self.tile(i)] += unit
+
+    def route(self, s: int, t: int, window: Tuple[int, int, int, int],
+              congestion_weight: float) -> Optional[List[int]]:
+        """Cheapest chain of tiles from tile s to tile t, or None.
+
+        `window` is (first column, last column, first row, last row) in
+        tiles. Entering a tile costs 1, plus `congestion_weight` per track
+        of overflow once its usage reaches its capacity; tiles with no free
+        cells are only entered as the goal.
+        """
+        c_lo, c_hi, r_lo, r_hi = window
+        rows = self.rows
+        capacity, usage = self.capacity, self.usage
+        gc, gr = divmod(t, rows)
+        g_score = {s: 0.0}
+        parent = {s: -1}
+        closed = set()
+        heap = [(0.0, s)]
+        while heap:
+            _, cur = heapq.heappop(heap)
+            if cur in closed:
+                continue
+            if cur == t:
+                path = [cur]
+                while parent[cur] >= 0:
+                    cur = parent[cur]
+                    path.append(cur)
+                path.reverse()
+                return path
+            closed.add(cur)
+            c, r = divmod(cur, rows)
+            for nc, nr in ((c + 1, r), (c - 1, r), (c, r + 1), (c, r - 1)):
+                if nc < c_lo or nc > c_hi or nr < r_lo or nr > r_hi:
+                    continue
+                nb = nc * rows + nr
+                if nb in closed or (not capacity[nb] and nb != t):
+                    continue
+                ng = g_score[cur] + 1.0 + congestion_weight * max(0.0, usage[nb] + 1.0 - capacity[nb])
+                if ng < g_score.get(nb, math.inf):
+                    g_score[nb] = ng
+                    parent[nb] = cur
+                    heapq.heappush(heap, (ng + abs(nc - gc) + abs(nr - gr), nb))
+        return None
+
+    def corridor(self, path: List[int], margin: int) -> bytearray:
+        """Mask of the tiles within `margin` tiles of `path`."""
+        mask = bytearray(len(self.capacity))
+        rows = self.rows
+        for t in path:
+            c, r = divmod(t, rows)
+            for nc in range(max(0, c - margin), min(self.cols, c + margin + 1)):
+                base = nc * rows
+                mask[base + max(0, r - margin):base + min(rows, r + margin + 1)] = \
+                    b'\x01' * (min(rows, r + margin + 1) - max(0, r - margin))
+        return mask
+
+
+@register_router
+class GlobalRouter(GridRouter):
+    """Two-level routing: a corridor of tiles first, then A* inside it.
+
+    The global phase routes each net over tiles of `tile_size` x
+    `tile_size` cells, steering around tiles whose wires already fill
+    their estimated capacity (the wire congestion of GridRouter, at tile
+    granularity). The detailed phase is GridRouter's search, confined to
+    the tiles on that chain and `corridor_margin` tiles around it, so its
+    search space is bounded by the corridor rather than the canvas. When
+    the corridor holds no path the net is searched without it;
+    `corridor_misses` counts those nets.
+    """
+
+    name = 'global'
+    tile_size = 10
+    corridor_margin = 1
+    congestion_weight = 4.0
+
+    def __init__(self, grid_step: int = 10):
+        super().__init__(grid_step)
+        self.tiles: Optional[TileGrid] = None
+        self.corridor_misses = 0
+        self._synced: Optional[Tuple[WireMap, int]] = None  # wires and version the usage matches
+
+    def tile_grid(self, occupancy: OccupancyGrid, wires: WireMap) -> TileGrid:
+        tiles = self.tiles
+        if tiles is None or tiles.grid is not occupancy:
+            tiles = self.tiles = TileGrid(occupancy, self.tile_size)
+            self._synced = None
+        if self._synced is None or self._synced[0] is not wires or self._synced[1] != wires.version:
+            tiles.count_wires(wires)
+            self._synced = (wires, wires.version)
+        return tiles
+
+    def route_points(self, net, occupancy, wires, bounds):
+        version = wires.version
+        points = super().route_points(net, occupancy, wires, bounds)
+        self._note(wires, version, points)
+        return points
+
+    def route_branch(self, net, tree, occupancy, wires, bounds):
+        version = wires.version
+        marked, points = super().route_branch(net, tree, occupancy, wires, bounds)
+        self._note(wires, version, marked)
+        return marked, points
+
+    def _note(self, wires: WireMap, version: int, points: List[Point]) -> None:
+        # Count a route just marked into a usage that was current before it
+        if self.tiles is not None and self._synced == (wires, version):
+            self.tiles.add_points(points)
+            self._synced = (wires, wires.version)
+
+    def find_path(self, start, goal, occupancy, wire_occupancy, signal, xmin, xmax, ymin, ymax, limit=None):
+        engine = self.engine(occupancy)
+        s, t = occupancy.index(*start), occupancy.index(*goal)
+        if s < 0 or t < 0 or wire_occupancy is None:
+            return engine.find_path(start, goal, wire_occupancy, signal, xmin, xmax, ymin, ymax, limit)
+        tiles = self.tile_grid(occupancy, wire_occupancy)
+        step, size = occupancy.step, tiles.size
+        window = (max(0, math.ceil((xmin - occupancy.xmin) / step)) // size,
+                  min(occupancy.cols - 1, math.floor((xmax - occupancy.xmin) / step)) // size,
+                  max(0, math.ceil((ymin - occupancy.ymin) / step)) // size,
+                  min(occupancy.rows - 1, math.floor((ymax - occupancy.ymin) / step)) // size)
+        chain = tiles.route(tiles.tile(s), tiles.tile(t), window, self.congestion_weight)
+        if chain is not None:
+            first = engine.expanded
+            path = engine.find_path(start, goal, wire_occupancy, signal, xmin, xmax, ymin, ymax, limit,
+                                    (tiles.corridor(chain, self.corridor_margin), size))
+            if path is not None:
+                return path
+            if limit is not None:
+                limit -= engine.expanded - first
+                if limit <= 0:
+                    return None
+        self.corridor_misses += 1
+        return engine.find_path(start, goal, wire_occupancy, signal, xmin, xmax, ymin, ymax, limit)
@@ -0,0 +1,179 @@
+# ============================================================================
+# lexer.py - Single-pass VHDL tokenizer
+# ============================================================================
+
+import re
+
+from typing import Iterator, List, Tuple
+
+KEYWORDS = frozenset("""
+    ABS ACCESS AFTER ALIAS ALL AND ARCHITECTURE ARRAY ASSERT ATTRIBUTE BEGIN
+    BLOCK BODY BUFFER BUS CASE COMPONENT CONFIGURATION CONSTANT CONTEXT
+    DISCONNECT DOWNTO ELSE ELSIF END ENTITY EXIT FILE FOR FORCE FUNCTION
+    GENERATE GENERIC GROUP GUARDED IF IMPURE IN INERTIAL INOUT IS LABEL
+    LIBRARY LINKAGE LITERAL LOOP MAP MOD NAND NEW NEXT NOR NOT NULL OF ON
+    OPEN OR OTHERS OUT PACKAGE PARAMETER PORT POSTPONED PROCEDURE PROCESS
+    PROTECTED PURE RANGE RECORD REGISTER REJECT RELEASE REM REPORT RETURN ROL
+    ROR SELECT SEVERITY SHARED SIGNAL SLA SLL SRA SRL SUBTYPE THEN TO
+    TRANSPORT TYPE UNAFFECTED UNITS UNTIL USE VARIABLE WAIT WHEN WHILE WITH
+    XNOR XOR
+""".split())
+
+# Leading whitespace and comments are consumed by the same match as the token
+# that follows them, so findall() hands back only the token texts. The prefix
+# is written so that every input has exactly one way to match it, which keeps
+# the scan linear with no backtracking. The order of the alternatives matters:
+# names first (most common), then literals, then compound delimiters before
+# the single-character fallback; the empty \Z alternative lets trailing
+# comments end the input. A tick directly after a name or ')' is an
+# attribute (clk'event), not a character literal.
+_TOKEN_RE = re.compile(r'''
+    \s*(?:(?:--[^\n]*|/\*(?:[^*]|\*(?!/))*(?:\*/|\Z))\s*)*
+    (
+        [A-Za-z]\w*
+      | \\[^\\\n]*\\
+      | \d[\d_]*(?:\#[0-9A-Fa-f_.]+\#)?(?:\.\d[\d_]*)?(?:[Ee][+-]?\d+)?
+      | "(?:[^"\n]|"")*"
+      | (?<![\w)])'[^\n]'
+      | <=|=>|:=|/=|>=|\*\*|<>|\?\?
+      | \S
+      | \Z
+    )
+''', re.VERBOSE | re.DOTALL)
+
+# Delimiters that never take a space on the given side when re-joining tokens.
+_NO_SPACE_AFTER = frozenset(('(', '.', "'"))
+_NO_SPACE_BEFORE = frozenset((')', ',', ';', '.', "'"))
+
+
+class TokenStream:
+    """Compact token stream: parallel lists of source texts and folded texts.
+
+    `texts[i]` keeps the original spelling for display; `folded[i]` is the
+    upper-cased form used for case-insensitive keyword matching. Both are
+    plain lists so stages can use list.index() to jump between keywords.
+    """
+
+    __slots__ = ('texts', 'folded')
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.folded = [t.upper() for t in texts]
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def is_name(self, i: int) -> bool:
+        """True if token i is an identifier (not a keyword, literal or delimiter)."""
+        t = self.texts[i]
+        return (t[0].isalpha() or t[0] == '\\') and self.folded[i] not in KEYWORDS
+
+    def positions(self, word: str, start: int = 0, stop: int = -1) -> Iterator[int]:
+        """Yield every index in [start, stop) whose folded text equals word."""
+        folded = self.folded
+        if stop < 0:
+            stop = len(folded)
+        i = start
+        try:
+            while True:
+                i = folded.index(word, i, stop)
+                yield i
+                i += 1
+        except ValueError:
+            return
+
+    def find(self, start: int, *words: str, stop: int = -1) -> int:
+        """Index of the first token in [start, stop) in words, or stop when there is none."""
+        folded = self.folded
+        if stop < 0:
+            stop = len(folded)
+        i = start
+        while i < stop and folded[i] not in words:
+            i += 1
+        return i
+
+    def statement_end(self, i: int, stop: int = -1) -> int:
+        """Index of the first ';' in [i, stop), or stop when there is none."""
+        if stop < 0:
+            stop = len(self.texts)
+        try:
+            return self.texts.index(';', i, stop)
+        except ValueError:
+            return stop
+
+    def matching_paren(self, i: int, stop: int = -1) -> int:
+        """Return the index of the ')' closing the '(' at i, or -1.
+
+        The search never looks past `stop`, so callers that bound it by the
+        end of the current statement keep unbalanced input from being
+        rescanned to the end of the file over and over.
+        """
+        texts = self.texts
+        if stop < 0:
+            stop = len(texts)
+        depth = 0
+        for k in range(i, stop):
+            t = texts[k]
+            if t == '(':
+                depth += 1
+            elif t == ')':
+                depth -= 1
+                if depth == 0:
+                    return k
+        return -1
+
+    def split_top_level(self, i: int, j: int, sep: str) -> List[Tuple[int, int]]:
+        """Split the range [i, j) on `sep` delimiters not nested in parentheses."""
+        texts = self.texts
+        spans = []
+        depth = 0
+        start = i
+        for k in range(i, j):
+            t = texts[k]
+            if t == '(':
+                depth += 1
+            elif t == ')':
+                depth -= 1
+            elif t == sep and depth == 0:
+                spans.append((start, k))
+                start = k + 1
+        spans.append((start, j))
+        return spans
+
+    def span_text(self, i: int, j: int) -> str:
+        """Rebuild the source for tokens [i, j) with normalized spacing.
+
+        Comments are gone and runs of whitespace become one space, except
+        around brackets, commas and selectors, so 'STD_LOGIC_VECTOR(7 DOWNTO 0)'
+        and 'data(3 downto 0)' come back exactly as usually written.
+        """
+        if j - i == 1:
+            return self.texts[i]
+        if i >= j:
+            return ''
+        texts = self.texts
+        folded = self.folded
+        parts = [texts[i]]
+        for k in range(i + 1, j):
+            t = texts[k]
+            prev = texts[k - 1]
+            if prev in _NO_SPACE_AFTER or t in _NO_SPACE_BEFORE:
+                pass
+            elif t == '(' and (prev == ')' or (prev[0].isalnum() and folded[k - 1] not in KEYWORDS)):
+                pass
+            else:
+                parts.append(' ')
+            parts.append(t)
+        return ''.join(parts)
+
+
+def tokenize(text: str) -> TokenStream:
+    """Lex VHDL source once into a TokenStream.
+
+    Comments and whitespace are dropped in the same regex pass that finds the
+    tokens, so the whole file is scanned exactly once.
+    """
+    texts = _TOKEN_RE.findall(text)
+    while texts and not texts[-1]:
+        texts.pop()
+    return TokenStream(texts)
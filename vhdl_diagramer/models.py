@@ -15,6 +15,7 @@ class Port:
     font_size: int = 8
     font_bold: bool = False
     font_italic: bool = False
+    signal_id: int = -1  # id of `signal` in a SymbolTable; -1 until interned
 
 @dataclass(eq=False)
 class Instance:
@@ -39,3 +40,15 @@ class Instance:
     collapsed: bool = False
     children: List['Instance'] = field(default_factory=list)
     parent: Optional['Instance'] = field(default=None, init=False, repr=False)
+
+@dataclass
+class PortDecl:
+    name: str
+    direction: str  # 'IN', 'OUT', 'INOUT'
+    type: str = ''
+
+@dataclass
+class EntityDecl:
+    name: str
+    ports: List[PortDecl] = field(default_factory=list)
+    source: str = ''  # file the declaration was read from, if any
@@ -0,0 +1,214 @@
+# ============================================================================
+# netlist.py - Streaming importer for large post-synthesis netlists
+# ============================================================================
+
+import mmap
+import re
+
+from array import array
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from .lexer import TokenStream, tokenize
+from .models import Instance, Port
+from .parser import VHDLParser
+from .symbols import SymbolTable
+
+# Statement boundaries: a ';' outside parentheses, comments and literals. Only
+# these delimiters are matched, so the file is walked once at regex speed and
+# Python code runs per delimiter, not per character.
+_DELIM_RE = re.compile(rb'''
+    --[^\n]*
+  | /\*(?:[^*]|\*(?!/))*(?:\*/|\Z)
+  | "(?:[^"\n]|"")*"
+  | (?<![\w)])'[^\n]'
+  | [();]
+''', re.VERBOSE | re.DOTALL)
+
+_PORT_MAP_RE = re.compile(rb'\bport\s+map\b', re.IGNORECASE)
+_DECL_RE = re.compile(rb'\b(?:component|entity)\b', re.IGNORECASE)
+_PORT_CLAUSE_RE = re.compile(rb'\bport\s*\(', re.IGNORECASE)
+
+# A statement longer than this is taken to be unbalanced garbage: it is
+# dropped at its next ';' (even inside parentheses) rather than being held in
+# memory, and scanning restarts from there.
+MAX_STATEMENT_BYTES = 4 * 1024 * 1024
+
+# Instances between progress reports.
+PROGRESS_INTERVAL = 1000
+
+DIRECTION_CODES = {'IN': 0, 'OUT': 1, 'INOUT': 2}
+DIRECTION_NAMES = ('IN', 'OUT', 'INOUT')
+
+
+class NetlistInstance(NamedTuple):
+    """One instance statement as plain strings, before it is interned."""
+    name: str
+    entity: str
+    ports: List[Tuple[str, str, str]]  # (formal, actual, direction)
+
+
+class NetlistStore:
+    """Compact column store of netlist instances.
+
+    Each instance costs a few array slots instead of an Instance object with
+    a list of Port objects: names, entities, formals and nets are interned
+    into one SymbolTable and ports are stored as flat parallel arrays indexed
+    through `port_start`. Use instance() to materialize individual entries.
+    """
+
+    def __init__(self):
+        self.pool = SymbolTable()
+        self.inst_name = array('i')
+        self.inst_entity = array('i')
+        self.port_start = array('l', [0])
+        self.port_formal = array('i')
+        self.port_signal = array('i')
+        self.port_direction = array('b')
+
+    def __len__(self) -> int:
+        return len(self.inst_name)
+
+    def add(self, inst: NetlistInstance) -> None:
+        intern = self.pool.intern
+        self.inst_name.append(intern(inst.name))
+        self.inst_entity.append(intern(inst.entity))
+        for formal, actual, direction in inst.ports:
+            self.port_formal.append(intern(formal))
+            self.port_signal.append(intern(actual))
+            self.port_direction.append(DIRECTION_CODES.get(direction, 2))
+        self.port_start.append(len(self.port_formal))
+
+    def instance(self, i: int) -> Instance:
+        """Build a full Instance for entry i."""
+        s = self.pool.strings
+        ports = [Port(name=s[self.port_formal[k]], direction=DIRECTION_NAMES[self.port_direction[k]],
+                      signal=s[self.port_signal[k]], signal_id=self.port_signal[k])
+                 for k in range(self.port_start[i], self.port_start[i + 1])]
+        inst = Instance(name=s[self.inst_name[i]], entity=s[self.inst_entity[i]], ports=ports)
+        inst.original_ports = list(ports)
+        return inst
+
+    def instances(self, limit: Optional[int] = None) -> List[Instance]:
+        n = len(self) if limit is None else min(limit, len(self))
+        return [self.instance(i) for i in range(n)]
+
+    def entity_counts(self) -> Dict[str, int]:
+        """Number of instances of each entity (cell type)."""
+        counts: Dict[int, int] = {}
+        for e in self.inst_entity:
+            counts[e] = counts.get(e, 0) + 1
+        s = self.pool.strings
+        return {s[e]: c for e, c in counts.items()}
+
+
+def iter_statements(path: str) -> Iterator[bytes]:
+    """Yield the raw bytes of each top-level ';'-terminated statement of a file.
+
+    The file is memory-mapped, so only the current statement is copied into
+    Python memory; the rest stays in the OS page cache.
+    """
+    with open(path, 'rb') as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return  # empty file
+        with mm:
+            start = 0
+            depth = 0
+            for m in _DELIM_RE.finditer(mm):
+                d = mm[m.start()]
+                if d == 0x28:  # (
+                    depth += 1
+                elif d == 0x29:  # )
+                    depth = max(0, depth - 1)
+                elif d == 0x3b:  # ;
+                    end = m.end()
+                    if depth == 0:
+                        yield mm[start:end]
+                        start = end
+                    elif end - start > MAX_STATEMENT_BYTES:
+                        depth = 0
+                        start = end
+            if len(mm) - start <= MAX_STATEMENT_BYTES and mm[start:].strip():
+                # Unterminated last statement
+                yield mm[start:]
+
+
+def _instance_from_tokens(toks: TokenStream, port_modes: Dict[str, Dict[str, str]]) -> Optional[NetlistInstance]:
+    """Read 'label : [ENTITY lib.|COMPONENT] name [GENERIC MAP (...)] PORT MAP (...)'."""
+    texts = toks.texts
+    folded = toks.folded
+    n = len(toks)
+    try:
+        pm = folded.index('PORT')
+        colon = texts.index(':', 0, pm)
+    except ValueError:
+        return None
+    if colon == 0 or not toks.is_name(colon - 1) or colon + 1 >= n:
+        return None
+    k = colon + 1
+    if folded[k] == 'ENTITY' and k + 3 < n and texts[k + 2] == '.':
+        entity = texts[k + 3]
+    elif folded[k] == 'COMPONENT' and k + 1 < n:
+        entity = texts[k + 1]
+    else:
+        entity = texts[k]
+    if pm + 2 >= n or folded[pm + 1] != 'MAP' or texts[pm + 2] != '(':
+        return None
+    close = toks.matching_paren(pm + 2)
+    if close == -1:
+        close = n - 1 if texts[-1] == ';' else n
+
+    modes = port_modes.get(entity.lower(), {})
+    ports = []
+    for a, b in toks.split_top_level(pm + 3, close, ','):
+        try:
+            arrow = texts.index('=>', a, b)
+        except ValueError:
+            continue
+        formal = toks.span_text(a, arrow)
+        if not formal:
+            continue
+        actual = toks.span_text(arrow + 1, b)
+        direction = modes.get(texts[a].lower()) or VHDLParser._guess_direction(formal, actual)
+        ports.append((formal, actual, direction))
+    return NetlistInstance(texts[colon - 1], entity, ports)
+
+
+def iter_instances(path: str, port_modes: Optional[Dict[str, Dict[str, str]]] = None) -> Iterator[NetlistInstance]:
+    """Stream the instances of a netlist file one statement at a time.
+
+    Component and entity declarations seen along the way are added to
+    `port_modes` (entity -> port -> direction, lower-cased), so cell pins are
+    resolved from the library section netlists usually start with.
+    """
+    modes = {} if port_modes is None else port_modes
+    for raw in iter_statements(path):
+        if _PORT_MAP_RE.search(raw):
+            inst = _instance_from_tokens(tokenize(raw.decode('utf-8', errors='ignore')), modes)
+            if inst is not None:
+                yield inst
+        elif _DECL_RE.search(raw) and _PORT_CLAUSE_RE.search(raw):
+            decl = VHDLParser(raw.decode('utf-8', errors='ignore'))
+            decl.parse()
+            for table in (decl.entities, decl.components):
+                for key, d in table.items():
+                    modes.setdefault(key, {p.name.lower(): p.direction for p in d.ports})
+
+
+def import_netlist(
+    path: str,
+    port_modes: Optional[Dict[str, Dict[str, str]]] = None,
+    progress: Optional[Callable[[int], None]] = None
+) -> NetlistStore:
+    """Stream a netlist file into a NetlistStore.
+
+    `progress(count)` is called every PROGRESS_INTERVAL instances and may
+    raise to abort the import.
+    """
+    store = NetlistStore()
+    for inst in iter_instances(path, port_modes):
+        store.add(inst)
+        if progress is not None and len(store) % PROGRESS_INTERVAL == 0:
+            progress(len(store))
+    return store
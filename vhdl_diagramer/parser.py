@@ -2,92 +2,233 @@
 # parser.py - VHDL parsing logic
 # ============================================================================
 
-import re
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
 
-from typing import Dict, List, Tuple
+from .lexer import TokenStream, tokenize
+from .models import EntityDecl, Instance, Port, PortDecl
+from .symbols import SymbolTable
 
-from .models import Instance, Port
+# Bump whenever parse results for the same input text can change, so cached
+# results from older parsers are not reused.
+PARSER_VERSION = 6
+
+# Instances between progress reports during instance extraction.
+PROGRESS_INTERVAL = 256
+
+MODE_DIRECTIONS = {'IN': 'IN', 'OUT': 'OUT', 'INOUT': 'INOUT', 'BUFFER': 'OUT'}
 
 
 class VHDLParser:
     """Parses VHDL code to extract instances, signals, variables, and constants."""
     
-    def __init__(self, vhdl_text: str):
+    def __init__(self, vhdl_text: str, library: Optional[Mapping[str, EntityDecl]] = None,
+                 previous: Optional['VHDLParser'] = None, symbols: Optional[SymbolTable] = None):
         self.text = vhdl_text
+        self.library = library  # extra entity declarations keyed by lower-cased name
+        # Instances of a previous parse are reused for unchanged statements.
+        self._reuse = self._reuse_map(previous)
+        self.reused = 0
+        # Signal names -> dense ids (Port.signal_id). Shared with `previous`
+        # so reused instances keep valid ids, unless `symbols` is given (a
+        # copy of previous.symbols, for parsing off the thread that uses it).
+        if symbols is None:
+            symbols = previous.symbols if previous is not None else SymbolTable()
+        self.symbols = symbols
+        self._progress: Optional[Callable[[str, float], None]] = None
+        self.tokens: Optional[TokenStream] = None
         self.instances: List[Instance] = []
         self.signals: Dict[str, str] = {}
         self.variables: Dict[str, str] = {}
         self.constants: Dict[str, str] = {}
         self.top_level_ports: List[Port] = []
         self.assignments: List[Tuple[str, str]] = []
+        self.entities: Dict[str, EntityDecl] = {}  # keyed by lower-cased name
+        self.components: Dict[str, EntityDecl] = {}  # keyed by lower-cased name
+        # entity -> port -> direction, both lower-cased; built from the tables above
+        self.port_modes: Dict[str, Dict[str, str]] = {}
+        # Normalized instance statement plus the entity's declared modes,
+        # parallel to self.instances; equal keys mean an identical extraction.
+        self.statement_keys: List[str] = []
+
+    def parse(self, progress: Optional[Callable[[str, float], None]] = None) -> None:
+        """Main parse method. The text is lexed once; every stage walks the same stream.
+
+        `progress(stage, fraction)` is called between stages and every few
+        hundred instances; it may raise to abort the parse.
+        """
+        self._progress = progress
+        try:
+            self._report('Lexing', 0.0)
+            self.tokens = tokenize(self.text)
+            self._report('Declarations', 0.2)
+            self._parse_declarations()
+            self._parse_entity_declarations()
+            self._build_port_index()
+            self._parse_assignments()
+            self._report('Instances', 0.3)
+            self._parse_instances()
+            self._report('Done', 1.0)
+        finally:
+            self._reuse = {}
+            self._progress = None
 
-    def parse(self) -> None:
-        """Main parse method."""
-        self._parse_declarations()
-        self._parse_entity_declaration()
-        self._parse_assignments()
-        self._parse_instances()
+    def _report(self, stage: str, fraction: float) -> None:
+        if self._progress is not None:
+            self._progress(stage, fraction)
     
     def _parse_declarations(self) -> None:
         """Parse signal, variable, and constant declarations."""
-        text_no_comments = re.sub(r'--.*?(\n|$)', '\n', self.text)
-        
-        # Parse signals
-        signal_pattern = r'\bSIGNAL\s+(\w+(?:\s*,\s*\w+)*)\s*:\s*([^;:=]+?)(?::=.*?)?;'
-        for match in re.finditer(signal_pattern, text_no_comments, re.IGNORECASE | re.DOTALL):
-            names = [n.strip() for n in match.group(1).split(',')]
-            sig_type = match.group(2).strip()
-            for name in names:
-                self.signals[name] = sig_type
-        
-        # Parse variables
-        variable_pattern = r'\bVARIABLE\s+(\w+(?:\s*,\s*\w+)*)\s*:\s*([^;:=]+?)(?::=.*?)?;'
-        for match in re.finditer(variable_pattern, text_no_comments, re.IGNORECASE | re.DOTALL):
-            names = [n.strip() for n in match.group(1).split(',')]
-            var_type = match.group(2).strip()
-            for name in names:
-                self.variables[name] = var_type
-        
-        # Parse constants
-        constant_pattern = r'\bCONSTANT\s+(\w+)\s*:\s*([^:=]+?)(?::=\s*(.+?))?;'
-        for match in re.finditer(constant_pattern, text_no_comments, re.IGNORECASE | re.DOTALL):
-            name = match.group(1).strip()
-            const_type = match.group(2).strip()
-            value = match.group(3).strip() if match.group(3) else ''
-            self.constants[name] = f"{const_type} := {value}" if value else const_type
+        toks = self.tokens
+        texts = toks.texts
+        n = len(toks)
+        for keyword, table in (('SIGNAL', self.signals), ('VARIABLE', self.variables),
+                               ('CONSTANT', self.constants)):
+            resume = 0
+            for i in toks.positions(keyword):
+                if i < resume:
+                    continue
+                # name {, name} : subtype [:= value] ;
+                # Nothing here looks past the declaration's own ';', and the
+                # next search resumes after it, so each keyword pass is linear.
+                end = toks.statement_end(i + 1)
+                resume = end + 1
+                names = []
+                k = i + 1
+                while k < end and toks.is_name(k):
+                    names.append(texts[k])
+                    k += 1
+                    if k < end and texts[k] == ',':
+                        k += 1
+                    else:
+                        break
+                if not names or k >= end or texts[k] != ':' or end >= n:
+                    continue
+                try:
+                    type_end = texts.index(':=', k + 1, end)
+                except ValueError:
+                    type_end = end
+                if type_end == k + 1:
+                    continue
+                decl_type = toks.span_text(k + 1, type_end)
+
+                for name in names:
+                    self.symbols.intern(name)
+                if keyword != 'CONSTANT':
+                    for name in names:
+                        table[name] = decl_type
+                elif len(names) == 1:
+                    value = toks.span_text(type_end + 1, end) if type_end < end else ''
+                    table[names[0]] = f"{decl_type} := {value}" if value else decl_type
 
     def _parse_instances(self) -> None:
-        """Parse entity instances."""
-        instance_pattern = r'(\w+)\s*:\s*ENTITY\s+work\.(\w+)(.*?)PORT\s+MAP\s*\((.*?)\)\s*;'
-        matches = re.finditer(instance_pattern, self.text, re.DOTALL | re.IGNORECASE)
-        for match in matches:
-            inst_name = match.group(1)
-            entity_name = match.group(2)
-            port_map_text = match.group(4)
-            ports = self._parse_port_map(port_map_text)
-            
+        """Parse entity instances.
+
+        Each instance statement is scanned once, from its label up to its own
+        ';' (or the next instance header if the ';' is missing). The port map
+        is read with a parenthesis-balanced walk bounded by that statement
+        end, so unbalanced or unterminated input costs time linear in the
+        file size instead of being rescanned for every instance.
+        """
+        toks = self.tokens
+        texts = toks.texts
+        folded = toks.folded
+        n = len(toks)
+
+        headers = [e for e in toks.positions('ENTITY')
+                   if 2 <= e and e + 3 < n and texts[e - 1] == ':' and texts[e + 2] == '.'
+                   and toks.is_name(e - 2) and toks.is_name(e + 1) and toks.is_name(e + 3)]
+        resume = 0
+        mode_keys: Dict[str, str] = {}
+        for h, e in enumerate(headers):
+            if h % PROGRESS_INTERVAL == 0 and h:
+                self._report('Instances', 0.3 + 0.7 * h / len(headers))
+            if e < resume:
+                continue
+            # label : ENTITY lib . name [GENERIC MAP (...)] [PORT MAP (...)] ;
+            inst_name = texts[e - 2]
+            entity_name = texts[e + 3]
+            limit = headers[h + 1] - 2 if h + 1 < len(headers) else n
+            end = toks.statement_end(e + 4, limit)
+            resume = end + 1
+
+            entity_key = entity_name.lower()
+            modes = self.port_modes.get(entity_key)
+            if entity_key not in mode_keys:
+                mode_keys[entity_key] = ','.join(f"{p}:{d}" for p, d in sorted(modes.items())) if modes else ''
+            key = ' '.join(texts[e - 2:end]) + '\0' + mode_keys[entity_key]
+            self.statement_keys.append(key)
+
+            inst = self._reuse.pop(key, None)
+            if inst is not None:
+                self.reused += 1
+                self.instances.append(inst)
+                continue
+
+            ports: List[Port] = []
+            try:
+                k = folded.index('PORT', e + 4, end)
+            except ValueError:
+                k = end
+            if k + 2 < end and folded[k + 1] == 'MAP' and texts[k + 2] == '(':
+                close = toks.matching_paren(k + 2, end)
+                if close == -1:
+                    # Unbalanced: recover with everything up to the statement
+                    # end, minus a dangling ')' if there is one.
+                    close = end - 1 if texts[end - 1] == ')' else end
+                ports = self._parse_port_map(k + 3, close, modes)
+
             # Create instance with copy of original ports
             inst = Instance(name=inst_name, entity=entity_name, ports=ports)
             inst.original_ports = list(ports) # Shallow copy is fine since Ports are immutable data classes effectively
             self.instances.append(inst)
 
-    def _parse_port_map(self, port_map_text: str) -> List[Port]:
-        """Parse port map connections."""
+    @staticmethod
+    def _reuse_map(previous: Optional['VHDLParser']) -> Dict[str, Instance]:
+        if previous is None:
+            return {}
+        return dict(zip(previous.statement_keys, previous.instances))
+
+    def adopt_unchanged(self, previous: Optional['VHDLParser']) -> int:
+        """Swap in previous Instance objects for statements that did not change.
+
+        For results that were not parsed with `previous` (e.g. cache hits).
+        Returns the number of instances reused.
+        """
+        reuse = self._reuse_map(previous)
+        for i, key in enumerate(self.statement_keys):
+            inst = reuse.pop(key, None)
+            if inst is not None:
+                for port in inst.ports:
+                    self.symbols.bind(port)
+                self.instances[i] = inst
+                self.reused += 1
+        return self.reused
+
+    def _parse_port_map(self, start: int, end: int,
+                        modes: Optional[Dict[str, str]] = None) -> List[Port]:
+        """Parse the port map associations held in tokens [start, end).
+
+        Directions come from `modes` (the instantiated entity's declared ports)
+        when the formal is declared there, and from _guess_direction otherwise.
+        """
+        toks = self.tokens
+        modes = modes or {}
         ports: List[Port] = []
-        port_map_text = re.sub(r'--.*?(\n|$)', '\n', port_map_text)
-        port_entries = re.split(r',(?![^()]*\))', port_map_text)
-        
-        for entry in port_entries:
-            entry = entry.strip()
-            if not entry or '=>' not in entry:
+        for a, b in toks.split_top_level(start, end, ','):
+            try:
+                arrow = toks.texts.index('=>', a, b)
+            except ValueError:
                 continue
-            parts = entry.split('=>')
-            if len(parts) == 2:
-                port_name = parts[0].strip()
-                signal_name = parts[1].strip()
-                signal_name = re.sub(r'[;)\s]+$', '', signal_name)
+            port_name = toks.span_text(a, arrow)
+            signal_name = toks.span_text(arrow + 1, b)
+            if not port_name:
+                continue
+            # Key on the formal's base name so 'data(3 downto 0) => x' resolves too.
+            direction = modes.get(toks.texts[a].lower())
+            if direction is None:
                 direction = self._guess_direction(port_name, signal_name)
-                ports.append(Port(name=port_name, direction=direction, signal=signal_name))
+            ports.append(Port(name=port_name, direction=direction, signal=signal_name,
+                              signal_id=self.symbols.intern(signal_name)))
         return ports
 
     @staticmethod
@@ -100,77 +241,109 @@ class VHDLParser:
             return 'IN'
         return 'INOUT'
 
-    def _parse_entity_declaration(self) -> None:
-        """Parse the top-level entity declaration to extract external ports."""
-        # Clean comments
-        text_no_comments = re.sub(r'--.*?(\n|$)', '\n', self.text)
-        
-        # Regex to find ENTITY ... PORT ( ... );
-        # We need to be careful not to match instance component declarations if any, 
-        # but usually top level entity is 'ENTITY name IS ... PORT ( ... ); END ...;'
-        
-        # Simple heuristic: Look for 'ENTITY' followed by 'PORT'
-        # We want the one that wraps the whole architecture, usually implies it's the file's main entity.
-        # Capturing the content inside PORT (...);
-        
-        pattern = r'ENTITY\s+(\w+)\s+IS.*?PORT\s*\((.*?)\)\s*;\s*END'
-        match = re.search(pattern, text_no_comments, re.DOTALL | re.IGNORECASE)
-        
-        if match:
-            # entity_name = match.group(1)
-            port_content = match.group(2)
-            
-            # Parse these ports. They look like 'name : IN type;'
-            # Split by ';'
-            raw_ports = port_content.split(';')
-            for raw in raw_ports:
-                raw = raw.strip()
-                if not raw: continue
-                # format: name, name : mode type
-                if ':' in raw:
-                    parts = raw.split(':')
-                    names_str = parts[0]
-                    rest = parts[1].strip()
-                    
-                    # Determine direction
-                    direction = 'INOUT'
-                    upper_rest = rest.upper()
-                    if upper_rest.startswith('IN '): direction = 'IN'
-                    elif upper_rest.startswith('OUT '): direction = 'OUT'
-                    elif upper_rest.startswith('INOUT '): direction = 'INOUT'
-                    elif upper_rest.startswith('BUFFER '): direction = 'OUT'
-                    
-                    # Extract type (crudely)
-                    # Remove mode from rest
-                    # signal_type = re.sub(r'^(IN|OUT|INOUT|BUFFER)\s+', '', rest, flags=re.IGNORECASE)
-                    
-                    names = [n.strip() for n in names_str.split(',')]
-                    for n in names:
-                        self.top_level_ports.append(Port(name=n, direction=direction, signal=n))
+    def _parse_entity_declarations(self) -> None:
+        """Parse every entity and component declaration.
+
+        The first entity declared gives the external ports.
+        """
+        toks = self.tokens
+        texts = toks.texts
+        folded = toks.folded
+        n = len(toks)
+
+        # 'ENTITY name IS' declares an entity. Instances are written
+        # 'ENTITY lib.name' so they never match here.
+        headers = [e for e in toks.positions('ENTITY')
+                   if e + 2 < n and toks.is_name(e + 1) and folded[e + 2] == 'IS']
+        # 'COMPONENT name [IS] PORT (...)'; skip 'END COMPONENT' and the
+        # 'label : COMPONENT name' instantiation form.
+        headers += [c for c in toks.positions('COMPONENT')
+                    if c + 1 < n and toks.is_name(c + 1)
+                    and not (c > 0 and (texts[c - 1] == ':' or folded[c - 1] == 'END'))]
+        headers.sort()
+
+        # Each declaration is only scanned up to the next one, so
+        # unterminated declarations cannot make this quadratic.
+        for h, d in enumerate(headers):
+            limit = headers[h + 1] if h + 1 < len(headers) else n
+            if folded[d] == 'ENTITY':
+                decl = EntityDecl(name=texts[d + 1], ports=self._parse_port_clause(d + 3, limit))
+                self.entities.setdefault(decl.name.lower(), decl)
+            else:
+                decl = EntityDecl(name=texts[d + 1], ports=self._parse_port_clause(d + 2, limit))
+                self.components.setdefault(decl.name.lower(), decl)
+
+        if self.entities:
+            first = next(iter(self.entities.values()))
+            self.top_level_ports = [Port(name=p.name, direction=p.direction, signal=p.name,
+                                         signal_id=self.symbols.intern(p.name))
+                                    for p in first.ports]
+
+    def _build_port_index(self) -> None:
+        """Index declared port directions by entity and port name.
+
+        Entities declared in this file win over component declarations, which
+        win over the external library.
+        """
+        tables = [self.entities, self.components]
+        if self.library is not None:
+            tables.append(self.library)
+        for table in reversed(tables):
+            for key, decl in table.items():
+                self.port_modes[key] = {p.name.lower(): p.direction for p in decl.ports}
+
+    def _parse_port_clause(self, start: int, limit: int = -1) -> List[PortDecl]:
+        """Parse the 'PORT (...)' clause of a declaration in tokens [start, limit)."""
+        toks = self.tokens
+        texts = toks.texts
+        folded = toks.folded
+        if limit < 0:
+            limit = len(toks)
+
+        k = toks.find(start, 'PORT', 'END', stop=limit)
+        if k + 1 >= limit or folded[k] != 'PORT' or texts[k + 1] != '(':
+            return []
+        stop = toks.find(k + 2, 'END', stop=limit)
+        close = toks.matching_paren(k + 1, stop)
+        if close == -1:
+            return []
+
+        # Port declarations look like 'name, name : mode type [:= default]' separated by ';'
+        ports = []
+        for a, b in toks.split_top_level(k + 2, close, ';'):
+            try:
+                colon = texts.index(':', a, b)
+            except ValueError:
+                continue
+            t = colon + 1
+            direction = 'INOUT'
+            if t < b and folded[t] in MODE_DIRECTIONS:
+                direction = MODE_DIRECTIONS[folded[t]]
+                t += 1
+            try:
+                type_end = texts.index(':=', t, b)
+            except ValueError:
+                type_end = b
+            port_type = toks.span_text(t, type_end)
+            for c in range(a, colon):
+                if toks.is_name(c):
+                    ports.append(PortDecl(name=texts[c], direction=direction, type=port_type))
+        return ports
 
     def _parse_assignments(self) -> None:
         """Parse signal assignments in the architecture body."""
-        # Find BEGIN ... END
-        text_no_comments = re.sub(r'--.*?(\n|$)', '\n', self.text)
-        
-        # We need to find the architecture body.
-        # Simplistic: Find BEGIN ... END ARCHITECTURE (or just END)
-        match = re.search(r'\bBEGIN\b(.*?)\bEND\b', text_no_comments, re.DOTALL | re.IGNORECASE)
-        if match:
-            body = match.group(1)
-            # Find assignments: dest <= source;
-            # This is tricky because source can be an expression.
-            # But the user example is `rx_serial_in_int <= rx_serial_in;` (simple assignment).
-            # We will target simple assignments first: identifier <= identifier;
-            
-            # Pattern: identifier <= identifier ;
-            # Allow whitespace, maybe some simple logic like NOT ?
-            # Let's stick to direct assignments for now as requested.
-            
-            # \w+ <= \w+ ;
-            pattern = r'(\w+)\s*<=\s*(\w+)\s*;'
-            for m in re.finditer(pattern, body):
-                dest = m.group(1)
-                src = m.group(2)
-                self.assignments.append((dest, src))
+        toks = self.tokens
+        texts = toks.texts
+
+        # Simplistic: the statements between the first BEGIN and the next END.
+        begin = next(toks.positions('BEGIN'), None)
+        if begin is None:
+            return
+        end = next(toks.positions('END', begin + 1), len(toks))
 
+        # Only direct assignments: identifier <= identifier ;
+        for k in toks.positions('<=', begin + 2, end - 1):
+            if k + 2 < end and texts[k + 2] == ';' and toks.is_name(k - 1) and toks.is_name(k + 1):
+                self.assignments.append((texts[k - 1], texts[k + 1]))
+                self.symbols.intern(texts[k - 1])
+                self.symbols.intern(texts[k + 1])
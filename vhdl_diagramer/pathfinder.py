@@ -0,0 +1,455 @@
+# ============================================================================
+# pathfinder.py - Negotiated-congestion routing over a process pool
+# ============================================================================
+
+import atexit
+import heapq
+import math
+import multiprocessing
+import os
+import random
+
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from .routing import Net, OccupancyGrid, Point, Router, WireMap, register_router
+
+# A search window as column and row ranges: (c_lo, c_hi, r_lo, r_hi)
+Window = Tuple[int, int, int, int]
+# (signal, [(start cell, goal cell, windows), ...], edges the signal already
+# uses, present factor, expansion budget per net)
+SignalTask = Tuple[int, List[Tuple[int, int, List[Window]]], List[int], float, Optional[int]]
+# Per net: (cell path or None, index of the window it was found in or -1,
+# nodes expanded, heap entries pushed)
+NetResult = Tuple[Optional[List[int]], int, int, int]
+
+
+def edge_id(a: int, b: int, rows: int) -> int:
+    """Id of the grid edge between adjacent cells a and b.
+
+    Cell i owns edge 2 * i (to the next column) and 2 * i + 1 (to the next
+    row), so every edge has exactly one id.
+    """
+    lo = min(a, b)
+    return 2 * lo + (abs(a - b) != rows)
+
+
+def path_edges(path: Sequence[int], rows: int) -> List[int]:
+    return [edge_id(a, b, rows) for a, b in zip(path, path[1:])]
+
+
+def search(blocked, usage, history, rows: int, window: Window, start: int, goal: int,
+           own: Set[int], present: float, limit: Optional[int] = None
+           ) -> Tuple[Optional[List[int]], int, int]:
+    """Cheapest cell path from start to goal under negotiated edge costs.
+
+    Crossing an edge costs (1 + history) * (1 + present * others), where
+    `others` counts the signals other than this one on the edge. Blocked
+    cells are impassable, except the goal (ports lie on block edges). Only
+    cells in `window` are used, and with `limit` the search gives up after
+    expanding that many nodes. Returns the path (or None), the nodes
+    expanded and the heap entries pushed.
+    """
+    c_lo, c_hi, r_lo, r_hi = window
+    gc, gr = divmod(goal, rows)
+    g_score: Dict[int, float] = {start: 0.0}
+    parent: Dict[int, int] = {start: -1}
+    closed: Set[int] = set()
+    sc, sr = divmod(start, rows)
+    heap = [(float(abs(sc - gc) + abs(sr - gr)), 0.0, start)]
+    heappush, heappop = heapq.heappush, heapq.heappop
+    expanded, pushes = 0, 1
+    while heap:
+        _, g, cur = heappop(heap)
+        if cur in closed:
+            continue
+        if cur == goal:
+            path = [cur]
+            while parent[cur] >= 0:
+                cur = parent[cur]
+                path.append(cur)
+            path.reverse()
+            return path, expanded, pushes
+        if expanded == limit:
+            break
+        closed.add(cur)
+        expanded += 1
+        c, r = divmod(cur, rows)
+        for nc, nr, nb, e in ((c + 1, r, cur + rows, 2 * cur), (c - 1, r, cur - rows, 2 * (cur - rows)),
+                              (c, r + 1, cur + 1, 2 * cur + 1), (c, r - 1, cur - 1, 2 * cur - 1)):
+            if nc < c_lo or nc > c_hi or nr < r_lo or nr > r_hi or nb in closed:
+                continue
+            if blocked[nb] and nb != goal:
+                continue
+            others = usage[e] - (e in own)
+            ng = g + (1.0 + history[e]) * (1.0 + present * others)
+            if ng < g_score.get(nb, math.inf):
+                g_score[nb] = ng
+                parent[nb] = cur
+                heappush(heap, (ng + abs(nc - gc) + abs(nr - gr), ng, nb))
+                pushes += 1
+    return None, expanded, pushes
+
+
+def route_signal(blocked, usage, history, rows: int, task: SignalTask) -> List[NetResult]:
+    """Route the nets of one signal against the current costs.
+
+    Nets of one signal never compete: the signal's own edges do not count
+    as congestion, and its nets in this task do not see each other. Each
+    net is searched in its windows in turn, as Router.search_windows()
+    does, until one holds a path or the net's budget runs out.
+    """
+    signal, nets, own_edges, present, budget = task
+    own = set(own_edges)
+    results = []
+    for start, goal, windows in nets:
+        path, level, expanded, pushes = None, -1, 0, 0
+        for k, window in enumerate(windows):
+            limit = None if budget is None else budget - expanded
+            if limit is not None and limit <= 0:
+                break
+            path, e, p = search(blocked, usage, history, rows, window, start, goal, own, present, limit)
+            expanded += e
+            pushes += p
+            if path is not None:
+                level = k
+                break
+        results.append((path, level, expanded, pushes))
+    return results
+
+
+class SharedGrid:
+    """The obstacle grid and congestion costs in one shared memory block.
+
+    Layout: history (doubles, one per edge), then usage (unsigned shorts,
+    one per edge), then the blocked flags (one byte per cell). Workers only
+    ever read it; the routing process updates usage and history between
+    iterations, while no worker is running.
+    """
+
+    def __init__(self, cells: int, name: Optional[str] = None):
+        edges = 2 * cells
+        self.cells = cells
+        self._offsets = (0, edges * 8, edges * 10, edges * 10 + cells)
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=max(1, self._offsets[3]))
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+        buf = self.shm.buf
+        o = self._offsets
+        self._views = [buf[o[0]:o[1]], buf[o[1]:o[2]], buf[o[2]:o[3]]]
+        self.history = self._views[0].cast('d')
+        self.usage = self._views[1].cast('H')
+        self.blocked = self._views[2]
+
+    def close(self, unlink: bool = False) -> None:
+        for view in (self.history, self.usage, *self._views):
+            view.release()
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+_worker_grid: Optional[SharedGrid] = None
+
+
+def _init_worker() -> None:
+    # Pool processes outlive a route_all(); release the grid views before
+    # interpreter shutdown, which cannot close memory they still export
+    atexit.register(_release_grid)
+
+
+def _release_grid() -> None:
+    global _worker_grid
+    if _worker_grid is not None:
+        _worker_grid.close()
+        _worker_grid = None
+
+
+def _route_shared(args: Tuple[str, int, int, SignalTask]) -> List[NetResult]:
+    """Worker entry point: attach to the shared grid (once) and route a task."""
+    global _worker_grid
+    name, cells, rows, task = args
+    if _worker_grid is None or _worker_grid.name != name:
+        if _worker_grid is not None:
+            _worker_grid.close()
+        _worker_grid = SharedGrid(cells, name)
+    grid = _worker_grid
+    return route_signal(grid.blocked, grid.usage, grid.history, rows, task)
+
+
+@register_router
+class PathFinderRouter(Router):
+    """PathFinder-style negotiated-congestion routing.
+
+    All nets are routed, then rerouted in rounds while any grid edge is
+    used by more than one signal. Each round the present-congestion factor
+    grows and overused edges accumulate history cost, so nets negotiate
+    who gets a contested passage. Wires may cross (a crossing uses two
+    different edges of a cell) but not overlap.
+
+    Each round reroutes the conflicting nets, one task per signal, in an
+    order drawn from random.Random(seed). Tasks whose ends lie far apart
+    are put in one batch and routed against the same costs, spread over a
+    ProcessPoolExecutor with `workers` processes (default: one per core)
+    that read the grid from shared memory; batches run one after the
+    other. Results thus depend only on the seed, never on the number of
+    workers. Routing stops early once `patience` rounds bring no fewer
+    conflicts. Nets with manual paths, and routes already in `wires`, are
+    fixed. Every search keeps to the net's windows and expansion budget
+    (see Router.search_windows()).
+
+    The pool is kept between calls until close(). Its processes are
+    spawned, not forked: the app routes from a thread of a multithreaded
+    Tk process, which a fork would copy mid-flight.
+    """
+
+    name = 'pathfinder'
+    routes_jointly = True
+    max_iterations = 30
+    patience = 8
+    present_factor = 0.5
+    present_growth = 1.5
+    history_factor = 1.0
+    batch_margin = 4        # cells around a task's ends that it may compete for
+    min_parallel_nets = 64  # fewer nets are routed in this process
+
+    def __init__(self, grid_step: int = 10, workers: Optional[int] = None, seed: int = 0):
+        super().__init__(grid_step)
+        self.workers = workers
+        self.seed = seed
+        self.iterations = 0  # rounds run by the last route_all()
+        self.conflicts = 0   # edges still shared by several signals after it
+        self.expanded = 0
+        self.pushes = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pool_size = 0
+
+    def pool(self, size: int) -> ProcessPoolExecutor:
+        if self._executor is None or self._pool_size != size:
+            self.close()
+            self._executor = ProcessPoolExecutor(max_workers=size, mp_context=multiprocessing.get_context('spawn'),
+                                                 initializer=_init_worker)
+            self._pool_size = size
+        return self._executor
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def cell_window(self, occupancy: OccupancyGrid, window: Tuple[int, int, int, int]) -> Window:
+        """The columns and rows of `occupancy` inside a coordinate window."""
+        xmin, xmax, ymin, ymax = window
+        step = occupancy.step
+        return (max(0, math.ceil((xmin - occupancy.xmin) / step)),
+                min(occupancy.cols - 1, math.floor((xmax - occupancy.xmin) / step)),
+                max(0, math.ceil((ymin - occupancy.ymin) / step)),
+                min(occupancy.rows - 1, math.floor((ymax - occupancy.ymin) / step)))
+
+    def route_points(self, net, occupancy, wires, bounds):
+        return self.route_all([net], occupancy, wires, bounds)[0]
+
+    def route_all(self, nets: List[Net], occupancy: OccupancyGrid, wires: WireMap,
+                  bounds: Tuple[int, int, int, int]) -> List[List[Point]]:
+        rows = occupancy.rows
+
+        # edge -> signal -> number of nets of that signal on the edge
+        edge_signals: Dict[int, Dict[int, int]] = {}
+        # signal -> edges it uses, with multiplicity
+        signal_edges: Dict[int, Dict[int, int]] = {}
+
+        def use(edges: List[int], signal: int, delta: int) -> None:
+            mine = signal_edges.setdefault(signal, {})
+            for e in edges:
+                users = edge_signals.setdefault(e, {})
+                n = users.get(signal, 0) + delta
+                if n:
+                    users[signal] = n
+                else:
+                    del users[signal]
+                m = mine.get(e, 0) + delta
+                if m:
+                    mine[e] = m
+                else:
+                    del mine[e]
+                usage[e] = min(len(users), 0xFFFF)
+
+        pool_size = self.workers or os.cpu_count() or 1
+        parallel = pool_size > 1 and len(nets) >= self.min_parallel_nets
+        shared = SharedGrid(len(occupancy)) if parallel else None
+        if shared is not None:
+            shared.blocked[:] = occupancy.cells
+            usage, history, blocked = shared.usage, shared.history, shared.blocked
+        else:
+            usage = array('H', bytes(4 * len(occupancy)))
+            history = array('d', bytes(16 * len(occupancy)))
+            blocked = occupancy.cells
+        executor = self.pool(pool_size) if parallel else None
+        try:
+            self._add_fixed_wires(wires, occupancy, use)
+
+            # Nets that are searched; the others have fixed paths
+            full: List[Optional[List[Point]]] = [None] * len(nets)
+            searched: List[int] = []
+            ends: List[Tuple[int, int]] = []
+            windows: List[List[Window]] = []
+            stubs = [self.stubs(net, occupancy) for net in nets]
+            for i, (net, (start_stub, goal_stub)) in enumerate(zip(nets, stubs)):
+                s, t = occupancy.index(*start_stub), occupancy.index(*goal_stub)
+                if net.path is None and s >= 0 and t >= 0:
+                    searched.append(i)
+                    ends.append((s, t))
+                    windows.append([self.cell_window(occupancy, w)
+                                    for w in self.windows([start_stub, goal_stub], bounds)])
+                    continue
+                path = net.path if net.path is not None else self.manhattan(start_stub, goal_stub)
+                full[i] = self.full_points(net, start_stub, path)
+                use(self._polyline_edges(full[i], occupancy), net.signal, 1)
+
+            paths: List[Optional[List[int]]] = [None] * len(searched)
+            rng = random.Random(self.seed)
+            present = self.present_factor
+            todo = list(range(len(searched)))
+            self.iterations = self.conflicts = 0
+            best, best_round = math.inf, 0
+            while todo and self.iterations < self.max_iterations:
+                self.iterations += 1
+                # One task per signal, in order of first appearance
+                by_signal: Dict[int, List[int]] = {}
+                for k in todo:
+                    by_signal.setdefault(nets[searched[k]].signal, []).append(k)
+                groups = list(by_signal.items())
+                for batch in self._batches([[ends[k] for k in ks] for _, ks in groups], rows):
+                    tasks = [(signal, [(*ends[k], windows[k]) for k in ks], list(signal_edges.get(signal, ())),
+                              present, self.max_expansions)
+                             for signal, ks in (groups[j] for j in batch)]
+                    if executor is not None and len(tasks) > 1:
+                        chunksize = max(1, len(tasks) // (pool_size * 4))
+                        results = list(executor.map(_route_shared, [(shared.name, len(occupancy), rows, task)
+                                                                    for task in tasks], chunksize=chunksize))
+                    else:
+                        results = [route_signal(blocked, usage, history, rows, task) for task in tasks]
+                    for j, task_results in zip(batch, results):
+                        signal, ks = groups[j]
+                        for k, (path, level, expanded, pushes) in zip(ks, task_results):
+                            self.expanded += expanded
+                            self.pushes += pushes
+                            self.window_levels[level if level >= 0 else 'failed'] += 1
+                            if paths[k] is not None:
+                                use(path_edges(paths[k], rows), signal, -1)
+                            paths[k] = path
+                            if path is not None:
+                                use(path_edges(path, rows), signal, 1)
+
+                overused = {e for e, users in edge_signals.items() if len(users) > 1}
+                self.conflicts = len(overused)
+                if self.conflicts < best:
+                    best, best_round = self.conflicts, self.iterations
+                if not overused or self.iterations - best_round >= self.patience:
+                    break
+                for e in overused:
+                    history[e] += self.history_factor * (len(edge_signals[e]) - 1)
+                present *= self.present_growth
+                todo = [k for k, path in enumerate(paths)
+                        if path is not None and not overused.isdisjoint(path_edges(path, rows))]
+                rng.shuffle(todo)
+        finally:
+            if shared is not None:
+                shared.close(unlink=True)
+
+        for k, i in enumerate(searched):
+            net = nets[i]
+            start_stub, goal_stub = stubs[i]
+            if paths[k] is None:
+                path = self.manhattan(start_stub, goal_stub)
+            else:
+                path = [occupancy.cell(c) for c in paths[k]]
+            full[i] = self.full_points(net, start_stub, path)
+        for net, points in zip(nets, full):
+            wires.mark_points(points, net.signal)
+        return full
+
+    def _batches(self, ends: List[List[Tuple[int, int]]], rows: int) -> List[List[int]]:
+        """Split tasks, in order, into batches that can be routed together.
+
+        A task joins the first batch whose tasks all have bounding boxes
+        (widened by `batch_margin` cells) disjoint from its own, after any
+        batch it overlaps, so tasks likely to compete for space are routed
+        one after the other, each seeing the routes before it.
+        """
+        pad = self.batch_margin
+        batches: List[List[int]] = []
+        boxes: List[List[Tuple[int, int, int, int]]] = []
+        for j, task_ends in enumerate(ends):
+            cols_, rows_ = [], []
+            for cell in (c for pair in task_ends for c in pair):
+                c, r = divmod(cell, rows)
+                cols_.append(c)
+                rows_.append(r)
+            box = (min(cols_) - pad, min(rows_) - pad, max(cols_) + pad, max(rows_) + pad)
+            first = len(batches)
+            for b in range(len(batches) - 1, -1, -1):
+                if any(box[0] <= o[2] and o[0] <= box[2] and box[1] <= o[3] and o[1] <= box[3]
+                       for o in boxes[b]):
+                    break
+                first = b
+            if first == len(batches):
+                batches.append([])
+                boxes.append([])
+            batches[first].append(j)
+            boxes[first].append(box)
+        return batches
+
+    def _add_fixed_wires(self, wires: WireMap, occupancy: OccupancyGrid, use) -> None:
+        """Count the routes already in `wires` as fixed edge usage."""
+        fixed = set()
+        for p1, p2, signal in wires.segments():
+            fixed.update((e, signal) for e in self._polyline_edges([p1, p2], occupancy))
+        for e, signal in sorted(fixed):
+            use([e], signal, 1)
+
+    def _polyline_edges(self, points: List[Point], occupancy: OccupancyGrid) -> List[int]:
+        """Edges under a polyline, for its parts that run along the grid."""
+        rows = occupancy.rows
+        edges = []
+        for (x1, y1), (x2, y2) in zip(points, points[1:]):
+            a, b = occupancy.index(x1, y1), occupancy.index(x2, y2)
+            if a < 0 or b < 0 or (x1 != x2 and y1 != y2):
+                continue
+            stride = rows if y1 == y2 else 1
+            if b < a:
+                a, b = b, a
+            edges.extend(edge_id(c, c + stride, rows) for c in range(a, b, stride))
+        return edges
+
+    def find_path(self, start, goal, occupancy, wire_occupancy, signal, xmin, xmax, ymin, ymax, limit=None):
+        """One net alone: a first negotiation round against the wires laid.
+
+        Edges the wires of other signals use cost as in the first round of
+        route_all(); with nothing to negotiate with, there is no history.
+        """
+        s, t = occupancy.index(*start), occupancy.index(*goal)
+        if s < 0 or t < 0:
+            return None
+        usage = array('H', bytes(4 * len(occupancy)))
+        history = array('d', bytes(16 * len(occupancy)))
+        own: Set[int] = set()
+
+        def use(edges: List[int], owner: int, delta: int) -> None:
+            for e in edges:
+                usage[e] = min(usage[e] + delta, 0xFFFF)
+                if owner == signal:
+                    own.add(e)
+
+        if wire_occupancy is not None:
+            self._add_fixed_wires(wire_occupancy, occupancy, use)
+        path, expanded, pushes = search(occupancy.cells, usage, history, occupancy.rows,
+                                        self.cell_window(occupancy, (xmin, xmax, ymin, ymax)),
+                                        s, t, own, self.present_factor, limit)
+        self.expanded += expanded
+        self.pushes += pushes
+        return None if path is None else [occupancy.cell(c) for c in path]
@@ -0,0 +1,180 @@
+# ============================================================================
+# project.py - Multi-file project loading
+# ============================================================================
+
+import os
+
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Callable, Container, Dict, Iterable, List, Optional, Tuple
+
+from .models import EntityDecl, Instance
+from .parser import VHDLParser
+
+VHDL_EXTENSIONS = ('.vhd', '.vhdl')
+
+
+class EntityLibrary:
+    """All entities declared across a project, keyed case-insensitively by name.
+
+    When two files declare the same entity the first one (in sorted path
+    order) wins and the clash is recorded in `duplicates`.
+    """
+
+    def __init__(self):
+        self.entities: Dict[str, EntityDecl] = {}
+        self.duplicates: List[Tuple[str, str]] = []  # (entity name, ignored source)
+        self.errors: Dict[str, str] = {}  # path -> error message
+        self.files: List[str] = []
+        self._port_modes: Dict[str, Dict[str, str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.entities)
+
+    def __contains__(self, name: str) -> bool:
+        return name.lower() in self.entities
+
+    def get(self, name: str) -> Optional[EntityDecl]:
+        return self.entities.get(name.lower())
+
+    def add(self, decl: EntityDecl) -> None:
+        key = decl.name.lower()
+        if key in self.entities:
+            self.duplicates.append((decl.name, decl.source))
+        else:
+            self.entities[key] = decl
+            self._port_modes.pop(key, None)
+
+    def replace_file(self, path: str, decls: List[EntityDecl], error: Optional[str] = None) -> None:
+        """Swap in the declarations of a file that was parsed again."""
+        stale = [key for key, decl in self.entities.items() if decl.source == path]
+        for key in stale:
+            del self.entities[key]
+            self._port_modes.pop(key, None)
+        self.duplicates = [d for d in self.duplicates if d[1] != path]
+        self.errors.pop(path, None)
+        if error is not None:
+            self.errors[path] = error
+        for decl in decls:
+            self.add(decl)
+
+    def port_modes(self, name: str) -> Optional[Dict[str, str]]:
+        """Lower-cased port name -> direction for an entity, or None if unknown."""
+        key = name.lower()
+        modes = self._port_modes.get(key)
+        if modes is None:
+            decl = self.entities.get(key)
+            if decl is None:
+                return None
+            modes = self._port_modes[key] = {p.name.lower(): p.direction for p in decl.ports}
+        return modes
+
+    def apply_directions(self, instances: List[Instance],
+                         skip: Container[str] = ()) -> int:
+        """Set port directions of instances from their entity declarations.
+
+        Instances whose lower-cased entity name is in `skip` (typically the
+        parser's own port_modes, which take precedence) are left alone, as are
+        ports of unknown entities and ports the entity does not declare.
+        Returns the number of ports whose direction changed.
+        """
+        changed = 0
+        for inst in instances:
+            if inst.entity.lower() in skip:
+                continue
+            modes = self.port_modes(inst.entity)
+            if modes is None:
+                continue
+            for port in inst.ports:
+                direction = modes.get(port.name.split('(', 1)[0].strip().lower())
+                if direction is not None and direction != port.direction:
+                    port.direction = direction
+                    changed += 1
+        return changed
+
+
+def find_vhdl_files(paths: Iterable[str]) -> List[str]:
+    """Expand directories (recursively) into VHDL files; plain files are kept as is."""
+    files = set()
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                dirs[:] = [d for d in dirs if not d.startswith('.')]
+                for name in names:
+                    if name.lower().endswith(VHDL_EXTENSIONS):
+                        files.add(os.path.join(root, name))
+        else:
+            files.add(path)
+    return sorted(files)
+
+
+def parse_entities(path: str) -> Tuple[str, List[EntityDecl], Optional[str]]:
+    """Parse one file and return (path, entity declarations, error message).
+
+    Runs in worker processes, so it only returns small picklable results and
+    reports failures instead of raising them.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            text = f.read()
+        parser = VHDLParser(text)
+        parser.parse()
+    except Exception as e:
+        return path, [], str(e)
+    decls = list(parser.entities.values())
+    for decl in decls:
+        decl.source = path
+    return path, decls, None
+
+
+def load_project(
+    paths: Iterable[str],
+    max_workers: Optional[int] = None,
+    executor: Optional[Executor] = None,
+    progress: Optional[Callable[[int, int], None]] = None
+) -> EntityLibrary:
+    """Parse every VHDL file under paths in parallel and merge them into one library.
+
+    Files are spread over a ProcessPoolExecutor with `max_workers` processes
+    (default: one per core). With a single worker, or a single file, parsing
+    runs in this process and no pool is started. `progress(done, total)` is
+    called as files are merged; if it raises, the pool is shut down without
+    waiting for the remaining files.
+    """
+    files = find_vhdl_files(paths)
+    library = EntityLibrary()
+    library.files = files
+    workers = max_workers or os.cpu_count() or 1
+
+    if executor is None and (workers <= 1 or len(files) <= 1):
+        _merge(library, map(parse_entities, files), len(files), progress)
+        return library
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    completed = False
+    try:
+        # Batch files so the per-task IPC cost is spread over several parses.
+        chunksize = max(1, len(files) // (workers * 4))
+        _merge(library, executor.map(parse_entities, files, chunksize=chunksize), len(files), progress)
+        completed = True
+    finally:
+        if own_executor:
+            executor.shutdown(wait=completed)
+    return library
+
+
+def _merge(
+    library: EntityLibrary,
+    results: Iterable[Tuple[str, List[EntityDecl], Optional[str]]],
+    total: int,
+    progress: Optional[Callable[[int, int], None]] = None
+) -> None:
+    # executor.map yields in submission order, so merging is deterministic.
+    for done, (path, decls, error) in enumerate(results, 1):
+        if error is not None:
+            library.errors[path] = error
+        for decl in decls:
+            library.add(decl)
+        if progress is not None:
+            progress(done, total)
@@ -0,0 +1,133 @@
+# ============================================================================
+# routeworker.py - Wire routing on a background thread
+# ============================================================================
+
+import queue
+import threading
+
+from typing import Hashable, List, NamedTuple, Optional, Tuple
+
+from .routing import Net, OccupancyGrid, Point, Rect, RouteSession, Router, Segment, get_router
+
+
+class RouteSnapshot(NamedTuple):
+    """Everything one routing pass reads, as plain immutable values."""
+    version: int                        # increases with every snapshot submitted
+    router: str                         # a key of routing.ROUTERS
+    grid_step: int
+    trees: bool
+    symbols: int                        # changes when signal ids are renumbered
+    keys: Tuple[Hashable, ...]
+    nets: Tuple[Net, ...]
+    obstacles: Tuple[Rect, ...]
+    bounds: Tuple[int, int, int, int]
+
+    def same_job(self, other: Optional['RouteSnapshot']) -> bool:
+        """True if `other` routes exactly the same thing, whatever its version."""
+        return other is not None and self[1:] == other[1:]
+
+
+class RouteResult(NamedTuple):
+    version: int                        # of the snapshot routed
+    routes: List[List[Segment]]         # segments per net, in snapshot order
+    junctions: List[Tuple[Point, int]]  # see WireMap.junctions()
+    error: Optional[BaseException] = None
+
+
+class RouteWorker:
+    """Routes RouteSnapshots on a daemon thread, always the newest one.
+
+    submit() replaces a snapshot still waiting, and the pass in progress is
+    abandoned between steps (`check_interval` seconds of routing) once a
+    newer snapshot arrives; the worker's RouteSession keeps the nets routed
+    so far, so the next pass starts from them. Results go into a queue the
+    UI drains with poll() from a `root.after` loop, so they are only ever
+    applied on the Tk thread. The session belongs to the worker thread.
+    """
+
+    check_interval = 0.05
+
+    def __init__(self, cache_size: int = 4096):
+        self.session = RouteSession(cache_size)
+        self._router: Optional[Router] = None
+        self._symbols: Optional[int] = None
+        self._lock = threading.Lock()
+        self._latest: Optional[RouteSnapshot] = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._results: "queue.Queue[RouteResult]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'RouteWorker':
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='route-worker', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(1)
+            self._thread = None
+
+    def submit(self, snapshot: RouteSnapshot) -> None:
+        with self._lock:
+            self._latest = snapshot
+        self._wake.set()
+
+    def poll(self) -> Optional[RouteResult]:
+        """The newest result posted since the last poll, if any."""
+        result = None
+        try:
+            while True:
+                result = self._results.get_nowait()
+        except queue.Empty:
+            return result
+
+    def _take(self) -> Optional[RouteSnapshot]:
+        with self._lock:
+            snapshot, self._latest = self._latest, None
+            self._wake.clear()
+        return snapshot
+
+    def _superseded(self) -> bool:
+        with self._lock:
+            return self._latest is not None or self._stop.is_set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait()
+            snapshot = self._take()
+            if snapshot is not None and not self._stop.is_set():
+                result = self.route(snapshot)
+                if result is not None:
+                    self._results.put(result)
+        if self._router is not None:
+            self._router.close()
+
+    def route(self, snapshot: RouteSnapshot) -> Optional[RouteResult]:
+        """Route one snapshot; None if a newer one arrived meanwhile."""
+        try:
+            router = self._router
+            if (router is None or router.name != snapshot.router or router.grid_step != snapshot.grid_step
+                    or self._symbols != snapshot.symbols):
+                # Signal ids of another table mean other signals
+                if router is not None:
+                    router.close()
+                router = self._router = get_router(snapshot.router, snapshot.grid_step)
+                self._symbols = snapshot.symbols
+            occupancy = OccupancyGrid(*snapshot.bounds, snapshot.grid_step)
+            for rect in snapshot.obstacles:
+                occupancy.block_rect(*rect)
+            session = self.session
+            session.begin(router, list(snapshot.keys), list(snapshot.nets), occupancy,
+                          list(snapshot.obstacles), snapshot.bounds, trees=snapshot.trees)
+            while session.pending:
+                session.step(self.check_interval)
+                if self._superseded():
+                    return None
+            return RouteResult(snapshot.version, list(session.routes), session.wires.junctions())
+        except Exception as e:  # reported to the UI thread, not raised here
+            return RouteResult(snapshot.version, [], [], e)
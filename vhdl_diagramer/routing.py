@@ -2,74 +2,1294 @@
 # routing.py - Pathfinding and routing algorithms
 # ============================================================================
 
+import bisect
 import heapq
+import math
+import time
 
-from typing import Dict, List, Optional, Set, Tuple
+from array import array
+from collections import Counter, OrderedDict, deque
+from itertools import compress
+from typing import Container, Deque, Dict, Hashable, Iterator, List, NamedTuple, Optional, Set, Tuple, Type
+
+from .utils import compress_polyline
+
+Point = Tuple[int, int]
+Segment = Tuple[Point, Point]
+
+
+class OccupancyGrid:
+    """Blocked/free raster over the routing grid, one byte per cell.
+
+    Cells are the lattice points (xmin + c * step, ymin + r * step), stored
+    column-major in a bytearray and addressed by the integer index
+    c * rows + r; sorting indices therefore sorts cells by (x, y), the same
+    order as coordinate tuples. Rectangles are rasterized with one slice
+    assignment per column, so building the grid costs O(columns x blocks)
+    slice operations rather than O(cells x blocks) Python comparisons.
+
+    Lookups by coordinate (get, []) behave like the dict of cell -> blocked
+    this replaces: points outside the grid or off the lattice are missing.
+    `rects` lists the blocked rectangles as (c0, c1, r0, r1) ranges of
+    columns and rows, for backends that route around obstacle outlines.
+    The distance transform behind nearest_free() is built on first use and
+    dropped whenever a rectangle is blocked.
+    """
+
+    def __init__(self, xmin: int, xmax: int, ymin: int, ymax: int, step: int):
+        self.xmin = xmin
+        self.ymin = ymin
+        self.step = step
+        self.cols = max(0, (xmax - xmin) // step + 1)
+        self.rows = max(0, (ymax - ymin) // step + 1)
+        self.cells = bytearray(self.cols * self.rows)
+        self.rects: List[Tuple[int, int, int, int]] = []
+        self._transform: Optional[Tuple[array, array]] = None
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+    @property
+    def shape(self) -> Tuple[int, int, int, int, int]:
+        """(xmin, ymin, step, cols, rows): grids with equal shapes share indices."""
+        return self.xmin, self.ymin, self.step, self.cols, self.rows
+
+    def index(self, x: int, y: int) -> int:
+        """Flat index of the cell at (x, y), or -1 if there is none."""
+        dx = x - self.xmin
+        dy = y - self.ymin
+        if dx % self.step or dy % self.step:
+            return -1
+        c = dx // self.step
+        r = dy // self.step
+        if 0 <= c < self.cols and 0 <= r < self.rows:
+            return int(c * self.rows + r)
+        return -1
+
+    def cell(self, i: int) -> Tuple[int, int]:
+        c, r = divmod(i, self.rows)
+        return self.xmin + c * self.step, self.ymin + r * self.step
+
+    def neighbors(self, i: int) -> Iterator[int]:
+        """Flat indices of the up to four cells next to cell i."""
+        c, r = divmod(i, self.rows)
+        if c + 1 < self.cols:
+            yield i + self.rows
+        if c > 0:
+            yield i - self.rows
+        if r + 1 < self.rows:
+            yield i + 1
+        if r > 0:
+            yield i - 1
+
+    def pocket(self, x: int, y: int, limit: int) -> Optional[Set[int]]:
+        """The cell at (x, y) and the free cells reachable from it, or None.
+
+        The cell itself may be blocked (a port on a block edge). Returns
+        None as soon as `limit` cells are found, or if there is no cell at
+        (x, y): only small enclosed regions are worth listing.
+        """
+        start = self.index(x, y)
+        if start < 0:
+            return None
+        cells = self.cells
+        found = {start}
+        todo = [start]
+        while todo:
+            for j in self.neighbors(todo.pop()):
+                if not cells[j] and j not in found:
+                    if len(found) >= limit:
+                        return None
+                    found.add(j)
+                    todo.append(j)
+        return found
+
+    def distance_transform(self) -> Tuple[array, array]:
+        """(distance, nearest): per cell, grid steps to the nearest free cell
+        and that cell's index.
+
+        Free cells are their own nearest at distance 0. A breadth-first pass
+        out of them over the blocked cells gives the Manhattan distance;
+        blocked cells with no free cell anywhere keep -1 in both.
+        """
+        if self._transform is None:
+            cells = self.cells
+            n = len(cells)
+            distance = array('i', bytes(4 * n))
+            nearest = array('i', range(n))
+            blocked = list(compress(range(n), cells))
+            for i in blocked:
+                distance[i] = nearest[i] = -1
+            frontier = []
+            for i in blocked:
+                for j in self.neighbors(i):
+                    if not cells[j]:
+                        distance[i], nearest[i] = 1, j
+                        frontier.append(i)
+                        break
+            d = 1
+            while frontier:
+                d += 1
+                reached = []
+                for i in frontier:
+                    for j in self.neighbors(i):
+                        if nearest[j] < 0:
+                            distance[j], nearest[j] = d, nearest[i]
+                            reached.append(j)
+                frontier = reached
+            self._transform = distance, nearest
+        return self._transform
+
+    def nearest_free(self, i: int) -> int:
+        """Index of the free cell nearest to cell i, or -1 if none is free."""
+        return i if not self.cells[i] else self.distance_transform()[1][i]
+
+    def block_rect(self, x1: float, y1: float, x2: float, y2: float) -> None:
+        """Mark every cell with x1 <= x <= x2 and y1 <= y <= y2 as blocked."""
+        step = self.step
+        c0 = max(0, math.ceil((x1 - self.xmin) / step))
+        c1 = min(self.cols - 1, math.floor((x2 - self.xmin) / step))
+        r0 = max(0, math.ceil((y1 - self.ymin) / step))
+        r1 = min(self.rows - 1, math.floor((y2 - self.ymin) / step))
+        if c0 > c1 or r0 > r1:
+            return
+        self.rects.append((c0, c1, r0, r1))
+        self._transform = None
+        run = b'\x01' * (r1 - r0 + 1)
+        cells = self.cells
+        for base in range(c0 * self.rows, (c1 + 1) * self.rows, self.rows):
+            cells[base + r0:base + r1 + 1] = run
+
+    def get(self, cell: Tuple[int, int], default: bool = True) -> bool:
+        # index() inlined: this is called for every cell A* looks at
+        c, dx = divmod(cell[0] - self.xmin, self.step)
+        r, dy = divmod(cell[1] - self.ymin, self.step)
+        if dx or dy or not (0 <= c < self.cols and 0 <= r < self.rows):
+            return default
+        return self.cells[c * self.rows + r] != 0
+
+    def __getitem__(self, cell: Tuple[int, int]) -> bool:
+        i = self.index(*cell)
+        if i < 0:
+            raise KeyError(cell)
+        return self.cells[i] != 0
+
+
+class WireMap:
+    """Signal ids on the wires over an OccupancyGrid, as segment intervals.
+
+    Each horizontal or vertical segment is kept once, as (lo, hi, signal)
+    in a sorted list for its row (keyed by y) or column (keyed by x); lo
+    and hi are its first and last cell. Storage grows with the number of
+    segments, not their length. A segment may be marked more than once and
+    unmark_points() takes out one mark, so a route's wires can be removed
+    without disturbing other routes of the same signal.
+
+    Per cell, get() and at() give signal id -> number of segments over the
+    cell; `len()` and `in` see just the distinct signals. `cover` counts
+    the segments over each grid cell, so the router's inner loops pass free
+    cells with one array read and query the intervals only for wired ones.
+    Segments off the lattice (wire ends at ports that are not grid aligned)
+    are indexed too, so junction detection still sees them; they add
+    nothing to `cover`. `version` changes with every mark and unmark, so
+    data derived from the map can tell when it is stale.
+    """
+
+    def __init__(self, grid: OccupancyGrid):
+        self.grid = grid
+        self.cover = array('H', bytes(2 * len(grid)))
+        self.horizontal: Dict[int, List[Tuple[int, int, int]]] = {}  # y -> segments
+        self.vertical: Dict[int, List[Tuple[int, int, int]]] = {}    # x -> segments
+        self.version = 0
+        self._at: Dict[int, Dict[int, int]] = {}  # at() results, dropped along each change
+
+    def _interval(self, p1: Point, p2: Point) -> Optional[Tuple[bool, int, int, int]]:
+        """(horizontal, line, lo, hi) of a segment, or None if it is diagonal."""
+        (x1, y1), (x2, y2) = p1, p2
+        if y1 == y2:
+            horizontal, line, lo, end = True, y1, min(x1, x2), max(x1, x2)
+        elif x1 == x2:
+            horizontal, line, lo, end = False, x1, min(y1, y2), max(y1, y2)
+        else:
+            return None
+        # Cells run from lo in steps up to the first one at or past the end
+        step = self.grid.step
+        return horizontal, line, lo, lo + -(-(end - lo) // step) * step
+
+    def _cells(self, horizontal: bool, line: int, lo: int, hi: int) -> range:
+        """Flat indices of the grid cells under an interval."""
+        grid, step = self.grid, self.grid.step
+        if horizontal:
+            fixed, off = divmod(line - grid.ymin, step)
+            first, start_off = divmod(lo - grid.xmin, step)
+            fixed_n, n, stride, base = grid.rows, grid.cols, grid.rows, fixed
+        else:
+            fixed, off = divmod(line - grid.xmin, step)
+            first, start_off = divmod(lo - grid.ymin, step)
+            fixed_n, n, stride, base = grid.cols, grid.rows, 1, fixed * grid.rows
+        if off or start_off or not 0 <= fixed < fixed_n:
+            return range(0)
+        last = min(n - 1, first + (hi - lo) // step)
+        first = max(0, first)
+        return range(base + first * stride, base + last * stride + 1, stride)
+
+    def mark_segment(self, p1: Point, p2: Point, signal: int) -> None:
+        """Add `signal` along a horizontal or vertical segment."""
+        found = self._interval(p1, p2)
+        if found is None:
+            return
+        horizontal, line, lo, hi = found
+        lines = self.horizontal if horizontal else self.vertical
+        bisect.insort(lines.setdefault(line, []), (lo, hi, signal))
+        cover, cached = self.cover, self._at
+        for i in self._cells(horizontal, line, lo, hi):
+            cover[i] += 1
+            cached.pop(i, None)
+        self.version += 1
+
+    def unmark_segment(self, p1: Point, p2: Point, signal: int) -> None:
+        """Undo one mark_segment(p1, p2, signal)."""
+        found = self._interval(p1, p2)
+        if found is None:
+            return
+        horizontal, line, lo, hi = found
+        lines = self.horizontal if horizontal else self.vertical
+        segments = lines.get(line)
+        entry = (lo, hi, signal)
+        j = bisect.bisect_left(segments, entry) if segments else 0
+        if not segments or j == len(segments) or segments[j] != entry:
+            return
+        del segments[j]
+        if not segments:
+            del lines[line]
+        cover, cached = self.cover, self._at
+        for i in self._cells(horizontal, line, lo, hi):
+            cover[i] -= 1
+            cached.pop(i, None)
+        self.version += 1
+
+    @staticmethod
+    def _runs(points: List[Point]) -> List[Segment]:
+        """The segments of a polyline, with straight stretches merged.
+
+        Paths come one cell per point; merging them keeps one interval per
+        straight run. Only segments going the same way are merged, so a
+        path that doubles back still covers every cell it visited.
+        """
+        runs: List[Segment] = []
+        way = None
+        for p1, p2 in zip(points, points[1:]):
+            if p1 == p2 and (runs or len(points) > 2):
+                continue
+            step_way = ((p2[0] > p1[0]) - (p2[0] < p1[0]), (p2[1] > p1[1]) - (p2[1] < p1[1]))
+            if runs and step_way == way and runs[-1][1] == p1:
+                runs[-1] = (runs[-1][0], p2)
+            else:
+                runs.append((p1, p2))
+                way = step_way
+        return runs
+
+    def mark_points(self, points: List[Point], signal: int) -> None:
+        for p1, p2 in self._runs(points):
+            self.mark_segment(p1, p2, signal)
+
+    def unmark_points(self, points: List[Point], signal: int) -> None:
+        """Take out exactly what mark_points(points, signal) put in."""
+        for p1, p2 in self._runs(points):
+            self.unmark_segment(p1, p2, signal)
+
+    def _add_line(self, found: Dict[int, int], segments: Optional[List[Tuple[int, int, int]]], v: int) -> None:
+        if not segments:
+            return
+        step = self.grid.step
+        for lo, hi, signal in segments[:bisect.bisect_right(segments, (v, math.inf))]:
+            if v <= hi and not (v - lo) % step:
+                found[signal] = found.get(signal, 0) + 1
+
+    def get(self, cell: Point, default=()):
+        x, y = cell
+        found: Dict[int, int] = {}
+        self._add_line(found, self.horizontal.get(y), x)
+        self._add_line(found, self.vertical.get(x), y)
+        return found or default
+
+    def at(self, i: int) -> Dict[int, int]:
+        """get() of grid cell i; empty when cover[i] is 0."""
+        found = self._at.get(i)
+        if found is None:
+            found = self._at[i] = self.get(self.grid.cell(i), {}) if self.cover[i] else {}
+        return found
+
+    def segments(self) -> Iterator[Tuple[Point, Point, int]]:
+        """Every marked segment as (first cell, last cell, signal)."""
+        for y, segments in self.horizontal.items():
+            for lo, hi, signal in segments:
+                yield (lo, y), (hi, y), signal
+        for x, segments in self.vertical.items():
+            for lo, hi, signal in segments:
+                yield (x, lo), (x, hi), signal
+
+    def items(self) -> Iterator[Tuple[Point, Dict[int, int]]]:
+        """(cell, signals) for every wired cell, grid or not."""
+        cells: Dict[Point, Dict[int, int]] = {}
+        step = self.grid.step
+        for (x1, y1), (x2, y2), signal in self.segments():
+            for k in range((x2 - x1 + y2 - y1) // step + 1):
+                signals = cells.setdefault((x1 + k * step if y1 == y2 else x1,
+                                            y1 + k * step if x1 == x2 else y1), {})
+                signals[signal] = signals.get(signal, 0) + 1
+        return iter(cells.items())
+
+    def junctions(self) -> List[Tuple[Point, int]]:
+        """(cell, signal) where wires of one signal reach 3 or 4 neighbours.
+
+        Only segment ends and crossings of a signal's own segments can be
+        junctions, so those are the only cells looked at.
+        """
+        step = self.grid.step
+        by_signal: Dict[int, Tuple[List[Tuple[int, int, int]], List[Tuple[int, int, int]]]] = {}
+        for y, segments in self.horizontal.items():
+            for lo, hi, signal in segments:
+                by_signal.setdefault(signal, ([], []))[0].append((y, lo, hi))
+        for x, segments in self.vertical.items():
+            for lo, hi, signal in segments:
+                by_signal.setdefault(signal, ([], []))[1].append((x, lo, hi))
+
+        result = []
+        for signal, (across, down) in sorted(by_signal.items()):
+            candidates = set()
+            for y, lo, hi in across:
+                candidates.update(((lo, y), (hi, y)))
+            for x, lo, hi in down:
+                candidates.update(((x, lo), (x, hi)))
+                for y, a, b in across:
+                    if a <= x <= b and lo <= y <= hi:
+                        candidates.add((x, y))
+            for x, y in sorted(candidates):
+                degree = sum(signal in self.get(p) for p in
+                             ((x + step, y), (x - step, y), (x, y + step), (x, y - step)))
+                if degree > 2:
+                    result.append(((x, y), signal))
+        return result
+
+
+class GridAStar:
+    """A* over an OccupancyGrid using flat cell indices.
+
+    Moves cost 1, plus `wire_penalty` per other signal already in the cell;
+    blocked cells are impassable. With `exempt_ends` the start and goal may
+    sit inside a blocked area (ports lie on block edges).
+
+    g-scores, parents and closed flags live in lists sized to the grid and
+    allocated once. A per-search stamp says which entries belong to the
+    current search, so routing many nets on one grid never clears or
+    reallocates them. Heap entries are single ints packing (f, g, index);
+    with the grid's column-major indices they order exactly like the
+    (f, g, (x, y)) tuples of the dict-based search, so paths are identical.
+    """
+
+    MAX_COST = 1000000  # moves at least this expensive are never taken
+
+    def __init__(self, grid: OccupancyGrid, wire_penalty: int = 500, exempt_ends: bool = True):
+        self.grid = grid
+        self.wire_penalty = wire_penalty
+        self.exempt_ends = exempt_ends
+        n = len(grid)
+        self.g_score = [0] * n
+        self.parent = [0] * n
+        self.seen = [0] * n    # == self.search once g_score/parent are set
+        self.closed = [0] * n  # == self.search once expanded
+        self.search = 0
+        self.expanded = 0  # nodes expanded by all searches so far
+        self.pushes = 0    # heap entries pushed by all searches so far
+        self._g_shift = max(1, n.bit_length())
+        self._f_shift = self._g_shift + 48
+
+    def find_path(self, start: Tuple[int, int], goal: Tuple[int, int],
+                  wires: Optional[WireMap], signal: int,
+                  xmin: int, xmax: int, ymin: int, ymax: int,
+                  limit: Optional[int] = None,
+                  tiles: Optional[Tuple[bytearray, int]] = None) -> Optional[List[Tuple[int, int]]]:
+        """Cells from start to goal inclusive, or None if unreachable.
+
+        Only cells within both the grid and [xmin, xmax] x [ymin, ymax] are
+        used. Start and goal must be grid cells. With `limit`, the search
+        gives up (returns None) after expanding that many nodes. `tiles`
+        is a (mask, size) corridor: the grid cut into size x size tiles,
+        numbered column-major, and only cells whose tile is set in the
+        mask are entered.
+        """
+        s = self.grid.index(*start)
+        if s < 0:
+            return None
+        return self.find_path_from([s], goal, wires, signal, xmin, xmax, ymin, ymax, limit, tiles)
+
+    def find_path_from(self, sources: List[int], goal: Tuple[int, int],
+                       wires: Optional[WireMap], signal: int,
+                       xmin: int, xmax: int, ymin: int, ymax: int,
+                       limit: Optional[int] = None,
+                       tiles: Optional[Tuple[bytearray, int]] = None) -> Optional[List[Tuple[int, int]]]:
+        """Cheapest path from any of the cells `sources` to goal.
+
+        `sources` are distinct flat indices in ascending order, i.e. grouped
+        by column. All of them start at cost 0 (a multi-source search), so
+        growing a tree towards a new sink costs one search from the whole
+        tree. Sources enter the heap a column at a time, nearest columns to
+        the goal first, and only once the heap holds nothing cheaper than
+        their heuristic; far parts of a large tree are never touched.
+        """
+        grid = self.grid
+        t = grid.index(*goal)
+        if not sources or t < 0:
+            return None
+        step = grid.step
+        rows = grid.rows
+        c_lo = max(0, math.ceil((xmin - grid.xmin) / step))
+        c_hi = min(grid.cols - 1, math.floor((xmax - grid.xmin) / step))
+        r_lo = max(0, math.ceil((ymin - grid.ymin) / step))
+        r_hi = min(rows - 1, math.floor((ymax - grid.ymin) / step))
+        gc, gr = divmod(t, rows)
+        # Manhattan distance to the goal, split by axis
+        h_col = [abs(c - gc) * step for c in range(grid.cols)]
+        h_row = [abs(r - gr) * step for r in range(rows)]
+        corridor = tile_col = tile_row = None
+        if tiles is not None:
+            corridor, size = tiles
+            tile_rows = -(-rows // size)
+            tile_col = [c // size * tile_rows for c in range(grid.cols)]
+            tile_row = [r // size for r in range(rows)]
+
+        self.search += 1
+        stamp = self.search
+        g_score, parent, seen, closed = self.g_score, self.parent, self.seen, self.closed
+        blocked = grid.cells
+        cover = wires.cover if wires is not None else None
+        wires_at = wires.at if wires is not None else None
+        looked_up = wires._at if wires is not None else None
+        penalty = self.wire_penalty
+        exempt = self.exempt_ends
+        max_cost = self.MAX_COST
+        g_shift, f_shift = self._g_shift, self._f_shift
+        key_mask = (1 << g_shift) - 1
+        g_mask = (1 << (f_shift - g_shift)) - 1
+        heappush, heappop = heapq.heappush, heapq.heappop
+
+        # Sources go in with g = 0 and are only set up when popped: an entry
+        # with g = 0 is always a source, and pops before any other entry for
+        # the same cell. sources[left:right] are the columns seeded so far.
+        heap = []
+        n = len(sources)
+        left = right = bisect.bisect_left(sources, gc * rows)
+        expanded = pushes = 0
+        try:
+            while True:
+                while left > 0 or right < n:
+                    # Nearest unseeded column; its sources have h >= d * step
+                    col_r = sources[right] // rows if right < n else None
+                    col_l = sources[left - 1] // rows if left > 0 else None
+                    take_right = col_l is None or (col_r is not None and col_r - gc <= gc - col_l)
+                    d = col_r - gc if take_right else gc - col_l
+                    if heap and heap[0] >> f_shift < d * step:
+                        break
+                    if take_right:
+                        lo = right
+                        hi = right = bisect.bisect_left(sources, (col_r + 1) * rows, right)
+                    else:
+                        hi = left
+                        lo = left = bisect.bisect_left(sources, col_l * rows, 0, left)
+                    pushes += hi - lo
+                    for s in sources[lo:hi]:
+                        heappush(heap, ((h_col[s // rows] + h_row[s % rows]) << f_shift) | s)
+                if not heap:
+                    break
+                entry = heappop(heap)
+                cur = entry & key_mask
+                if closed[cur] == stamp:
+                    continue
+                g = (entry >> g_shift) & g_mask
+                if not g:
+                    seen[cur] = stamp
+                    g_score[cur] = 0
+                    parent[cur] = -1
+                if cur == t:
+                    path = [grid.cell(cur)]
+                    while parent[cur] >= 0:
+                        cur = parent[cur]
+                        path.append(grid.cell(cur))
+                    path.reverse()
+                    return path
+                if expanded == limit:
+                    break
+                closed[cur] = stamp
+                expanded += 1
+                c, r = divmod(cur, rows)
+                for nc, nr, nb in ((c + 1, r, cur + rows), (c - 1, r, cur - rows),
+                                   (c, r + 1, cur + 1), (c, r - 1, cur - 1)):
+                    if nc < c_lo or nc > c_hi or nr < r_lo or nr > r_hi:
+                        continue
+                    if closed[nb] == stamp:
+                        continue
+                    if corridor is not None and not corridor[tile_col[nc] + tile_row[nr]]:
+                        continue
+                    if exempt and nb == t:
+                        move = 1
+                    elif blocked[nb]:
+                        continue
+                    elif cover is None or not cover[nb]:
+                        move = 1
+                    else:
+                        others = looked_up.get(nb)
+                        if others is None:
+                            others = wires_at(nb)
+                        if signal in others:
+                            move = 1
+                        else:
+                            move = 1 + len(others) * penalty
+                            if move >= max_cost:
+                                continue
+                    ng = g + move
+                    if seen[nb] != stamp or ng < g_score[nb]:
+                        seen[nb] = stamp
+                        g_score[nb] = ng
+                        parent[nb] = cur
+                        f = ng + h_col[nc] + h_row[nr]
+                        heappush(heap, (f << f_shift) | (ng << g_shift) | nb)
+                        pushes += 1
+            return None
+        finally:
+            self.expanded += expanded
+            self.pushes += pushes
+
+
+
+class Net(NamedTuple):
+    """One connection to route, from a source port to a destination port.
+
+    `path`, if given, is a fixed middle section (a manual route) that is
+    used instead of searching.
+    """
+    src: Point
+    dst: Point
+    signal: int
+    path: Optional[List[Point]] = None
+
+
+class SteinerTree:
+    """A signal's wiring from one source, grown one branch per sink.
+
+    `parent` links every point of the tree towards the source port (the
+    root), so the full wire from the source to any sink can be read back;
+    `cells` are the tree's grid cells (and `indices` their sorted flat
+    indices), the sources for growing the next branch. Each branch starts at a point
+    already in the tree: its junction.
+    """
+
+    def __init__(self, grid: OccupancyGrid):
+        self.grid = grid
+        self.parent: Dict[Point, Optional[Point]] = {}
+        self.cells: List[Point] = []
+        self.indices: List[int] = []
+
+    def add(self, points: List[Point]) -> None:
+        """Add a polyline whose first point is the root or a tree point."""
+        parent = self.parent
+        step = self.grid.step
+        if points[0] not in parent:
+            self._add_point(points[0], None)
+        for (x1, y1), (x2, y2) in zip(points, points[1:]):
+            dist = abs(x2 - x1) + abs(y2 - y1)
+            if dist % step or (x1 != x2 and y1 != y2):
+                walk = [(x2, y2)]
+            else:
+                dx = (x2 > x1) - (x2 < x1)
+                dy = (y2 > y1) - (y2 < y1)
+                walk = [(x1 + dx * k, y1 + dy * k) for k in range(step, dist + 1, step)]
+            prev = (x1, y1)
+            for point in walk:
+                if point not in parent:
+                    self._add_point(point, prev)
+                prev = point
+
+    def add_routes(self, routes: List[List[Point]]) -> None:
+        """add() several polylines, the root's first, in any other order.
+
+        Each branch is added once the point it starts from is in the tree.
+        """
+        pending = list(routes)
+        while pending:
+            waiting = []
+            for points in pending:
+                if not self.parent or points[0] in self.parent:
+                    self.add(points)
+                else:
+                    waiting.append(points)
+            if len(waiting) == len(pending):
+                self.add(waiting.pop(0))  # detached from the tree: a root of its own
+            pending = waiting
+
+    def _add_point(self, point: Point, parent: Optional[Point]) -> None:
+        self.parent[point] = parent
+        i = self.grid.index(*point)
+        if i >= 0:
+            self.cells.append(point)
+            bisect.insort(self.indices, i)
+
+    def chain(self, point: Point) -> List[Point]:
+        """Tree points from the root to `point`."""
+        chain = []
+        parent = self.parent
+        while point is not None:
+            chain.append(point)
+            point = parent[point]
+        chain.reverse()
+        return chain
 
 
 class Router:
-    """Handles wire routing using A* pathfinding."""
-    
+    """Routing backend interface.
+
+    route() takes the nets, the obstacle grid and the wires already laid,
+    and returns the segments of each net, marking them in `wires` as it
+    goes so later nets see them. Backends implement find_path() between the
+    stub cells next to the two ports; when it returns None the net falls
+    back to a three-segment Manhattan path.
+
+    Searches start in a window around the two ends, `window_margin` grid
+    steps wider than their bounding box. Only when a search fails is it
+    repeated in a window `window_growth` times wider, up to `bounds`, and
+    a net expands at most `max_expansions` nodes over all its windows, so
+    an unreachable port costs a bounded search instead of a flood of the
+    whole grid. `window_levels` counts the searches that succeeded at each
+    level (0 being the first window) and those that failed at all of them.
+    Ends walled into a pocket of fewer than `pocket_limit` free cells that
+    the other end cannot reach are found by a small flood fill and counted
+    as 'enclosed', without any search.
+
+    Backends are registered by name with @register_router and created with
+    get_router(), so callers never depend on a particular engine. Backends
+    that route a batch of nets together rather than one after the other
+    set `routes_jointly` and override route_all().
+    """
+
+    name = ''
+    routes_jointly = False
+    window_margin: Optional[int] = 8  # None searches all of `bounds` at once
+    window_growth = 4
+    max_expansions: Optional[int] = 200000
+    pocket_limit = 32
+    expanded = 0  # nodes expanded so far, for backends that search
+    pushes = 0    # and entries pushed onto their heaps
+
     def __init__(self, grid_step: int = 10):
         self.grid_step = grid_step
-    
+        self.window_levels: Counter = Counter()
+
+    def close(self) -> None:
+        """Release what the backend keeps between calls, such as worker processes."""
+
     def build_occupancy_grid(
         self, 
         blocks: List[Tuple[int, int, int, int]],
         xmin: int, xmax: int, ymin: int, ymax: int,
         margin: int = 30
-    ) -> Dict[Tuple[int, int], bool]:
+    ) -> OccupancyGrid:
         """Build grid showing which cells are blocked."""
-        occupancy = {}
-        
-        for gx in range(xmin, xmax + 1, self.grid_step):
-            for gy in range(ymin, ymax + 1, self.grid_step):
-                cell = (gx, gy)
-                blocked = False
-                
-                for (bx, by, bw, bh) in blocks:
-                    if (bx - margin) <= gx <= (bx + bw + margin) and \
-                       (by - margin) <= gy <= (by + bh + margin):
-                        blocked = True
-                        break
-                
-                occupancy[cell] = blocked
-        
+        occupancy = OccupancyGrid(xmin, xmax, ymin, ymax, self.grid_step)
+        for (bx, by, bw, bh) in blocks:
+            occupancy.block_rect(bx - margin, by - margin, bx + bw + margin, by + bh + margin)
         return occupancy
-    
+
+    def route(self, nets: List[Net], occupancy: OccupancyGrid, wires: WireMap,
+              bounds: Tuple[int, int, int, int]) -> List[List[Segment]]:
+        """Route `nets` in order; returns the segments of each one."""
+        return [self.segments(points) for points in self.route_all(nets, occupancy, wires, bounds)]
+
+    def route_all(self, nets: List[Net], occupancy: OccupancyGrid, wires: WireMap,
+                  bounds: Tuple[int, int, int, int]) -> List[List[Point]]:
+        """Route `nets`, each seeing the wires of those before it.
+
+        Returns the full polyline of each net, as marked in `wires`.
+        """
+        return [self.route_points(net, occupancy, wires, bounds) for net in nets]
+
+    def route_net(self, net: Net, occupancy: OccupancyGrid, wires: WireMap,
+                  bounds: Tuple[int, int, int, int]) -> List[Segment]:
+        return self.segments(self.route_points(net, occupancy, wires, bounds))
+
+    def route_points(self, net: Net, occupancy: OccupancyGrid, wires: WireMap,
+                     bounds: Tuple[int, int, int, int]) -> List[Point]:
+        """Route one net; returns the full polyline as marked in `wires`."""
+        start_stub, goal_stub = self.stubs(net, occupancy)
+        path = net.path
+        if path is None and not (self.enclosed(goal_stub, {start_stub}, occupancy) or
+                                 self.enclosed(start_stub, {goal_stub}, occupancy)):
+            path = self.search_windows(
+                lambda *window: self.find_path(start_stub, goal_stub, occupancy, wires, net.signal, *window),
+                [start_stub, goal_stub], bounds)
+        if path is None:
+            path = self.manhattan(start_stub, goal_stub)
+        full_pts = self.full_points(net, start_stub, path)
+        wires.mark_points(full_pts, net.signal)
+        return full_pts
+
+    @staticmethod
+    def full_points(net: Net, start_stub: Point, path: List[Point]) -> List[Point]:
+        """`path` between the stubs, with the legs to the two ports added."""
+        # Orthogonal legs from the source port to its stub and from the
+        # path's end to the destination port
+        src_py, dst_py = net.src[1], net.dst[1]
+        full_pts = [net.src, (start_stub[0], src_py)]
+        if src_py != start_stub[1]:
+            full_pts.append(start_stub)
+        full_pts.extend(path)
+        if path[-1][1] != dst_py:
+            full_pts.append((path[-1][0], dst_py))
+        full_pts.append(net.dst)
+        return full_pts
+
+    def route_branch(self, net: Net, tree: SteinerTree, occupancy: OccupancyGrid, wires: WireMap,
+                     bounds: Tuple[int, int, int, int]) -> Tuple[List[Point], List[Point]]:
+        """Route one sink of `tree`'s signal by growing the tree.
+
+        Returns the points marked in `wires` (the new branch, or the whole
+        route for the tree's first sink) and the full polyline from the
+        source port to the sink, through the tree.
+        """
+        _, goal_stub = self.stubs(net, occupancy)
+        if tree.cells and not self.enclosed(goal_stub, tree.cells, occupancy):
+            # Tree searches seed the sources nearest the goal first, so they
+            # stay local without a window
+            path = self.search_windows(
+                lambda *window: self.find_tree_path(tree, goal_stub, occupancy, wires, net.signal, *window),
+                None, bounds)
+            if path is not None:
+                branch = list(path)
+                if path[-1][1] != net.dst[1]:
+                    branch.append((path[-1][0], net.dst[1]))
+                branch.append(net.dst)
+                wires.mark_points(branch, net.signal)
+                tree.add(branch)
+                return branch, tree.chain(path[0])[:-1] + branch
+        points = self.route_points(net, occupancy, wires, bounds)
+        tree.add(points)
+        return points, points
+
+    def find_tree_path(
+        self,
+        tree: SteinerTree,
+        goal: Point,
+        occupancy: OccupancyGrid,
+        wire_occupancy: WireMap,
+        signal: int,
+        xmin: int, xmax: int, ymin: int, ymax: int,
+        limit: Optional[int] = None
+    ) -> Optional[List[Point]]:
+        """Cells from one of the tree's cells to goal inclusive, or None.
+
+        Backends with a multi-source search override this; the default
+        searches from the tree cell nearest to the goal.
+        """
+        start = min(tree.cells, key=lambda p: (abs(p[0] - goal[0]) + abs(p[1] - goal[1]), p))
+        return self.find_path(start, goal, occupancy, wire_occupancy, signal, xmin, xmax, ymin, ymax, limit)
+
+    def enclosed(self, end: Point, targets: Container[Point], occupancy: OccupancyGrid) -> bool:
+        """True if `end` is walled into a small pocket that no target touches.
+
+        Counts the end in `window_levels` under 'enclosed' when it is.
+        """
+        pocket = occupancy.pocket(*end, self.pocket_limit)
+        if pocket is None:
+            return False
+        cell = occupancy.cell
+        for i in pocket:
+            if cell(i) in targets or any(cell(j) in targets for j in occupancy.neighbors(i)):
+                return False
+        self.window_levels['enclosed'] += 1
+        return True
+
+    def windows(self, points: Optional[List[Point]],
+                bounds: Tuple[int, int, int, int]) -> Iterator[Tuple[int, int, int, int]]:
+        """Search windows around `points`, growing geometrically to `bounds`.
+
+        Without points (or a `window_margin`) the only window is `bounds`.
+        """
+        if points is None or self.window_margin is None:
+            yield bounds
+            return
+        xmin, xmax, ymin, ymax = bounds
+        x_lo, x_hi = min(p[0] for p in points), max(p[0] for p in points)
+        y_lo, y_hi = min(p[1] for p in points), max(p[1] for p in points)
+        margin = self.window_margin * self.grid_step
+        while True:
+            window = (max(xmin, x_lo - margin), min(xmax, x_hi + margin),
+                      max(ymin, y_lo - margin), min(ymax, y_hi + margin))
+            yield window
+            if window == (xmin, xmax, ymin, ymax):
+                return
+            margin = max(margin * self.window_growth, self.grid_step)
+
+    def search_windows(self, search, points: Optional[List[Point]],
+                       bounds: Tuple[int, int, int, int]) -> Optional[List[Point]]:
+        """Run `search(xmin, xmax, ymin, ymax, limit)` in ever wider windows.
+
+        Returns the first path found, or None once the windows reach
+        `bounds` or the net's expansion budget runs out.
+        """
+        first = self.expanded
+        for level, window in enumerate(self.windows(points, bounds)):
+            limit = None
+            if self.max_expansions is not None:
+                limit = self.max_expansions - (self.expanded - first)
+                if limit <= 0:
+                    break
+            path = search(*window, limit)
+            if path is not None:
+                self.window_levels[level] += 1
+                return path
+        self.window_levels['failed'] += 1
+        return None
+
+    @staticmethod
+    def segments(points: List[Point]) -> List[Segment]:
+        compressed = compress_polyline(points)
+        return list(zip(compressed, compressed[1:]))
+
+    def stubs(self, net: Net, occupancy: Optional[OccupancyGrid] = None) -> Tuple[Point, Point]:
+        """Grid cells one step right of the source and left of the destination.
+
+        With `occupancy`, stubs buried in blocked cells move to the nearest
+        free cell (see routable()).
+        """
+        step = self.grid_step
+        (src_px, src_py), (dst_px, dst_py) = net.src, net.dst
+        # Outputs leave blocks to the right, inputs enter from the left
+        start_stub = ((src_px // step) * step + step, (src_py // step) * step)
+        goal_stub = ((dst_px // step) * step - step, (dst_py // step) * step)
+        if occupancy is not None:
+            return self.routable(start_stub, occupancy), self.routable(goal_stub, occupancy)
+        return start_stub, goal_stub
+
+    def manhattan(self, start: Point, goal: Point) -> List[Point]:
+        """Horizontal, vertical, horizontal, bending halfway across."""
+        mid_x = ((start[0] + goal[0]) // 2 // self.grid_step) * self.grid_step
+        return [start, (mid_x, start[1]), (mid_x, goal[1]), goal]
+
     def find_path(
+        self,
+        start: Point,
+        goal: Point,
+        occupancy: OccupancyGrid,
+        wire_occupancy: WireMap,
+        signal: int,
+        xmin: int, xmax: int, ymin: int, ymax: int,
+        limit: Optional[int] = None
+    ) -> Optional[List[Point]]:
+        """Cells from start to goal inclusive, or None to fall back.
+
+        Searches that expand more than `limit` nodes give up and return None.
+        """
+        raise NotImplementedError
+    
+    def find_free_cell(
         self,
         start: Tuple[int, int],
-        goal: Tuple[int, int],
-        occupancy: Dict[Tuple[int, int], bool],
-        wire_occupancy: Dict[Tuple[int, int], Set[str]],
-        signal: str,
-        xmin: int, xmax: int, ymin: int, ymax: int
-    ) -> Optional[List[Tuple[int, int]]]:
-        """Find path using A* algorithm."""
-        
+        occupancy: OccupancyGrid
+    ) -> Optional[Tuple[int, int]]:
+        """Nearest free cell to `start`, or None if the grid has none.
+
+        Points off the lattice or outside the grid start from the grid cell
+        nearest to them. A lookup in the grid's distance transform.
+        """
+        if not len(occupancy):
+            return None
+        step = occupancy.step
+        c = min(max(round((start[0] - occupancy.xmin) / step), 0), occupancy.cols - 1)
+        r = min(max(round((start[1] - occupancy.ymin) / step), 0), occupancy.rows - 1)
+        i = occupancy.nearest_free(c * occupancy.rows + r)
+        return occupancy.cell(i) if i >= 0 else None
+
+    def routable(self, stub: Point, occupancy: OccupancyGrid) -> Point:
+        """`stub`, or the nearest free cell if it is buried in blocked cells.
+
+        A stub may sit in the blocked margin around its block, since
+        searches leave from a blocked start and enter a blocked goal, but it
+        needs a free neighbour to get anywhere.
+        """
+        i = occupancy.index(*stub)
+        cells = occupancy.cells
+        if i < 0 or not cells[i] or not all(cells[j] for j in occupancy.neighbors(i)):
+            return stub
+        free = self.find_free_cell(stub, occupancy)
+        return stub if free is None else free
+
+
+Rect = Tuple[int, int, int, int]  # x1, y1, x2, y2, inclusive
+
+
+class RouteRecord(NamedTuple):
+    """A routed net as kept by RouteSession."""
+    net: Net
+    points: List[Point]      # as marked in the WireMap: for a tree branch, from its junction
+    segments: List[Segment]
+    bbox: Rect
+
+
+def _touches(record: RouteRecord, rect: Rect) -> bool:
+    x1, y1, x2, y2 = rect
+    bx1, by1, bx2, by2 = record.bbox
+    if bx1 > x2 or bx2 < x1 or by1 > y2 or by2 < y1:
+        return False
+    for (ax, ay), (bx, by) in record.segments:
+        if (min(ax, bx) <= x2 and max(ax, bx) >= x1
+                and min(ay, by) <= y2 and max(ay, by) >= y1):
+            return True
+    return False
+
+
+class RouteCache:
+    """LRU cache of routes that left the session, for when they come back.
+
+    Routes are cached per route group (one net, or all nets of a Steiner
+    tree), keyed by the connection keys and everything about the nets
+    (endpoints, signal, manual path). Each entry holds up to `variants`
+    versions, every one with a fingerprint: the obstacle rectangles near
+    the group's routes when it was stored. A lookup only returns routes
+    whose nearby obstacles are exactly those again. Undoing a move,
+    re-expanding a group or switching a view back thus reuses routes
+    instead of searching for them again, including routes that had to
+    detour around the moved block.
+    """
+
+    def __init__(self, size: int = 4096, variants: int = 4):
+        self.size = size
+        self.variants = variants
+        self.entries: "OrderedDict[Hashable, List[Tuple[Tuple[Rect, ...], List[RouteRecord]]]]" = OrderedDict()
+        self.hits = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+    @staticmethod
+    def entry_key(keys: List[Hashable], nets: List[Net]) -> Hashable:
+        return tuple((key, net.src, net.dst, net.signal, tuple(net.path) if net.path is not None else None)
+                     for key, net in zip(keys, nets))
+
+    @staticmethod
+    def fingerprint(records: List[RouteRecord], obstacles: List[Rect], pad: int) -> Tuple[Rect, ...]:
+        """The obstacles within `pad` of the routes' bounding box, in a canonical order."""
+        x1 = min(r.bbox[0] for r in records) - pad
+        y1 = min(r.bbox[1] for r in records) - pad
+        x2 = max(r.bbox[2] for r in records) + pad
+        y2 = max(r.bbox[3] for r in records) + pad
+        return tuple(sorted(r for r in obstacles
+                            if r[0] <= x2 and r[2] >= x1 and r[1] <= y2 and r[3] >= y1))
+
+    def put(self, keys: List[Hashable], records: List[RouteRecord],
+            obstacles: List[Rect], pad: int) -> None:
+        """Store the routes of one group, which are valid among `obstacles`."""
+        if self.size <= 0:
+            return
+        entry_key = self.entry_key(keys, [r.net for r in records])
+        fingerprint = self.fingerprint(records, obstacles, pad)
+        variants = [v for v in self.entries.pop(entry_key, ()) if v[0] != fingerprint]
+        variants.append((fingerprint, records))
+        self.entries[entry_key] = variants[-self.variants:]
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def get(self, keys: List[Hashable], nets: List[Net],
+            obstacles: List[Rect], pad: int) -> Optional[List[RouteRecord]]:
+        entry_key = self.entry_key(keys, nets)
+        variants = self.entries.get(entry_key)
+        if not variants:
+            return None
+        for fingerprint, records in reversed(variants):
+            if fingerprint == self.fingerprint(records, obstacles, pad):
+                self.entries.move_to_end(entry_key)
+                self.hits += 1
+                return records
+        return None
+
+
+class RouteSession:
+    """Routes kept from one draw to the next, for incremental rerouting.
+
+    Each route() call gets the nets by a stable key together with the
+    obstacle rectangles the occupancy grid was rasterized from. A net keeps
+    its previous route if it is unchanged (same ports, signal and manual
+    path) and its wires cross none of the dirty regions, i.e. rectangles
+    that were added or removed since the last call; only the other nets are
+    routed again, in the given order. Dropped routes are taken back out of
+    the WireMap, so `wires` always holds exactly the current routes.
+
+    With `trees`, the nets of a signal that share a source port (and have no
+    manual route) are routed as one Steiner tree: each sink is a branch
+    grown from the wiring already laid for it. Trees are kept or rerouted
+    whole, since branches hang off each other.
+
+    Dropped routes go into a RouteCache and are reused if their nets come
+    back with the obstacles around them as they were. A redraw where
+    nothing moved does no pathfinding at all.
+
+    Kept and cached routes are not re-optimized: a net that detoured around
+    a block which has since moved away keeps its detour until it is
+    rerouted for another reason (or reset() is called).
+
+    route() does the whole job in one call. For an interactive caller,
+    begin() settles the kept and cached routes and previews the rest, and
+    step() then routes the remaining nets a time slice at a time.
+    """
+
+    def __init__(self, cache_size: int = 4096):
+        self.router: Optional[Router] = None
+        self.trees = False
+        self.cache = RouteCache(cache_size)
+        self.records: Dict[Hashable, RouteRecord] = {}
+        self.obstacles: List[Rect] = []
+        self.wires: Optional[WireMap] = None
+        self.kept = 0      # nets that kept their route in the last call
+        self.reused = 0    # nets whose route came from the cache
+        self.rerouted = 0  # nets routed in the last call
+        self.keys: List[Hashable] = []
+        self.routes: List[List[Segment]] = []
+        self._job: Optional[tuple] = None
+        self._pending: Deque[int] = deque()
+
+    def reset(self) -> None:
+        """Forget all routes; the next route() routes every net."""
+        self.router = None
+        self.records = {}
+        self.keys = []
+        self.obstacles = []
+        self.wires = None
+        self._pending.clear()
+        self.cache.clear()
+
+    def group(self, key: Hashable, net: Net) -> Hashable:
+        """The route group of a net: its Steiner tree, or just itself."""
+        if self.trees and net.path is None:
+            return 'tree', net.signal, net.src
+        return 'net', key
+
+    def route(self, router: Router, keys: List[Hashable], nets: List[Net],
+              occupancy: OccupancyGrid, obstacles: List[Rect],
+              bounds: Tuple[int, int, int, int], trees: bool = False) -> List[List[Segment]]:
+        """Route `nets` (identified by `keys`); returns the segments of each."""
+        self.begin(router, keys, nets, occupancy, obstacles, bounds, trees)
+        self.step()
+        return self.routes
+
+    def begin(self, router: Router, keys: List[Hashable], nets: List[Net],
+              occupancy: OccupancyGrid, obstacles: List[Rect],
+              bounds: Tuple[int, int, int, int], trees: bool = False) -> List[List[Segment]]:
+        """Start routing `nets`; step() then routes the ones still pending.
+
+        Kept and cached routes are in place at once. Returns the segments of
+        each net, with a Manhattan preview (see Router.manhattan) for the
+        pending ones; step() replaces those in `routes` as it goes. Each
+        routed net is committed to the session when it is done, so a begin()
+        before the last step() just leaves the remaining nets unrouted.
+        """
+        trees = trees and not router.routes_jointly
+        if router is not self.router or trees != self.trees or len(set(keys)) != len(keys):
+            self.reset()
+            self.trees = trees
+        old = self.records
+        old_counts = Counter(self.obstacles)
+        new_counts = Counter(obstacles)
+        dirty = list((old_counts - new_counts) + (new_counts - old_counts))
+        bx1, bx2, by1, by2 = bounds
+        pad = router.grid_step
+
+        groups: Dict[Hashable, List[int]] = {}
+        for i, (key, net) in enumerate(zip(keys, nets)):
+            groups.setdefault(self.group(key, net), []).append(i)
+
+        keep: Dict[Hashable, RouteRecord] = {}
+        for key, net in zip(keys, nets):
+            record = old.get(key)
+            if record is None or record.net != net:
+                continue
+            x1, y1, x2, y2 = record.bbox
+            if x1 < bx1 or x2 > bx2 or y1 < by1 or y2 > by2:
+                continue
+            if any(_touches(record, rect) for rect in dirty):
+                continue
+            keep[key] = record
+
+        # A group is kept whole or not at all. Groups leaving the session
+        # were valid among the previous obstacles; the cache only hands
+        # them out again while those are unchanged.
+        old_groups: Dict[Hashable, List[Hashable]] = {}
+        for key in self.keys:
+            if key in old:
+                old_groups.setdefault(self.group(key, old[key].net), []).append(key)
+        for members in old_groups.values():
+            if not all(key in keep for key in members):
+                for key in members:
+                    keep.pop(key, None)
+                self.cache.put(members, [old[key] for key in members], self.obstacles, pad)
+
+        reused: Dict[Hashable, RouteRecord] = {}
+        for members in groups.values():
+            member_keys = [keys[i] for i in members]
+            if any(key in keep for key in member_keys):
+                continue
+            records = self.cache.get(member_keys, [nets[i] for i in members], obstacles, pad)
+            if records is not None and all(bx1 <= r.bbox[0] and r.bbox[2] <= bx2 and
+                                           by1 <= r.bbox[1] and r.bbox[3] <= by2 for r in records):
+                reused.update(zip(member_keys, records))
+
+        wires = self.wires
+        if wires is not None and keep and wires.grid.shape == occupancy.shape:
+            for key, record in old.items():
+                if keep.get(key) is not record:
+                    wires.unmark_points(record.points, record.net.signal)
+            wires.grid = occupancy
+        else:
+            wires = WireMap(occupancy)
+            for record in keep.values():
+                wires.mark_points(record.points, record.net.signal)
+        for record in reused.values():
+            wires.mark_points(record.points, record.net.signal)
+        self.kept = len(keep)
+        self.reused = len(reused)
+        self.rerouted = len(nets) - len(keep) - len(reused)
+        keep.update(reused)
+
+        self.router = router
+        self.keys = list(keys)
+        self.records = {key: keep[key] for key in keys if key in keep}
+        self.obstacles = list(obstacles)
+        self.wires = wires
+        self.routes = []
+        for key, net in zip(keys, nets):
+            record = keep.get(key)
+            if record is None:
+                start_stub, goal_stub = router.stubs(net)
+                path = net.path if net.path is not None else router.manhattan(start_stub, goal_stub)
+                self.routes.append(router.segments(router.full_points(net, start_stub, path)))
+            else:
+                self.routes.append(record.segments)
+        self._job = (nets, occupancy, bounds, groups, {})
+        self._pending = deque(i for i, key in enumerate(keys) if key not in keep)
+        return self.routes
+
+    @property
+    def pending(self) -> int:
+        """Nets of the last begin() that step() has not routed yet."""
+        return len(self._pending)
+
+    def step(self, budget: Optional[float] = None) -> List[int]:
+        """Route pending nets for about `budget` seconds (all of them if None).
+
+        At least one net is routed per call; backends that route jointly
+        take all of them at once. Returns the indices of the nets whose
+        entries in `routes` now hold their real route.
+        """
+        pending = self._pending
+        if not pending:
+            return []
+        router, wires, keys = self.router, self.wires, self.keys
+        nets, occupancy, bounds, groups, trees_by_group = self._job
+        done: List[int] = []
+        if router.routes_jointly:
+            batch = router.route_all([nets[i] for i in pending], occupancy, wires, bounds)
+            for i, points in zip(pending, batch):
+                self._commit(i, nets[i], points, points)
+            done = list(pending)
+            pending.clear()
+            return done
+        deadline = None if budget is None else time.perf_counter() + budget
+        while pending:
+            i = pending.popleft()
+            key, net = keys[i], nets[i]
+            group = self.group(key, net)
+            if self.trees and group[0] == 'tree':
+                tree = trees_by_group.get(group)
+                if tree is None:
+                    tree = trees_by_group[group] = SteinerTree(occupancy)
+                    kept = [self.records[keys[j]] for j in groups[group] if keys[j] in self.records]
+                    kept.sort(key=lambda r: r.points[0] != r.net.src)
+                    tree.add_routes([r.points for r in kept])
+                marked, points = router.route_branch(net, tree, occupancy, wires, bounds)
+            else:
+                marked = points = router.route_points(net, occupancy, wires, bounds)
+            self._commit(i, net, marked, points)
+            done.append(i)
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+        return done
+
+    def _commit(self, i: int, net: Net, marked: List[Point], points: List[Point]) -> None:
+        xs = [p[0] for p in points]
+        ys = [p[1] for p in points]
+        record = RouteRecord(net, marked, self.router.segments(points), (min(xs), min(ys), max(xs), max(ys)))
+        self.records[self.keys[i]] = record
+        self.routes[i] = record.segments
+
+
+ROUTERS: Dict[str, Type[Router]] = {}
+
+
+def register_router(cls: Type[Router]) -> Type[Router]:
+    ROUTERS[cls.name] = cls
+    return cls
+
+
+def get_router(name: str, grid_step: int = 10) -> Router:
+    try:
+        return ROUTERS[name](grid_step)
+    except KeyError:
+        raise ValueError(f"Unknown router '{name}', expected one of {sorted(ROUTERS)}") from None
+
+
+@register_router
+class AStarRouter(Router):
+    """A* on coordinate tuples with dict and set bookkeeping.
+
+    The original engine, kept as the reference GridRouter must agree with.
+    """
+
+    name = 'astar'
+    wire_penalty = 500
+
+    def __init__(self, grid_step: int = 10):
+        super().__init__(grid_step)
+        self.expanded = 0
+        self.pushes = 0
+
+    def find_path(self, start, goal, occupancy, wire_occupancy, signal, xmin, xmax, ymin, ymax, limit=None):
+        step = self.grid_step
+        budget = math.inf if limit is None else limit
+
         def heuristic(a, b):
             return abs(a[0] - b[0]) + abs(a[1] - b[1])
-        
+
         def cost(cell, sig):
+            # Exempt start and goal from occupancy check to allow entering ports
+            if cell == start or cell == goal:
+                return 1
             if occupancy.get(cell, True):
-                return 1000000
+                return 100000000  # Extremely high cost for blocks
             existing_signals = wire_occupancy.get(cell, set())
             if sig in existing_signals:
                 return 1
-            return 1 + len(existing_signals) * 10
-        
+            return 1 + len(existing_signals) * self.wire_penalty
+
         open_set = [(heuristic(start, goal), 0, start)]
+        self.pushes += 1
         came_from = {}
         g_score = {start: 0}
         closed = set()
-        
+
         while open_set:
             _, g, current = heapq.heappop(open_set)
-            
             if current in closed:
                 continue
-            
             if current == goal:
                 path = [current]
                 while current in came_from:
@@ -77,57 +1297,84 @@ class Router:
                     path.append(current)
                 path.reverse()
                 return path
-            
+
+            if not budget:
+                return None
+            budget -= 1
             closed.add(current)
+            self.expanded += 1
             cx, cy = current
-            
-            for nx, ny in [(cx + self.grid_step, cy), (cx - self.grid_step, cy),
-                          (cx, cy + self.grid_step), (cx, cy - self.grid_step)]:
+            for nx, ny in [(cx + step, cy), (cx - step, cy), (cx, cy + step), (cx, cy - step)]:
                 if nx < xmin or nx > xmax or ny < ymin or ny > ymax:
                     continue
-                
                 neighbor = (nx, ny)
                 if neighbor in closed:
                     continue
-                
                 move_cost = cost(neighbor, signal)
                 if move_cost >= 1000000:
                     continue
-                
                 tentative_g = g + move_cost
-                
                 if neighbor not in g_score or tentative_g < g_score[neighbor]:
                     came_from[neighbor] = current
                     g_score[neighbor] = tentative_g
                     f = tentative_g + heuristic(neighbor, goal)
                     heapq.heappush(open_set, (f, tentative_g, neighbor))
-        
+                    self.pushes += 1
         return None
-    
-    def find_free_cell(
-        self,
-        start: Tuple[int, int],
-        occupancy: Dict[Tuple[int, int], bool]
-    ) -> Tuple[int, int]:
-        """Find nearest free cell if start is blocked."""
-        if not occupancy.get(start, True):
-            return start
-        
-        # Try immediate neighbors
-        for dx, dy in [(self.grid_step, 0), (-self.grid_step, 0),
-                      (0, self.grid_step), (0, -self.grid_step),
-                      (self.grid_step, self.grid_step), (-self.grid_step, -self.grid_step),
-                      (self.grid_step, -self.grid_step), (-self.grid_step, self.grid_step)]:
-            test_cell = (start[0] + dx, start[1] + dy)
-            if not occupancy.get(test_cell, True):
-                return test_cell
-        
-        # Expand search
-        for dist in [2, 3, 4, 5]:
-            for dx in range(-dist * self.grid_step, (dist + 1) * self.grid_step, self.grid_step):
-                for dy in range(-dist * self.grid_step, (dist + 1) * self.grid_step, self.grid_step):
-                    test_cell = (start[0] + dx, start[1] + dy)
-                    if not occupancy.get(test_cell, True):
-                        return test_cell
-        
-        return start  # Fallback
\ No newline at end of file
+
+
+@register_router
+class GridRouter(Router):
+    """The same search as AStarRouter, run by GridAStar on flat indices."""
+
+    name = 'grid'
+    wire_penalty = 500
+
+    def __init__(self, grid_step: int = 10):
+        super().__init__(grid_step)
+        self._engine: Optional[GridAStar] = None
+        self._expanded = 0
+        self._pushes = 0
+
+    @property
+    def expanded(self) -> int:
+        return self._expanded + (self._engine.expanded if self._engine else 0)
+
+    @property
+    def pushes(self) -> int:
+        return self._pushes + (self._engine.pushes if self._engine else 0)
+
+    def engine(self, occupancy: OccupancyGrid) -> GridAStar:
+        # One engine per grid shape, so its buffers are reused across nets
+        # and across redraws that rebuild an equally sized grid
+        engine = self._engine
+        if engine is None or engine.grid.shape != occupancy.shape:
+            if engine is not None:
+                self._expanded += engine.expanded
+                self._pushes += engine.pushes
+            engine = self._engine = GridAStar(occupancy, wire_penalty=self.wire_penalty)
+        else:
+            engine.grid = occupancy
+        return engine
+
+    def find_path(self, start, goal, occupancy, wire_occupancy, signal, xmin, xmax, ymin, ymax, limit=None):
+        return self.engine(occupancy).find_path(start, goal, wire_occupancy, signal,
+                                                xmin, xmax, ymin, ymax, limit)
+
+    def find_tree_path(self, tree, goal, occupancy, wire_occupancy, signal, xmin, xmax, ymin, ymax, limit=None):
+        return self.engine(occupancy).find_path_from(tree.indices, goal, wire_occupancy, signal,
+                                                     xmin, xmax, ymin, ymax, limit)
+
+
+@register_router
+class ManhattanRouter(Router):
+    """Straight Manhattan paths that ignore obstacles, for quick previews."""
+
+    name = 'manhattan'
+
+    def find_path(self, start, goal, occupancy, wire_occupancy, signal, xmin, xmax, ymin, ymax, limit=None):
+        return self.manhattan(start, goal)
+
+
+# Backends defined in their own modules register themselves on import
+from . import globalroute, pathfinder, visibility  # noqa: E402,F401
@@ -0,0 +1,53 @@
+# ============================================================================
+# symbols.py - Interned names with dense integer ids
+# ============================================================================
+
+from typing import Dict, List
+
+
+class SymbolTable:
+    """Interns strings to small, dense integer ids.
+
+    Ids are handed out in order from 0 and never reused, so they can index
+    plain lists and bytearrays. A table only grows; reparses that share one
+    (see VHDLParser's `previous`) keep the ids of names seen before.
+    """
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.strings: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+    def intern(self, s: str) -> int:
+        i = self.ids.get(s)
+        if i is None:
+            i = self.ids[s] = len(self.strings)
+            self.strings.append(s)
+        return i
+
+    def copy(self) -> 'SymbolTable':
+        """A table with the same ids that grows independently of this one."""
+        table = SymbolTable()
+        table.ids = dict(self.ids)
+        table.strings = list(self.strings)
+        return table
+
+    def get(self, s: str, default: int = -1) -> int:
+        """Id of `s` without interning it."""
+        return self.ids.get(s, default)
+
+    def name(self, i: int) -> str:
+        return self.strings[i]
+
+    def bind(self, port) -> int:
+        """Return `port.signal_id` in this table, (re)interning if needed.
+
+        Ports built outside the parser (loaded schematics, groups, pins) or
+        whose signal was renamed carry no id or a stale one.
+        """
+        i = port.signal_id
+        if not 0 <= i < len(self.strings) or self.strings[i] != port.signal:
+            i = port.signal_id = self.intern(port.signal)
+        return i
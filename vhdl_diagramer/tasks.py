@@ -0,0 +1,77 @@
+# ============================================================================
+# tasks.py - Background work with progress reporting and cancellation
+# ============================================================================
+
+import queue
+import threading
+
+from typing import Any, Callable, List, Optional, Tuple
+
+
+class TaskCancelled(Exception):
+    """Raised inside a task's work function once cancel() was requested."""
+
+
+class BackgroundTask:
+    """Runs `work(report)` on a daemon thread.
+
+    The work function calls `report(message, fraction)` to publish progress;
+    that is also where cancellation takes effect, by raising TaskCancelled.
+    Nothing here touches Tk: the UI drains progress with poll() from a
+    `root.after` loop and reads `result` / `error` once `done` is set, so
+    results are only ever applied on the Tk thread.
+    """
+
+    def __init__(self, work: Callable[[Callable[[str, Optional[float]], None]], Any], name: str = 'task'):
+        self.work = work
+        self.name = name
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.cancelled = False
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+        self._progress: "queue.Queue[Tuple[str, Optional[float]]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def start(self) -> 'BackgroundTask':
+        self._thread.start()
+        return self
+
+    def cancel(self) -> None:
+        """Ask the work function to stop at its next progress report."""
+        self._cancel.set()
+
+    def report(self, message: str, fraction: Optional[float] = None) -> None:
+        if self._cancel.is_set():
+            raise TaskCancelled()
+        self._progress.put((message, fraction))
+
+    def poll(self) -> List[Tuple[str, Optional[float]]]:
+        """Progress reports published since the last poll, oldest first."""
+        items = []
+        try:
+            while True:
+                items.append(self._progress.get_nowait())
+        except queue.Empty:
+            return items
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def _run(self) -> None:
+        try:
+            self.result = self.work(self.report)
+        except TaskCancelled:
+            self.cancelled = True
+        except BaseException as e:  # reported to the UI thread, not raised here
+            self.error = e
+        finally:
+            # A cancel that lands after the last report still discards the result.
+            if self._cancel.is_set():
+                self.cancelled = True
+                self.result = None
+            self._done.set()
@@ -0,0 +1,192 @@
+# ============================================================================
+# trace.py - Recording and replaying the routing passes of a session
+# ============================================================================
+
+import struct
+import sys
+import time
+import zlib
+
+from array import array
+from typing import BinaryIO, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+from .routeworker import RouteSnapshot
+from .routing import Net, OccupancyGrid, RouteSession, Router, Segment, get_router
+
+MAGIC = b'VDRT'
+TRACE_FORMAT = 1
+
+_HEADER = struct.Struct('<4sH')
+_FRAME = struct.Struct('<IIH?B')  # frame number, symbols epoch, grid step, trees, router name length
+
+
+class TraceRecorder:
+    """Appends the RouteSnapshots of a session to a binary trace file.
+
+    A snapshot holds everything a routing pass reads: the endpoints,
+    signal and manual path of every net, the obstacle rectangles and
+    bounds the occupancy grid is built from, and the backend settings.
+    Each one is written as a zlib-compressed frame of packed numbers, with
+    the strings of its connection keys stored once per frame, and flushed
+    at once so a crash keeps everything recorded before it. Keys must be
+    tuples of strings, as the canvas's connection keys are.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.frames = 0
+        self._file: Optional[BinaryIO] = open(path, 'wb')
+        self._file.write(_HEADER.pack(MAGIC, TRACE_FORMAT))
+        self._last: Optional[RouteSnapshot] = None
+
+    def record(self, snapshot: RouteSnapshot) -> bool:
+        """Write `snapshot` unless it repeats the last one; True if written.
+
+        Redraws that change nothing issue the same routing request again;
+        they route nothing new, so they are left out of the trace.
+        """
+        if self._file is None or snapshot.same_job(self._last):
+            return False
+        self._last = snapshot
+        payload = zlib.compress(_encode(snapshot._replace(version=self.frames)))
+        self._file.write(struct.pack('<I', len(payload)))
+        self._file.write(payload)
+        self._file.flush()
+        self.frames += 1
+        return True
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> 'TraceRecorder':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _encode(snapshot: RouteSnapshot) -> bytes:
+    strings: Dict[str, int] = {}
+    # Bounds and obstacles may come from pin positions that are not whole numbers
+    rects = array('d', snapshot.bounds)
+    for rect in snapshot.obstacles:
+        rects.extend(rect)
+    ints = array('i', [len(snapshot.nets)])
+    for key, net in zip(snapshot.keys, snapshot.nets):
+        ints.extend((*net.src, *net.dst, net.signal, len(key)))
+        ints.extend(strings.setdefault(part, len(strings)) for part in key)
+        if net.path is None:
+            ints.append(-1)
+        else:
+            ints.append(len(net.path))
+            for point in net.path:
+                ints.extend(point)
+    if sys.byteorder == 'big':
+        rects.byteswap()
+        ints.byteswap()
+    router = snapshot.router.encode()
+    parts = [_FRAME.pack(snapshot.version, snapshot.symbols, snapshot.grid_step, snapshot.trees, len(router)),
+             router, struct.pack('<I', len(snapshot.obstacles)), rects.tobytes(), struct.pack('<I', len(strings))]
+    for text in strings:
+        data = text.encode()
+        parts.append(struct.pack('<H', len(data)))
+        parts.append(data)
+    parts.append(ints.tobytes())
+    return b''.join(parts)
+
+
+def _decode(payload: bytes) -> RouteSnapshot:
+    version, symbols, grid_step, trees, size = _FRAME.unpack_from(payload)
+    pos = _FRAME.size
+    router = payload[pos:pos + size].decode()
+    pos += size
+    count, = struct.unpack_from('<I', payload, pos)
+    pos += 4
+    rects = array('d')
+    rects.frombytes(payload[pos:pos + (count + 1) * 32])
+    pos += (count + 1) * 32
+    count, = struct.unpack_from('<I', payload, pos)
+    pos += 4
+    strings = []
+    for _ in range(count):
+        size, = struct.unpack_from('<H', payload, pos)
+        pos += 2
+        strings.append(payload[pos:pos + size].decode())
+        pos += size
+    ints = array('i')
+    ints.frombytes(payload[pos:])
+    if sys.byteorder == 'big':
+        rects.byteswap()
+        ints.byteswap()
+    coords = [int(v) if v.is_integer() else v for v in rects]
+    bounds = tuple(coords[:4])
+    obstacles = tuple(tuple(coords[i:i + 4]) for i in range(4, len(coords), 4))
+    values = iter(ints)
+    keys = []
+    nets = []
+    for _ in range(next(values)):
+        sx, sy, dx, dy, signal = (next(values) for _ in range(5))
+        keys.append(tuple(strings[next(values)] for _ in range(next(values))))
+        points = next(values)
+        path = None if points < 0 else [(next(values), next(values)) for _ in range(points)]
+        nets.append(Net((sx, sy), (dx, dy), signal, path))
+    return RouteSnapshot(version, router, grid_step, trees, symbols, tuple(keys), tuple(nets), obstacles, bounds)
+
+
+def read_trace(path: str) -> Iterator[RouteSnapshot]:
+    """The snapshots recorded in `path`, in order."""
+    with open(path, 'rb') as f:
+        header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise ValueError(f"{path}: not a routing trace")
+        magic, fmt = _HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: not a routing trace")
+        if fmt != TRACE_FORMAT:
+            raise ValueError(f"{path}: trace format {fmt}, expected {TRACE_FORMAT}")
+        while True:
+            size = f.read(4)
+            if len(size) < 4:
+                return
+            payload = f.read(struct.unpack('<I', size)[0])
+            try:
+                yield _decode(zlib.decompress(payload))
+            except zlib.error:
+                return  # cut short by a crash while writing
+
+
+class ReplayedFrame(NamedTuple):
+    snapshot: RouteSnapshot
+    routes: List[List[Segment]]  # segments per net, in snapshot order
+    seconds: float               # spent in RouteSession.route
+    expanded: int                # search nodes expanded
+    pushes: int                  # heap entries pushed
+
+
+def replay(snapshots: Iterable[RouteSnapshot], router: Optional[str] = None) -> Iterator[ReplayedFrame]:
+    """Route recorded snapshots in order, as the canvas did.
+
+    One RouteSession carries over between frames, so nets an edit did not
+    touch are reused exactly as in the recorded session. `router` replaces
+    the recorded backend name.
+    """
+    session = RouteSession()
+    backend: Optional[Router] = None
+    symbols: Optional[int] = None
+    for snapshot in snapshots:
+        name = router or snapshot.router
+        if (backend is None or backend.name != name or backend.grid_step != snapshot.grid_step
+                or symbols != snapshot.symbols):
+            backend = get_router(name, snapshot.grid_step)
+            symbols = snapshot.symbols
+        occupancy = OccupancyGrid(*snapshot.bounds, snapshot.grid_step)
+        for rect in snapshot.obstacles:
+            occupancy.block_rect(*rect)
+        expanded, pushes = backend.expanded, backend.pushes
+        start = time.perf_counter()
+        routes = session.route(backend, list(snapshot.keys), list(snapshot.nets), occupancy,
+                               list(snapshot.obstacles), snapshot.bounds, trees=snapshot.trees)
+        seconds = time.perf_counter() - start
+        yield ReplayedFrame(snapshot, routes, seconds, backend.expanded - expanded, backend.pushes - pushes)
@@ -6,17 +6,19 @@ from typing import List, Dict, Optional, Tuple, Set
 
 import math
 
-import heapq
 from tkinter import filedialog, messagebox, colorchooser, simpledialog, Menu, ttk
 
 from vhdl_diagramer.models import Instance, Port
+from vhdl_diagramer.routeworker import RouteResult, RouteSnapshot, RouteWorker
+from vhdl_diagramer.routing import Net, OccupancyGrid, RouteSession, Router, get_router
+from vhdl_diagramer.symbols import SymbolTable
+from vhdl_diagramer.trace import TraceRecorder
 
 from vhdl_diagramer import config
 import dataclasses
 import copy
 from vhdl_diagramer.config import MIN_BLOCK_WIDTH, MIN_BLOCK_HEIGHT, GRID_OPTIONS, DEFAULT_GRID_LABEL, GRID_STEP
 
-from vhdl_diagramer.utils import compress_polyline
 
 
 
@@ -27,10 +29,12 @@ class DiagramCanvas(tk.Canvas):
 
     def __init__(self, parent, instances: List[Instance], signals: Dict[str, str],
                  variables: Dict[str, str], constants: Dict[str, str], top_level_pins: List[Port] = [], 
-                 assignments: List[Tuple[str, str]] = [], on_update=None, on_selection_change=None, **kwargs):
+                 assignments: List[Tuple[str, str]] = [], on_update=None, on_selection_change=None,
+                 on_status=None, **kwargs):
         super().__init__(parent, **kwargs)
         self.on_update = on_update
         self.on_selection_change = on_selection_change
+        self.on_status = on_status  # reports for the status bar, e.g. routing errors
         self.instances = instances
         self.signals = signals
         self.variables = variables
@@ -95,6 +99,32 @@ class DiagramCanvas(tk.Canvas):
         self.manual_routes: Dict[Tuple[str, str, str, str], List[Tuple[int, int]]] = {} # (src_inst, src_port, dst_inst, dst_port) -> points
         self.bus_signals: Set[str] = set()
         self.bus_signals: Set[str] = set()
+        # Signal ids used by routing; replaced by the parser's table on load
+        self.symbols = SymbolTable()
+        self.router_name = config.ROUTER_BACKEND  # a key of routing.ROUTERS
+        # Routes kept between draws; only nets an edit touches are rerouted
+        self.steiner_routing = config.STEINER_ROUTING
+        self.route_session = RouteSession(config.ROUTE_CACHE_SIZE)
+        # Routing per idle slice; the after_idle id of the next slice
+        self.route_budget = config.ROUTE_FRAME_BUDGET
+        self._route_job: Optional[str] = None
+        # Or routing on a worker thread: the snapshot last submitted, the
+        # routes last shown per connection, and the after id of the poll
+        self.route_worker: Optional[RouteWorker] = None
+        if config.ROUTE_IN_BACKGROUND:
+            self.route_worker = RouteWorker(config.ROUTE_CACHE_SIZE).start()
+        self._route_version = 0
+        self._submitted: Optional[RouteSnapshot] = None
+        self._route_result: Optional[RouteResult] = None
+        self._shown_routes: Dict[Tuple[str, str, str, str], Tuple[Net, List]] = {}
+        self._route_poll: Optional[str] = None
+        self._session_symbols: Optional[SymbolTable] = None
+        self._symbols_epoch = 0  # counts symbol tables seen; ids of another table mean other signals
+        self._router_epoch = -1
+        # Every distinct routing request, written to config.ROUTE_TRACE if set
+        self.route_trace: Optional[TraceRecorder] = None
+        if config.ROUTE_TRACE:
+            self.route_trace = TraceRecorder(config.ROUTE_TRACE)
         self.selected_connection_key: Optional[Tuple[str, str, str, str]] = None
         self.selected_pin: Optional[Port] = None
         
@@ -1296,6 +1326,32 @@ class DiagramCanvas(tk.Canvas):
             inst.x = math.ceil(inst.x / self.grid_step) * self.grid_step
             inst.y = math.ceil(inst.y / self.grid_step) * self.grid_step
 
+    def place_new_instances(self):
+        """Lay out instances still at the origin in rows below the existing ones.
+
+        Used after an incremental reparse, where kept instances have their
+        positions and arrange_grid would leave new ones stacked at (0, 0).
+        """
+        placed = [i for i in self.instances if i.x or i.y]
+        fresh = [i for i in self.instances if i.visible and not i.is_group and not i.x and not i.y]
+        if not placed or not fresh:
+            return
+        left = min(i.x for i in placed)
+        right = max(i.x + i.width for i in placed)
+        x = left
+        y = max(i.y + i.height for i in placed) + 100
+        row_height = 0
+        for inst in fresh:
+            inst.width, inst.height = self.calculate_block_size(inst)
+            if x > left and x + inst.width > right:
+                x = left
+                y += row_height + 100
+                row_height = 0
+            inst.x = math.ceil(x / self.grid_step) * self.grid_step
+            inst.y = math.ceil(y / self.grid_step) * self.grid_step
+            x += inst.width + 150
+            row_height = max(row_height, inst.height)
+
     def _highlight_unconnected_input(self, inst: Instance, port: Port):
         in_ports = [p for p in inst.ports if p.direction in ('IN','INOUT')]
         try:
@@ -1307,116 +1363,9 @@ class DiagramCanvas(tk.Canvas):
         self.create_oval(px - 10, py - 10, px + 10, py + 10, outline='#F44336', width=2, fill='')
 
     def build_grid_occupancy(self, blocks: List[Tuple[int,int,int,int]], 
-                            xmin: int, xmax: int, ymin: int, ymax: int) -> Dict[Tuple[int,int], bool]:
+                            xmin: int, xmax: int, ymin: int, ymax: int) -> OccupancyGrid:
         '''Build grid of which cells are blocked (True = blocked, False = free).'''
-        occupancy = {}
-        margin = 10
-        
-        for gx in range(xmin, xmax + 1, self.grid_step):
-            for gy in range(ymin, ymax + 1, self.grid_step):
-                cell = (gx, gy)
-                blocked = False
-                
-                for (bx, by, bw, bh) in blocks:
-                    if (bx - margin) <= gx <= (bx + bw + margin) and \
-                       (by - margin) <= gy <= (by + bh + margin):
-                        blocked = True
-                        break
-                
-                occupancy[cell] = blocked
-        
-        return occupancy
-
-    def _mark_segment_occupancy(self, p1: Tuple[int,int], p2: Tuple[int,int], signal: str, wire_occupancy: Dict[Tuple[int,int], Set[str]]):
-        x1, y1 = p1
-        x2, y2 = p2
-        
-        # Horizontal segment
-        if y1 == y2:
-            start = min(x1, x2)
-            end = max(x1, x2)
-            for x in range(start, end + self.grid_step, self.grid_step):
-                cell = (x, y1)
-                if cell not in wire_occupancy:
-                    wire_occupancy[cell] = set()
-                wire_occupancy[cell].add(signal)
-        # Vertical segment
-        elif x1 == x2:
-            start = min(y1, y2)
-            end = max(y1, y2)
-            for y in range(start, end + self.grid_step, self.grid_step):
-                cell = (x1, y)
-                if cell not in wire_occupancy:
-                    wire_occupancy[cell] = set()
-                wire_occupancy[cell].add(signal)
-
-
-    def astar_path(self, start: Tuple[int,int], goal: Tuple[int,int], 
-                   occupancy: Dict[Tuple[int,int], bool],
-                   wire_occupancy: Dict[Tuple[int,int], Set[str]],
-                   signal: str,
-                   xmin: int, xmax: int, ymin: int, ymax: int) -> Optional[List[Tuple[int,int]]]:
-        '''A* pathfinding on grid.'''
-        def heuristic(a, b):
-            return abs(a[0] - b[0]) + abs(a[1] - b[1])
-        
-        def cost(cell, sig):
-            # Exempt start and goal from occupancy check to allow entering ports
-            if cell == start or cell == goal:
-                 return 1
-            
-            if occupancy.get(cell, True):
-                return 100000000  # Extremely high cost for blocks
-            
-            existing_signals = wire_occupancy.get(cell, set())
-            if sig in existing_signals:
-                return 1
-            return 1 + len(existing_signals) * 500
-        
-        open_set = [(heuristic(start, goal), 0, start)]
-        came_from = {}
-        g_score = {start: 0}
-        closed = set()
-        
-        while open_set:
-            _, g, current = heapq.heappop(open_set)
-            
-            if current in closed:
-                continue
-            
-            if current == goal:
-                path = [current]
-                while current in came_from:
-                    current = came_from[current]
-                    path.append(current)
-                path.reverse()
-                return path
-            
-            closed.add(current)
-            cx, cy = current
-            
-            for nx, ny in [(cx + self.grid_step, cy), (cx - self.grid_step, cy), 
-                          (cx, cy + self.grid_step), (cx, cy - self.grid_step)]:
-                if nx < xmin or nx > xmax or ny < ymin or ny > ymax:
-                    continue
-                
-                neighbor = (nx, ny)
-                if neighbor in closed:
-                    continue
-                
-                move_cost = cost(neighbor, signal)
-                if move_cost >= 1000000:
-                    continue
-                
-                tentative_g = g + move_cost
-                
-                if neighbor not in g_score or tentative_g < g_score[neighbor]:
-                    came_from[neighbor] = current
-                    g_score[neighbor] = tentative_g
-                    f = tentative_g + heuristic(neighbor, goal)
-                    heapq.heappush(open_set, (f, tentative_g, neighbor))
-        
-        return None
+        return Router(self.grid_step).build_occupancy_grid(blocks, xmin, xmax, ymin, ymax, margin=10)
 
     def get_active_instances(self, instances=None):
         if instances is None:
@@ -1435,115 +1384,42 @@ class DiagramCanvas(tk.Canvas):
         return [(int(inst.x), int(inst.y), int(inst.width), int(inst.height)) 
                 for inst in instances]
 
-    def draw(self, routing: bool = True):
-        self.delete('all')
-        self.drawn_pin_positions.clear()
-        self.arrange_grid()
-
-        if self.grid_enabled:
-            self._draw_grid_background()
+    def _extract_connections(self, active_instances: List[Instance],
+                             top_in_ports: List[Tuple[Port, int, int]],
+                             top_out_ports: List[Tuple[Port, int, int]]) -> List[Tuple[Instance, Port, Instance, Port]]:
+        """Build the netlist to route: (src_inst, src_port, dst_inst, dst_port) tuples, longest first.
 
-        # Render order: Parent groups first (backgrounds), then children
-        # But _draw_instance_visual is recursive for expanded groups!
-        # So we only call it for top-level instances.
-        top_level = [i for i in self.instances if i.visible and not i.parent]
-        for inst in top_level:
-            self._draw_instance_visual(inst)
-
-        active_instances = self.get_active_instances()
-        blocks = self.get_blocks_for_occupancy(active_instances)
+        Inputs with no producer are highlighted as unconnected.
+        """
 
-                  
-        # Helper to draw pins - moved before routing check
-        # But we need xmin/xmax first.
-        # Determine bounding box
-        if blocks:
-            xmin = min(b[0] for b in blocks) - 200
-            xmax = max(b[0] + b[2] for b in blocks) + 200
-            ymin = min(b[1] for b in blocks)
-            ymax = max(b[1] + b[3] for b in blocks)
-        else:
-           xmin, xmax, ymin, ymax = 0, 1000, 0, 1000
-
-        # Expand bounding box to include top pin positions
-        if self.top_pin_positions:
-            px_vals = [p[0] for p in self.top_pin_positions.values()]
-            py_vals = [p[1] for p in self.top_pin_positions.values()]
-            if px_vals:
-                xmin = min(xmin, min(px_vals) - 200)
-                xmax = max(xmax, max(px_vals) + 200)
-                ymin = min(ymin, min(py_vals) - 200)
-                ymax = max(ymax, max(py_vals) + 200)
-           
-        top_in_ports: List[Tuple[Port, int, int]] = []
-        top_out_ports: List[Tuple[Port, int, int]] = []
-        self.pin_hitboxes: Dict[str, Tuple[int, int, int, int]] = {}
-        
-        if self.show_top_level and self.top_level_pins:
-           # Height for pins
-           total_in = sum(1 for p in self.top_level_pins if p.direction == 'IN')
-           total_out = sum(1 for p in self.top_level_pins if p.direction == 'OUT' or p.direction == 'INOUT')
-           
-           height_in = total_in * 30
-           height_out = total_out * 30
-           
-           start_y_in = ymin + (ymax-ymin - height_in)//2
-           start_y_out = ymin + (ymax-ymin - height_out)//2
-           
-           # Draw In pins on left
-           curr_y = start_y_in
-           for p in self.top_level_pins:
-               if p.direction == 'IN':
-                   if p.name in self.top_pin_positions:
-                       px, py = self.top_pin_positions[p.name]
-                   else:
-                       px, py = xmin-40, curr_y
-                       curr_y += 40
-                   
-                   self._draw_pin_symbol(px, py, 'IN', p)
-                   top_in_ports.append((p, px, py))
-           
-           # Draw Out pins on right
-           curr_y = start_y_out
-           for p in self.top_level_pins:
-               if p.direction in ('OUT', 'INOUT'):
-                   if p.name in self.top_pin_positions:
-                       px, py = self.top_pin_positions[p.name]
-                   else:
-                       px, py = xmax+40, curr_y
-                       curr_y += 40
-                   
-                   direction = 'OUT' if p.direction == 'OUT' else 'INOUT'
-                   self._draw_pin_symbol(px, py, direction, p)
-                   top_out_ports.append((p, px, py))
-
-        if not routing:
-            # Apply Zoom
-            if self.current_scale != 1.0:
-                self.scale('all', 0, 0, self.current_scale, self.current_scale)
-            self.update_scrollregion()
-            return
-
-        # ... (rest of routing logic)
+        # Routing works on signal ids rather than names. Bind every port
+        # once up front; ports not built by the parser get their id here.
+        symbols = self.symbols
+        intern = symbols.intern
+        for inst in active_instances:
+            for p in inst.ports:
+                symbols.bind(p)
+        for p, _, _ in top_in_ports + top_out_ports:
+            symbols.bind(p)
 
         # Create dummy instances for routing
-        # Producer map: signal -> (Instance, Port)
+        # Producer map: signal id -> (Instance, Port)
         # We need to handle top level inputs as producers
-        producers: Dict[str, Tuple[object, Port]] = {}
+        producers: Dict[int, Tuple[object, Port]] = {}
         
         # Build Alias Map from assignments
         # assignments is list of (dest, source).
         # We want to know: "If I need signal 'dest', I can get it from 'source'".
         # alias_map[dest] = source
-        alias_map = {dest: src for dest, src in self.assignments}
+        alias_map = {intern(dest): intern(src) for dest, src in self.assignments}
 
         # 1. Normal instances + Internal Group Ports
         for inst in active_instances:
             # Outputs of any block are producers
             for p in inst.ports:
                 if p.direction in ('OUT','INOUT'):
-                    if p.signal not in producers:
-                        producers[p.signal] = (inst, p)
+                    if p.signal_id not in producers:
+                        producers[p.signal_id] = (inst, p)
             
             # INPUTS of an EXPANDED GROUP are producers for its context (Internal connections)
             if inst.is_group and not inst.collapsed:
@@ -1555,8 +1431,8 @@ class DiagramCanvas(tk.Canvas):
                          # But if there's no external producer (port is the boundary), we need this.
                          # Better: Always register it as a "secondary" producer or only if no other?
                          # Let's prioritize real outputs.
-                         if p.signal not in producers:
-                             producers[p.signal] = (inst, p)
+                         if p.signal_id not in producers:
+                             producers[p.signal_id] = (inst, p)
 
                         
         # 2. Top Level Inputs (act as producers)
@@ -1576,20 +1452,20 @@ class DiagramCanvas(tk.Canvas):
              # The signal produced by this top pin is usually named same as the pin
              # But if there is an assignment "sig <= pin", then this pin efficiently produces "sig" too via the alias.
              # We register the pin name as key.
-             producers[p.name] = (dummy_inst, p)
+             producers[intern(p.name)] = (dummy_inst, p)
              top_in_instances[p.name] = dummy_inst
 
         connections: List[Tuple[object, Port, object, Port]] = []
         
         # Helper to resolve producer
-        def get_producer(sig_name):
+        def get_producer(sig_id):
             # Direct match
-            if sig_name in producers:
-                return producers[sig_name]
+            if sig_id in producers:
+                return producers[sig_id]
             # Check recursive alias (limit depth to avoid loops?)
             # Just 1 level for now based on user request "rx_serial_in_int <= rx_serial_in"
-            if sig_name in alias_map:
-                src_sig = alias_map[sig_name]
+            if sig_id in alias_map:
+                src_sig = alias_map[sig_id]
                 if src_sig in producers:
                     return producers[src_sig]
             return None
@@ -1599,8 +1475,8 @@ class DiagramCanvas(tk.Canvas):
         for inst in active_instances:
             for p in inst.ports:
                 if p.direction in ('IN','INOUT'):
-                    target_signal = p.signal
-                    if not target_signal: continue
+                    if not p.signal: continue
+                    target_signal = p.signal_id
                     
                     # Connection Logic:
                     # 1. If I am inside a group G, and G has an INPUT port for this signal:
@@ -1609,7 +1485,7 @@ class DiagramCanvas(tk.Canvas):
                     
                     if inst.parent and not inst.parent.collapsed:
                         # Check if parent has a port for this signal
-                        parent_port = next((pp for pp in inst.parent.ports if pp.signal == target_signal and pp.direction in ('IN', 'INOUT')), None)
+                        parent_port = next((pp for pp in inst.parent.ports if pp.signal_id == target_signal and pp.direction in ('IN', 'INOUT')), None)
                         if parent_port:
                             # Connect to parent group's internal side of the port
                             connections.append((inst.parent, parent_port, inst, p))
@@ -1636,7 +1512,7 @@ class DiagramCanvas(tk.Canvas):
                 for p in inst.ports:
                     if p.direction in ('OUT', 'INOUT'):
                         # Group output port acts as a consumer for internal producers
-                        prod = get_producer(p.signal)
+                        prod = get_producer(p.signal_id)
                         if prod:
                             src_inst, src_port = prod
                             # Only connect if producer is INTERNAL to this group
@@ -1655,7 +1531,7 @@ class DiagramCanvas(tk.Canvas):
             
             # Check if p.name is a destination in assignments
             # Alias map is dest -> source.
-            target_signal = p.name
+            target_signal = intern(p.name)
             if target_signal in alias_map:
                 target_signal = alias_map[target_signal]
             
@@ -1679,6 +1555,22 @@ class DiagramCanvas(tk.Canvas):
             dy = d.y + 40
             return -math.hypot(sx - dx, sy - dy)
         connections.sort(key=conn_len)
+        return connections
+
+    def _route_connections(self, connections: List[Tuple[Instance, Port, Instance, Port]],
+                           blocks: List[Tuple[int, int, int, int]],
+                           top_in_ports: List[Tuple[Port, int, int]],
+                           top_out_ports: List[Tuple[Port, int, int]]
+                           ) -> Tuple[List[Tuple[Tuple[int, int], int]], Set[int]]:
+        """Route `connections` with the selected backend and fill lines_meta.
+
+        With a `route_worker`, the nets go to it as a RouteSnapshot and are
+        shown as before or as Manhattan previews until _poll_routes() brings
+        the result back. Otherwise, with a `route_budget`, nets that need a
+        search get a Manhattan preview here and are routed later by
+        _route_slice(). Returns the junctions to draw and the indices of
+        the connections that are still previews.
+        """
 
         if blocks:
             xmin = min(b[0] for b in blocks) - 300
@@ -1710,32 +1602,19 @@ class DiagramCanvas(tk.Canvas):
         # But they should probably avoid the header and ports area of the group.
         # For now, let's keep it simple and see.
         
-        occupancy = self.build_grid_occupancy(blocks, xmin, xmax, ymin, ymax)
+        # Obstacles as rectangles: the route session diffs them against the
+        # previous draw to find the regions an edit changed
+        obstacles = [(bx - 10, by - 10, bx + bw + 10, by + bh + 10) for bx, by, bw, bh in blocks]
 
-        
         # Add Top Pin Hitboxes to occupancy
         if self.show_top_level:
             for name, (x1, y1, x2, y2) in self.pin_hitboxes.items():
-                # integer grid snapping
-                gx1 = (x1 // self.grid_step) * self.grid_step - self.grid_step
-                gx2 = (x2 // self.grid_step) * self.grid_step + self.grid_step
-                gy1 = (y1 // self.grid_step) * self.grid_step - self.grid_step
-                gy2 = (y2 // self.grid_step) * self.grid_step + self.grid_step
-                
-                for gx in range(gx1, gx2 + 1, self.grid_step):
-                    for gy in range(gy1, gy2 + 1, self.grid_step):
-                        # Approximate
-                         if x1 - 5 <= gx <= x2 + 5 and y1 - 5 <= gy <= y2 + 5:
-                             occupancy[(gx, gy)] = True
-
-        wire_occupancy: Dict[Tuple[int,int], Set[str]] = {}
+                # Approximate: the hitbox grown by 5 on every side
+                obstacles.append((x1 - 5, y1 - 5, x2 + 5, y2 + 5))
 
-        self.lines_meta.clear()
-        
-        # Enumerate to get index for tagging
-        for conn_idx, (src_inst, src_port, dst_inst, dst_port) in enumerate(connections):
-            conn_key = (src_inst.name, src_port.name, dst_inst.name, dst_port.name)
-            
+        nets: List[Net] = []
+        keys: List[Tuple[str, str, str, str]] = []
+        for src_inst, src_port, dst_inst, dst_port in connections:
             # Source Point
             # If src_inst is a group and we are connecting from its internal side:
             # (An INPUT port acting as a producer for internal blocks)
@@ -1793,138 +1672,165 @@ class DiagramCanvas(tk.Canvas):
                     didx = 0
                 dst_py = int(dst_inst.y + 40 + didx * self.port_height)
 
-
-            # Force start/goal to be on grid
-            start_grid = ((src_px // self.grid_step) * self.grid_step, (src_py // self.grid_step) * self.grid_step)
-            goal_grid = ((dst_px // self.grid_step) * self.grid_step, (dst_py // self.grid_step) * self.grid_step)
-            
-            # Assume source (output) is on RIGHT of instance -> stub moves RIGHT (+step)
-            start_stub = (start_grid[0] + self.grid_step, start_grid[1])
-            
-            # Assume destination (input) is on LEFT of instance -> stub moves LEFT (-step)
-            goal_stub = (goal_grid[0] - self.grid_step, goal_grid[1])
-            
-            if conn_key in self.manual_routes:
-                 path = self.manual_routes[conn_key]
-                 # Validation/Correction? 
-                 # If points don't match stubs, we might just draw lines to them
-                 # For now, trust the manual route is the middle section
-            else:
-                 # A* from stub to stub
-                 path = self.astar_path(start_stub, goal_stub, occupancy, wire_occupancy, 
-                                       src_port.signal, xmin, xmax, ymin, ymax)
-
             # Validation
             if src_px % self.grid_step != 0 or src_py % self.grid_step != 0:
                 if config.DEBUG: sys.stderr.write(f"WARNING: Source port OFF GRID: ({src_px}, {src_py})\n")
             if dst_px % self.grid_step != 0 or dst_py % self.grid_step != 0:
                 if config.DEBUG: sys.stderr.write(f"WARNING: Dest port OFF GRID: ({dst_px}, {dst_py})\n")
 
-            if config.DEBUG: sys.stderr.write(f"DEBUG: {src_port.signal} generation:\n")
-            if config.DEBUG: sys.stderr.write(f"  Src Port: ({src_px}, {src_py}) -> Start Grid: {start_grid} -> Stub: {start_stub}\n")
-            if config.DEBUG: sys.stderr.write(f"  Dst Port: ({dst_px}, {dst_py}) -> Goal Grid: {goal_grid} -> Stub: {goal_stub}\n")
-
-            if path is None:
-                # Fallback: simple manhattan
-                mid_x = (start_stub[0] + goal_stub[0]) // 2
-                mid_x = (mid_x // self.grid_step) * self.grid_step
-                path = [start_stub, (mid_x, start_stub[1]), 
-                       (mid_x, goal_stub[1]), goal_stub]
-                if config.DEBUG: sys.stderr.write(f"  Path (Fallback): {path}\n")
+            # A manual route replaces the search for the middle section
+            # (copied: dragging a route edits the stored list in place)
+            conn_key = (src_inst.name, src_port.name, dst_inst.name, dst_port.name)
+            manual = self.manual_routes.get(conn_key)
+            keys.append(conn_key)
+            nets.append(Net((src_px, src_py), (dst_px, dst_py), src_port.signal_id,
+                            list(manual) if manual is not None else None))
+
+        if self._session_symbols is not self.symbols:
+            # Signal ids of another table mean other signals
+            self._session_symbols = self.symbols
+            self._symbols_epoch += 1
+        snapshot = RouteSnapshot(self._route_version, self.router_name, self.grid_step, self.steiner_routing,
+                                 self._symbols_epoch, tuple(keys), tuple(nets), tuple(obstacles),
+                                 (xmin, xmax, ymin, ymax))
+        if self.route_trace is not None:
+            self.route_trace.record(snapshot)
+        bounds = snapshot.bounds
+        if self.route_worker is not None:
+            routes, junctions, previews = self._submit_routes(snapshot)
+        else:
+            session = self.route_session
+            router = session.router
+            if (router is None or router.name != self.router_name or router.grid_step != self.grid_step
+                    or self._router_epoch != self._symbols_epoch):
+                if router is not None:
+                    router.close()
+                router = get_router(self.router_name, self.grid_step)
+                self._router_epoch = self._symbols_epoch
+            occupancy = OccupancyGrid(xmin, xmax, ymin, ymax, self.grid_step)
+            for rect in obstacles:
+                occupancy.block_rect(*rect)
+            if self.route_budget is None:
+                routes = session.route(router, keys, nets, occupancy, obstacles, bounds, trees=self.steiner_routing)
             else:
-                if config.DEBUG: sys.stderr.write(f"  Path (A*): {path}\n")
+                routes = session.begin(router, keys, nets, occupancy, obstacles, bounds, trees=self.steiner_routing)
+            junctions = session.wires.junctions() if not session.pending else []
+            previews = {i for i, key in enumerate(keys) if key not in session.records}
 
-            # Build a polyline with orthogonal connections at the ends.
-            # 1. Start at exact port location
-            full_pts = [(src_px, src_py)]
-            
-            # 2. Move horizontally to the start stub X (y matches port y for now)
-            full_pts.append((start_stub[0], src_py))
-            
-            # 3. Move vertically to start_stub Y (this connects to the A* path start)
-            #    If src_py is already on grid, this is redundant but harmless.
-            if src_py != start_stub[1]:
-                 full_pts.append(start_stub)
-            
-            # 4. The path itself (includes start_stub and goal_stub)
-            full_pts.extend(path)
-            
-            # 5. Move vertically from goal_stub Y to dst_py
-            if path[-1][1] != dst_py:
-                full_pts.append((path[-1][0], dst_py))
+        self.lines_meta.clear()
+        for (src_inst, src_port, dst_inst, dst_port), segments in zip(connections, routes):
+            if config.DEBUG: sys.stderr.write(f"DEBUG: signal={src_port.signal}, segments={segments}\n")
+            self.lines_meta.append((src_inst, src_port, dst_inst, dst_port, segments))
+        return junctions, previews
 
-            # 6. Move horizontally to destination port
-            full_pts.append((dst_px, dst_py))
-            
-            compressed = compress_polyline(full_pts)
+    def draw(self, routing: bool = True):
+        # Whatever changed, slices still queued would route the old layout
+        self._cancel_routing()
+        self.delete('all')
+        self.drawn_pin_positions.clear()
+        self.arrange_grid()
+
+        if self.grid_enabled:
+            self._draw_grid_background()
 
-            if config.DEBUG: sys.stderr.write(f"DEBUG: signal={src_port.signal}, compressed={compressed}\n")
-            sys.stderr.flush()
+        # Render order: Parent groups first (backgrounds), then children
+        # But _draw_instance_visual is recursive for expanded groups!
+        # So we only call it for top-level instances.
+        top_level = [i for i in self.instances if i.visible and not i.parent]
+        for inst in top_level:
+            self._draw_instance_visual(inst)
 
+        active_instances = self.get_active_instances()
+        blocks = self.get_blocks_for_occupancy(active_instances)
 
-            segments: List[Tuple[Tuple[int,int], Tuple[int,int]]] = []
-            for i in range(len(compressed) - 1):
-                segments.append((compressed[i], compressed[i+1]))
+                  
+        # Helper to draw pins - moved before routing check
+        # But we need xmin/xmax first.
+        # Determine bounding box
+        if blocks:
+            xmin = min(b[0] for b in blocks) - 200
+            xmax = max(b[0] + b[2] for b in blocks) + 200
+            ymin = min(b[1] for b in blocks)
+            ymax = max(b[1] + b[3] for b in blocks)
+        else:
+           xmin, xmax, ymin, ymax = 0, 1000, 0, 1000
 
-            self.lines_meta.append((src_inst, src_port, dst_inst, dst_port, segments))
-            
-            for i in range(len(full_pts) - 1):
-                p1 = full_pts[i]
-                p2 = full_pts[i+1]
-                self._mark_segment_occupancy(p1, p2, src_port.signal, wire_occupancy)
+        # Expand bounding box to include top pin positions
+        if self.top_pin_positions:
+            px_vals = [p[0] for p in self.top_pin_positions.values()]
+            py_vals = [p[1] for p in self.top_pin_positions.values()]
+            if px_vals:
+                xmin = min(xmin, min(px_vals) - 200)
+                xmax = max(xmax, max(px_vals) + 200)
+                ymin = min(ymin, min(py_vals) - 200)
+                ymax = max(ymax, max(py_vals) + 200)
+           
+        top_in_ports: List[Tuple[Port, int, int]] = []
+        top_out_ports: List[Tuple[Port, int, int]] = []
+        self.pin_hitboxes: Dict[str, Tuple[int, int, int, int]] = {}
+        
+        if self.show_top_level and self.top_level_pins:
+           # Height for pins
+           total_in = sum(1 for p in self.top_level_pins if p.direction == 'IN')
+           total_out = sum(1 for p in self.top_level_pins if p.direction == 'OUT' or p.direction == 'INOUT')
+           
+           height_in = total_in * 30
+           height_out = total_out * 30
+           
+           start_y_in = ymin + (ymax-ymin - height_in)//2
+           start_y_out = ymin + (ymax-ymin - height_out)//2
+           
+           # Draw In pins on left
+           curr_y = start_y_in
+           for p in self.top_level_pins:
+               if p.direction == 'IN':
+                   if p.name in self.top_pin_positions:
+                       px, py = self.top_pin_positions[p.name]
+                   else:
+                       px, py = xmin-40, curr_y
+                       curr_y += 40
+                   
+                   self._draw_pin_symbol(px, py, 'IN', p)
+                   top_in_ports.append((p, px, py))
+           
+           # Draw Out pins on right
+           curr_y = start_y_out
+           for p in self.top_level_pins:
+               if p.direction in ('OUT', 'INOUT'):
+                   if p.name in self.top_pin_positions:
+                       px, py = self.top_pin_positions[p.name]
+                   else:
+                       px, py = xmax+40, curr_y
+                       curr_y += 40
+                   
+                   direction = 'OUT' if p.direction == 'OUT' else 'INOUT'
+                   self._draw_pin_symbol(px, py, direction, p)
+                   top_out_ports.append((p, px, py))
 
-                self._mark_segment_occupancy(p1, p2, src_port.signal, wire_occupancy)
+        if not routing:
+            # Apply Zoom
+            if self.current_scale != 1.0:
+                self.scale('all', 0, 0, self.current_scale, self.current_scale)
+            self.update_scrollregion()
+            return
 
-        # Draw wires
-        for i, (src_inst, src_port, dst_inst, dst_port, segments) in enumerate(self.lines_meta):
-            key = (src_inst.name, src_port.name, dst_inst.name, dst_port.name)
-            is_selected = (self.selected_connection_key == key)
-            is_bus = (src_port.signal in self.bus_signals)
-            
-            # Base color
-            valid_signal = src_port.signal and src_port.signal != "???"
-            
-            color = 'black'
-            width = 1
-            
-            if src_port.signal in self.signals: color = '#4CAF50' # Green
-            elif src_port.signal in self.variables: color = '#9C27B0' # Purple
-            elif src_port.signal in self.constants: color = '#FF9800' # Orange
-            elif src_port in self.top_level_pins: color = '#4CAF50' # Top Level
-            else: color = '#607D8B' # Grey
-            
-            if not valid_signal:
-                 color = 'red'; width = 1
-            
-            if is_bus:
-                 width = 3
-            
-            if is_selected:
-                 color = '#2196F3' # Blue selection
-                 width = max(width, 2)
-                 
-            if self.highlight_connection == key or self.highlight_signal == src_port.signal:
-                 color = '#E91E63' # Pink highlight override
-                 width = max(width, 3)
+        connections = self._extract_connections(active_instances, top_in_ports, top_out_ports)
+        junctions, previews = self._route_connections(connections, blocks, top_in_ports, top_out_ports)
+        symbols = self.symbols
 
-            tag_id = f"conn:{i}"
-            for p1, p2 in segments:
-                self.create_line(p1[0], p1[1], p2[0], p2[1], fill=color, width=width, tags=(tag_id, "connection"))
-            
-            # Draw Bus Hash (Optional style)
-            if is_bus:
-                 # Draw a small slash on the middle segment?
-                 mid = len(segments) // 2
-                 if mid < len(segments):
-                     p1, p2 = segments[mid]
-                     mx, my = (p1[0]+p2[0])/2, (p1[1]+p2[1])/2
-                     self.create_line(mx-3, my-3, mx+3, my+3, fill=color, width=1, tags=(tag_id, "connection"))
+        # Per-signal styles, indexed by signal id
+        kind_colors, bus_flags = self._signal_styles()
+        highlight_id = symbols.get(self.highlight_signal) if self.highlight_signal else -1
+
+        # Draw wires
+        for i in range(len(self.lines_meta)):
+            self._draw_connection(i, kind_colors, bus_flags, highlight_id, i in previews)
 
         # Draw signal names based on toggle
         if self.highlight_signal:
             all_segments = []
             for src_inst, src_port, dst_inst, dst_port, segments in self.lines_meta:
-                if src_port.signal == self.highlight_signal:
+                if src_port.signal_id == highlight_id:
                     all_segments.extend(segments)
             
             if all_segments:
@@ -1936,23 +1842,16 @@ class DiagramCanvas(tk.Canvas):
                 self.create_text(label_x, label_y, text=self.highlight_signal, fill='black', font=('Arial', 10, 'bold'))
 
         elif self.show_signal_names:
-            drawn_signals = set()
+            drawn_signals = bytearray(len(symbols))
             for src_inst, src_port, dst_inst, dst_port, segments in self.lines_meta:
-                if src_port.signal not in drawn_signals and segments:
-                    drawn_signals.add(src_port.signal)
+                if not drawn_signals[src_port.signal_id] and segments:
+                    drawn_signals[src_port.signal_id] = 1
                     mid_idx = len(segments) // 2
                     (x1, y1), (x2, y2) = segments[mid_idx]
                     label_x = (x1 + x2) / 2
                     label_y = (y1 + y2) / 2 - 12
                     
-                    if src_port.signal in self.signals:
-                        bg_color = '#4CAF50'
-                    elif src_port.signal in self.variables:
-                        bg_color = '#9C27B0'
-                    elif src_port.signal in self.constants:
-                        bg_color = '#FF9800'
-                    else:
-                        bg_color = '#607D8B'
+                    bg_color = kind_colors[src_port.signal_id] or '#607D8B'
                     
                     text = src_port.signal
                     if len(text) > 15:
@@ -1966,13 +1865,157 @@ class DiagramCanvas(tk.Canvas):
                     self.create_text(label_x, label_y, text=text,                                    font=('Arial', 7, 'bold'), fill='white', tags='signal_label')
         
         # Draw Junctions
-        self._draw_junctions(wire_occupancy)
+        self._draw_junctions(junctions, kind_colors)
 
         # Apply Zoom
         if self.current_scale != 1.0:
             self.scale('all', 0, 0, self.current_scale, self.current_scale)
             
         self.update_scrollregion()
+        if self.route_session.pending:
+            self._route_job = self.after_idle(self._route_slice)
+
+    def _draw_connection(self, i: int, kind_colors: List[Optional[str]], bus_flags: bytearray,
+                         highlight_id: int, preview: bool = False):
+        """Draw connection i of lines_meta; previews (not routed yet) are dashed."""
+        src_inst, src_port, dst_inst, dst_port, segments = self.lines_meta[i]
+        key = (src_inst.name, src_port.name, dst_inst.name, dst_port.name)
+        sig = src_port.signal_id
+        is_selected = (self.selected_connection_key == key)
+        is_bus = bus_flags[sig]
+
+        # Base color
+        valid_signal = src_port.signal and src_port.signal != "???"
+
+        color = kind_colors[sig]
+        width = 1
+
+        if color is None:
+            if src_port in self.top_level_pins: color = '#4CAF50' # Top Level
+            else: color = '#607D8B' # Grey
+
+        if not valid_signal:
+             color = 'red'; width = 1
+
+        if is_bus:
+             width = 3
+
+        if is_selected:
+             color = '#2196F3' # Blue selection
+             width = max(width, 2)
+
+        if self.highlight_connection == key or highlight_id == sig:
+             color = '#E91E63' # Pink highlight override
+             width = max(width, 3)
+
+        tag_id = f"conn:{i}"
+        dash = (4, 4) if preview else ''
+        for p1, p2 in segments:
+            self.create_line(p1[0], p1[1], p2[0], p2[1], fill=color, width=width, dash=dash,
+                             tags=(tag_id, "connection"))
+
+        # Draw Bus Hash (Optional style)
+        if is_bus:
+             # Draw a small slash on the middle segment?
+             mid = len(segments) // 2
+             if mid < len(segments):
+                 p1, p2 = segments[mid]
+                 mx, my = (p1[0]+p2[0])/2, (p1[1]+p2[1])/2
+                 self.create_line(mx-3, my-3, mx+3, my+3, fill=color, width=1, tags=(tag_id, "connection"))
+
+    def _submit_routes(self, snapshot: RouteSnapshot
+                       ) -> Tuple[List[List], List[Tuple[Tuple[int, int], int]], Set[int]]:
+        """Hand the nets to the route worker unless its last result already fits.
+
+        Returns routes, junctions and preview indices as _route_connections()
+        does. Until the result is back, unchanged nets keep the route they
+        were last shown with and the others get a Manhattan preview.
+        """
+        result = self._route_result
+        if result is not None and snapshot.same_job(self._submitted) and result.version == self._submitted.version:
+            return result.routes, result.junctions, set()
+        if not snapshot.same_job(self._submitted):
+            self._route_version += 1
+            self._submitted = snapshot._replace(version=self._route_version)
+            self.route_worker.submit(self._submitted)
+        if self._route_poll is None:
+            self._route_poll = self.after(config.ROUTE_POLL_MS, self._poll_routes)
+
+        router = get_router('manhattan', self.grid_step)
+        routes = []
+        previews = set()
+        for i, (key, net) in enumerate(zip(snapshot.keys, snapshot.nets)):
+            shown = self._shown_routes.get(key)
+            if shown is not None and shown[0] == net:
+                routes.append(shown[1])
+                continue
+            start_stub, goal_stub = router.stubs(net)
+            path = net.path if net.path is not None else router.manhattan(start_stub, goal_stub)
+            routes.append(router.segments(router.full_points(net, start_stub, path)))
+            previews.add(i)
+        return routes, [], previews
+
+    def _poll_routes(self):
+        """Apply the worker's result for the current snapshot; older ones are stale."""
+        self._route_poll = None
+        result = self.route_worker.poll()
+        if result is None or result.version != self._route_version:
+            self._route_poll = self.after(config.ROUTE_POLL_MS, self._poll_routes)
+            return
+        if result.error is not None:
+            # The previews stay on screen; the next draw() submits again
+            self._submitted = None
+            if config.DEBUG:
+                sys.stderr.write(f"DEBUG: routing failed: {result.error!r}\n")
+            if self.on_status:
+                self.on_status(f"Routing failed: {result.error}")
+            return
+        self._route_result = result
+        snapshot = self._submitted
+        self._shown_routes = {key: (net, segments)
+                              for key, net, segments in zip(snapshot.keys, snapshot.nets, result.routes)}
+        self.draw()
+
+    def _cancel_routing(self):
+        if self._route_job is not None:
+            self.after_cancel(self._route_job)
+            self._route_job = None
+
+    def destroy(self):
+        # Stop the route worker with the window, and close the trace
+        self._cancel_routing()
+        if self._route_poll is not None:
+            self.after_cancel(self._route_poll)
+            self._route_poll = None
+        if self.route_worker is not None:
+            self.route_worker.stop()
+            self.route_worker = None
+        if self.route_trace is not None:
+            self.route_trace.close()
+        super().destroy()
+
+    def _route_slice(self):
+        """Route for one frame budget, replacing previews net by net.
+
+        Once every net is routed, one more draw() lays out the labels and
+        junctions for the final routes, with nothing left to route.
+        """
+        self._route_job = None
+        session = self.route_session
+        done = session.step(self.route_budget)
+        if not session.pending:
+            self.draw()
+            return
+        kind_colors, bus_flags = self._signal_styles()
+        highlight_id = self.symbols.get(self.highlight_signal) if self.highlight_signal else -1
+        for i in done:
+            self.lines_meta[i] = self.lines_meta[i][:4] + (session.routes[i],)
+            tag_id = f"conn:{i}"
+            self.delete(tag_id)
+            self._draw_connection(i, kind_colors, bus_flags, highlight_id)
+            if self.current_scale != 1.0:
+                self.scale(tag_id, 0, 0, self.current_scale, self.current_scale)
+        self._route_job = self.after_idle(self._route_slice)
 
     def update_scrollregion(self):
         bbox = self.bbox('all')
@@ -2781,37 +2824,37 @@ class DiagramCanvas(tk.Canvas):
                          menu.tk_popup(event.x_root, event.y_root)
                          return
 
-    def _draw_junctions(self, wire_occupancy: Dict[Tuple[int,int], Set[str]]):
-        """Draw dots at T-junctions."""
-        step = self.grid_step
-        
-        # Invert map: Signal -> Points
-        signal_points: Dict[str, Set[Tuple[int,int]]] = {}
-        for pt, signals in wire_occupancy.items():
-            for sig in signals:
-                if sig not in signal_points: signal_points[sig] = set()
-                signal_points[sig].add(pt)
-                
-        for sig, points in signal_points.items():
-            if not sig or sig == "???": continue
-            
-            for (x, y) in points:
-                # Check neighbors
-                neighbors = 0
-                if (x + step, y) in points: neighbors += 1
-                if (x - step, y) in points: neighbors += 1
-                if (x, y + step) in points: neighbors += 1
-                if (x, y - step) in points: neighbors += 1
-                
-                if neighbors > 2:
-                    # Draw Dot
-                    r = 4
-                    color = 'black'
-                    if sig in self.signals: color = '#4CAF50'
-                    elif sig in self.variables: color = '#9C27B0'
-                    elif sig in self.constants: color = '#FF9800'
-                    
-                    self.create_oval(x-r, y-r, x+r, y+r, fill=color, outline=color)
+    def _signal_styles(self) -> Tuple[List[Optional[str]], bytearray]:
+        """Wire color by declaration kind and bus flag, indexed by signal id.
+
+        The color is None for names that are not declared signals, variables
+        or constants.
+        """
+        colors: List[Optional[str]] = [None] * len(self.symbols)
+        ids = self.symbols.ids
+        # Later tables win, matching the signals > variables > constants precedence
+        for table, color in ((self.constants, '#FF9800'), (self.variables, '#9C27B0'),
+                             (self.signals, '#4CAF50')):
+            for name in table:
+                i = ids.get(name)
+                if i is not None:
+                    colors[i] = color
+        bus = bytearray(len(self.symbols))
+        for name in self.bus_signals:
+            i = ids.get(name)
+            if i is not None:
+                bus[i] = 1
+        return colors, bus
+
+    def _draw_junctions(self, junctions: List[Tuple[Tuple[int, int], int]],
+                        kind_colors: List[Optional[str]]):
+        """Draw dots at T-junctions, given as WireMap.junctions() lists them."""
+        names = self.symbols.strings
+        r = 4
+        for (x, y), sig in junctions:
+            if not names[sig] or names[sig] == "???": continue
+            color = kind_colors[sig] or 'black'
+            self.create_oval(x-r, y-r, x+r, y+r, fill=color, outline=color)
 
     def toggle_bus_style_selection(self):
         """Toggle bus style for the currently selected connection's signal."""
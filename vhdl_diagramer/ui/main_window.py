@@ -9,14 +9,21 @@ import math
 
 from tkinter import filedialog, messagebox
 
-from typing import List, Dict, Tuple, Optional, Set
+from typing import Any, Callable, List, Dict, Tuple, Optional, Set
 
 from ..models import Instance, Port
+from ..cache import ParseCache
+from ..tasks import BackgroundTask
 from ..parser import VHDLParser
+from ..netlist import import_netlist
+from ..project import EntityLibrary, load_project, parse_entities
+from ..watcher import FileWatcher
 
-from ..config import GRID_OPTIONS, DEFAULT_GRID_LABEL, SIGNAL_PANEL_WIDTH, MIN_BLOCK_WIDTH, MIN_BLOCK_HEIGHT, GRID_STEP
+from ..config import GRID_OPTIONS, DEFAULT_GRID_LABEL, SIGNAL_PANEL_WIDTH, MIN_BLOCK_WIDTH, MIN_BLOCK_HEIGHT, GRID_STEP, NETLIST_DRAW_LIMIT
+from ..config import WATCH_INTERVAL, WATCH_DEBOUNCE, WATCH_STATS_PER_TICK, ROUTER_BACKEND, STEINER_ROUTING
+from ..routing import ROUTERS
 
-from vhdl_diagramer.utils import compress_polyline
+from vhdl_diagramer.utils import carry_over_groups, compress_polyline
 
 
 
@@ -24,6 +31,7 @@ from .diagram_canvas import DiagramCanvas
 from .inspector_panel import InspectorPanel
 
 RECENT_FILES_FILE = os.path.expanduser("~/.vhdl_diagrammer_config.json")
+TASK_POLL_MS = 50
 
 class VHDLDiagramApp:
     def __init__(self, root):
@@ -34,6 +42,13 @@ class VHDLDiagramApp:
         self.signals: Dict[str, str] = {}
         self.variables: Dict[str, str] = {}
         self.constants: Dict[str, str] = {}
+        self.parse_cache = ParseCache()
+        self.parser: Optional[VHDLParser] = None  # last parse, for incremental reparsing
+        self.current_path: Optional[str] = None
+        self.pasted_text = ''
+        self.entity_library: Optional[EntityLibrary] = None
+        # Directions declared in the loaded file; these beat the project library.
+        self.port_modes: Dict[str, Dict[str, str]] = {}
 
         self.root.bind('f', lambda e: self.canvas.zoom_to_fit())
         self.root.bind('F', lambda e: self.canvas.zoom_to_fit())
@@ -46,6 +61,8 @@ class VHDLDiagramApp:
         
         file_menu = tk.Menu(self.menubar, tearoff=0)
         file_menu.add_command(label="Load VHDL File", command=self.load_file)
+        file_menu.add_command(label="Load VHDL Project", command=self.load_project_dir)
+        file_menu.add_command(label="Import Netlist", command=self.import_netlist_file)
         file_menu.add_command(label="Save Schematic", command=self.save_schematic)
         file_menu.add_command(label="Load Schematic", command=self.load_schematic)
         file_menu.add_separator()
@@ -58,6 +75,12 @@ class VHDLDiagramApp:
 
         file_menu.add_command(label="Parse Text", command=self.parse_text)
         file_menu.add_separator()
+        self.watch_var = tk.BooleanVar(value=False)
+        self.watcher: Optional[FileWatcher] = None
+        self._changed_paths: Set[str] = set()  # reloads waiting for the running task
+        file_menu.add_checkbutton(label="Watch for Changes", onvalue=True, offvalue=False,
+                                  variable=self.watch_var, command=self.toggle_watch)
+        file_menu.add_separator()
         file_menu.add_command(label="Exit", command=root.quit)
         self.menubar.add_cascade(label="File", menu=file_menu)
         
@@ -75,6 +98,16 @@ class VHDLDiagramApp:
         wire_menu = tk.Menu(self.menubar, tearoff=0)
         wire_menu.add_command(label="Toggle Bus Style", command=lambda: self.canvas.toggle_bus_style_selection())
         wire_menu.add_command(label="Delete Connection", command=lambda: self.canvas.delete_selected_connection())
+        wire_menu.add_separator()
+        router_menu = tk.Menu(wire_menu, tearoff=0)
+        self.router_var = tk.StringVar(value=ROUTER_BACKEND)
+        for name in ROUTERS:
+            router_menu.add_radiobutton(label=name, value=name, variable=self.router_var,
+                                        command=lambda: self.on_router_change(self.router_var.get()))
+        wire_menu.add_cascade(label="Router", menu=router_menu)
+        self.steiner_var = tk.BooleanVar(value=STEINER_ROUTING)
+        wire_menu.add_checkbutton(label="Route Signals as Trees", onvalue=True, offvalue=False,
+                                  variable=self.steiner_var, command=self.toggle_steiner)
         self.menubar.add_cascade(label="Wire", menu=wire_menu)
         
         # View Menu
@@ -154,6 +187,7 @@ class VHDLDiagramApp:
         self.canvas = DiagramCanvas(canvas_frame, [], {}, {}, {}, [], [], 
                                    on_update=lambda: self.inspector.refresh(),
                                    on_selection_change=self.update_status,
+                                   on_status=self.update_status,
                                    bg='white', cursor='hand2')
         self.canvas.pack(fill=tk.BOTH, expand=True)
 
@@ -164,6 +198,10 @@ class VHDLDiagramApp:
         self.status_bar = tk.Label(self.root, textvariable=self.status_bar_path, 
                                  bd=1, relief=tk.SUNKEN, anchor=tk.W, font=('Arial', 9))
         self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
+        # Shown inside the status bar while a background task runs
+        self.cancel_btn = tk.Button(self.status_bar, text='Cancel', command=self.cancel_task,
+                                    font=('Arial', 8), padx=6, pady=0)
+        self.task: Optional[BackgroundTask] = None
 
     def update_status(self, message: str):
         self.status_bar_path.set(message)
@@ -182,28 +220,183 @@ class VHDLDiagramApp:
         if choice in GRID_OPTIONS:
             self.canvas.set_grid_label(choice)
 
+    def on_router_change(self, name):
+        if name in ROUTERS:
+            self.canvas.router_name = name
+            self.canvas.draw()
+
+    def toggle_steiner(self):
+        self.canvas.steiner_routing = self.steiner_var.get()
+        self.canvas.draw()
+
     def toggle_inspector(self):
         if self.show_inspector_var.get():
             self.inspector.pack(side=tk.RIGHT, fill=tk.BOTH, padx=(6, 0))
         else:
             self.inspector.pack_forget()
 
+    def toggle_watch(self):
+        """Start or stop following external edits of the open file and project."""
+        if self.watch_var.get():
+            if self.watcher is None:
+                self.watcher = FileWatcher(self.watched_paths(), interval=WATCH_INTERVAL,
+                                           debounce=WATCH_DEBOUNCE,
+                                           stats_per_tick=WATCH_STATS_PER_TICK).start()
+                self.root.after(TASK_POLL_MS, self._poll_watcher)
+        elif self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+            self._changed_paths.clear()
+
+    def watched_paths(self) -> List[str]:
+        paths = [self.current_path] if self.current_path else []
+        if self.entity_library is not None:
+            paths.extend(self.entity_library.files)
+        return paths
+
+    def _update_watch_paths(self):
+        if self.watcher is not None:
+            self.watcher.set_paths(self.watched_paths())
+
+    def _poll_watcher(self):
+        if self.watcher is None:
+            return
+        self._changed_paths.update(self.watcher.poll())
+        # A reload would cancel the running task (a load or parse the user
+        # started); wait for it to finish instead
+        if self._changed_paths and self.task is None:
+            changed = sorted(self._changed_paths)
+            self._changed_paths.clear()
+            self.reload_changed(changed)
+        self.root.after(TASK_POLL_MS, self._poll_watcher)
+
+    def reload_changed(self, paths: List[str]):
+        """Re-read changed files: project files update the library, and the open
+        file is reparsed incrementally (through the parse cache).
+        """
+        current = self.current_path if self.current_path in paths else None
+        library_files = [p for p in paths if p != current and self.entity_library is not None]
+        if current is None and not library_files:
+            return
+        previous = self.parser
+
+        def work(report):
+            decls = []
+            for i, path in enumerate(library_files):
+                report('Reloading project files', i / len(library_files))
+                decls.append(parse_entities(path))
+            parser = None
+            if current is not None:
+                with open(current, 'r', encoding='utf-8', errors='ignore') as f:
+                    text = f.read()
+                parser = self.parse_cache.parse(text, lambda stage, fraction: report(f'Reloading: {stage}', fraction))
+            return decls, parser
+
+        def finish(result):
+            decls, parser = result
+            for path, file_decls, error in decls:
+                self.entity_library.replace_file(path, file_decls, error)
+            if parser is not None:
+                # Binds the ports of instances on the canvas: Tk thread only
+                parser.adopt_unchanged(previous)
+                self.show_parse(parser, previous, quiet=True)
+                return
+            if self.instances:
+                self.entity_library.apply_directions(self.instances, skip=self.port_modes)
+                self.canvas.draw()
+            self.update_status('Reloaded ' + ', '.join(os.path.basename(p) for p in paths))
+
+        self.run_task(work, finish, 'Reloading')
+
     def load_file(self):
         file_path = filedialog.askopenfilename(filetypes=[('VHDL files', '*.vhdl *.vhd'), ('All files', '*.*')])
         if file_path:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                text = f.read()
-            self.parse_vhdl(text)
-            
-            # Update Recent Files
-            if file_path in self.recent_files:
-                self.recent_files.remove(file_path)
-            self.recent_files.insert(0, file_path)
-            # Keep only last 10
-            if len(self.recent_files) > 10:
-                self.recent_files = self.recent_files[:10]
-            self.save_recent_files()
-            self.update_recent_menu()
+            self.load_path(file_path)
+
+    def load_path(self, file_path: str):
+        """Read, parse and show a VHDL file, then move it to the top of the recent list."""
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+            text = f.read()
+        # Reloading the file on screen keeps the instances that did not change.
+        def loaded():
+            self.current_path = file_path
+            self._update_watch_paths()
+        self.parse_vhdl(text, incremental=(file_path == self.current_path), on_done=loaded)
+
+        # Update Recent Files
+        if file_path in self.recent_files:
+            self.recent_files.remove(file_path)
+        self.recent_files.insert(0, file_path)
+        # Keep only last 10
+        if len(self.recent_files) > 10:
+            self.recent_files = self.recent_files[:10]
+        self.save_recent_files()
+        self.update_recent_menu()
+
+    def load_project_dir(self):
+        """Parse every VHDL file under a directory into the entity library.
+
+        Instances in diagrams loaded afterwards take their port directions
+        from the library instead of guessing them from port names.
+        """
+        directory = filedialog.askdirectory(title='Select VHDL Project Directory')
+        if not directory:
+            return
+        def work(report):
+            return load_project([directory],
+                                progress=lambda done, total: report('Parsing project', done / max(total, 1)))
+
+        def finish(library):
+            self.entity_library = library
+            self._update_watch_paths()
+            if self.instances:
+                library.apply_directions(self.instances, skip=self.port_modes)
+                self.canvas.draw()
+            msg = f"Project: {len(library)} entities from {len(library.files)} files"
+            if library.errors:
+                msg += f", {len(library.errors)} files failed"
+            self.update_status(msg)
+
+        self.run_task(work, finish, 'Parsing project')
+
+    def import_netlist_file(self):
+        """Stream a (post-synthesis) netlist into a compact store and show it.
+
+        Small netlists are drawn like a parsed file; large ones are only
+        summarized by cell type, since drawing them would not be readable.
+        """
+        file_path = filedialog.askopenfilename(filetypes=[('VHDL files', '*.vhdl *.vhd'), ('All files', '*.*')])
+        if not file_path:
+            return
+        port_modes = {}
+        if self.entity_library is not None:
+            port_modes = {key: self.entity_library.port_modes(key) for key in self.entity_library.entities}
+        self.run_task(lambda report: import_netlist(
+                          file_path, port_modes,
+                          progress=lambda count: report(f'Importing netlist: {count} instances')),
+                      lambda store: self.show_netlist(store, port_modes), 'Importing netlist')
+
+    def show_netlist(self, store, port_modes: Dict[str, Dict[str, str]]):
+        self.update_status(f"Netlist: {len(store)} instances, {len(store.pool)} distinct names")
+        if len(store) > NETLIST_DRAW_LIMIT:
+            counts = sorted(store.entity_counts().items(), key=lambda kv: -kv[1])
+            lines = [f"{entity}: {count}" for entity, count in counts[:20]]
+            messagebox.showinfo('Netlist Imported',
+                                f'{len(store)} instances (too many to draw, limit {NETLIST_DRAW_LIMIT}).\n\n'
+                                + '\n'.join(lines))
+            return
+        self.instances = store.instances()
+        self.signals, self.variables, self.constants = {}, {}, {}
+        self.port_modes = port_modes
+        self.canvas.symbols = store.pool
+        self.canvas.instances = self.instances
+        self.canvas.signals = self.signals
+        self.canvas.variables = self.variables
+        self.canvas.constants = self.constants
+        self.canvas.top_level_pins = []
+        self.canvas.assignments = []
+        self.canvas.draw()
+        self.inspector.refresh()
 
     def parse_text(self):
         tw = tk.Toplevel(self.root)
@@ -213,30 +406,84 @@ class VHDLDiagramApp:
         frame.pack(fill=tk.BOTH, expand=True, padx=6, pady=6)
         txt = tk.Text(frame, font=('Courier', 10))
         txt.pack(fill=tk.BOTH, expand=True)
+        # Reopen with the last pasted code so edits reparse incrementally.
+        txt.insert('1.0', self.pasted_text)
         def do_parse():
-            vhdl_text = txt.get('1.0', tk.END)
-            self.parse_vhdl(vhdl_text)
+            vhdl_text = txt.get('1.0', 'end-1c')
+            def parsed():
+                self.pasted_text = vhdl_text
+                self.current_path = None
+                self._update_watch_paths()
+            # Pasted code changes on every edit; keep it out of the disk cache.
+            self.parse_vhdl(vhdl_text, incremental=self.current_path is None, use_cache=False,
+                            on_done=parsed)
             tw.destroy()
         tk.Button(tw, text='Parse', command=do_parse, bg='#4CAF50', fg='white', padx=18, pady=6).pack(pady=6)
 
-    def parse_vhdl(self, vhdl_text: str):
-        parser = VHDLParser(vhdl_text)
-        parser.parse()
-        self.instances = parser.instances
+    def parse_vhdl(self, vhdl_text: str, incremental: bool = False, use_cache: bool = True,
+                   on_done: Optional[Callable[[], None]] = None):
+        """Parse VHDL on a worker thread, then show it.
+
+        With `incremental`, Instance objects of the previous parse are kept
+        for statements that did not change, so their position, styling and
+        grouping survive; only new or edited instances are laid out afresh.
+        The canvas is only touched once the parse has finished, so cancelling
+        leaves the current diagram as it was: the worker interns into a copy
+        of the symbol table the canvas draws with, and ports of the instances
+        on screen are only rebound by adopt_unchanged() in finish().
+        """
+        previous = self.parser if incremental else None
+        symbols = previous.symbols.copy() if previous is not None else None
+
+        def work(report):
+            def progress(stage, fraction):
+                report(f'Parsing: {stage}', fraction)
+            if use_cache:
+                return self.parse_cache.parse(vhdl_text, progress)
+            parser = VHDLParser(vhdl_text, previous=previous, symbols=symbols)
+            parser.parse(progress)
+            return parser
+
+        def finish(parser):
+            if use_cache:
+                parser.adopt_unchanged(previous)
+            self.show_parse(parser, previous)
+            if on_done is not None:
+                on_done()
+
+        self.run_task(work, finish, 'Parsing')
+
+    def show_parse(self, parser: VHDLParser, previous: Optional[VHDLParser] = None, quiet: bool = False):
+        """Put a finished parse on the canvas. Runs on the Tk thread.
+
+        `quiet` reports in the status bar instead of dialogs (live reloads).
+        """
+        self.parser = parser
+        old_instances = self.canvas.instances if previous is not None else []
+        self.instances = carry_over_groups(old_instances, parser.instances)
         self.signals = parser.signals
         self.variables = parser.variables
         self.constants = parser.constants
+        self.port_modes = parser.port_modes
+        if self.entity_library is not None:
+            self.entity_library.apply_directions(self.instances, skip=self.port_modes)
         
         if not self.instances:
-            messagebox.showwarning('No Instances', 'No instances found in the VHDL code.')
+            if quiet:
+                self.update_status('No instances found in the VHDL code.')
+            else:
+                messagebox.showwarning('No Instances', 'No instances found in the VHDL code.')
             return
         
+        self.canvas.symbols = parser.symbols
         self.canvas.instances = self.instances
         self.canvas.signals = self.signals
         self.canvas.variables = self.variables
         self.canvas.constants = self.constants
         self.canvas.top_level_pins = parser.top_level_ports
         self.canvas.assignments = parser.assignments
+        if parser.reused:
+            self.canvas.place_new_instances()
         self.canvas.draw()
         
         # Populate inspector logic
@@ -244,7 +491,53 @@ class VHDLDiagramApp:
         
         msg = f'Found {len(self.instances)} instances, {len(self.signals)} signals, '
         msg += f'{len(self.variables)} variables, {len(self.constants)} constants.'
-        messagebox.showinfo('Success', msg)
+        if parser.reused:
+            msg += f'\n{parser.reused} unchanged instances kept.'
+        if quiet:
+            self.update_status(msg.replace('\n', ' '))
+        else:
+            messagebox.showinfo('Success', msg)
+
+    def run_task(self, work: Callable, on_done: Callable[[Any], None], name: str):
+        """Run work(report) on a worker thread and hand its result to on_done on the Tk thread.
+
+        A task that is still running is cancelled first; its result is dropped.
+        """
+        if self.task is not None:
+            self.task.cancel()
+        self.task = BackgroundTask(work, name).start()
+        self.update_status(f'{name}...')
+        self.cancel_btn.pack(side=tk.RIGHT)
+        self.root.after(TASK_POLL_MS, self._poll_task, self.task, on_done)
+
+    def cancel_task(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.update_status(f'Cancelling {self.task.name.lower()}...')
+
+    def _poll_task(self, task: BackgroundTask, on_done: Callable[[Any], None]):
+        if task is not self.task:
+            return  # superseded by a newer task
+        reports = task.poll()
+        if reports and not task.done:
+            message, fraction = reports[-1]
+            if fraction is not None:
+                message += f' {fraction:.0%}'
+            self.update_status(message)
+        if not task.done:
+            self.root.after(TASK_POLL_MS, self._poll_task, task, on_done)
+            return
+
+        self.task = None
+        self.cancel_btn.pack_forget()
+        if task.cancelled:
+            self.update_status(f'{task.name} cancelled')
+        elif task.error is not None:
+            self.update_status(f'{task.name} failed')
+            messagebox.showerror('Error', f'{task.name} failed:\n{task.error}')
+        else:
+            self.update_status(f'{task.name} done')
+            on_done(task.result)
 
     def load_recent_files(self):
         self.recent_files = []
@@ -270,16 +563,7 @@ class VHDLDiagramApp:
         for file_path in self.recent_files:
             def load_this(path=file_path):
                 try:
-                    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
-                        text = f.read()
-                    self.parse_vhdl(text)
-                    
-                    # Move to top
-                    if path in self.recent_files:
-                        self.recent_files.remove(path)
-                    self.recent_files.insert(0, path)
-                    self.save_recent_files()
-                    self.update_recent_menu()
+                    self.load_path(path)
                 except Exception as e:
                     messagebox.showerror("Error", f"Could not load file: {path}\n{e}")
                     
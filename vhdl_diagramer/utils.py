@@ -4,6 +4,8 @@
 
 from typing import List, Tuple
 
+from .models import Instance
+
 def compress_polyline(points: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
     """Remove collinear points from a polyline, ensuring only horizontal and vertical lines."""
     if not points:
@@ -28,4 +30,28 @@ def compress_polyline(points: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
             if p != out[-1]:
                 out.append(p)
     
-    return out
\ No newline at end of file
+    return out
+
+def carry_over_groups(old_instances: List[Instance], new_instances: List[Instance]) -> List[Instance]:
+    """Rebuild the canvas instance tree after an incremental reparse.
+
+    `old_instances` is the previous top-level list (groups hold their
+    children, which are not listed on their own); `new_instances` is the flat
+    parse result, in which unchanged instances are the same objects as
+    before. Groups that still have a surviving member are kept with the
+    members that disappeared dropped; everything else is top level.
+    """
+    alive = set(map(id, new_instances))
+    grouped = set()
+
+    def prune(group: Instance) -> bool:
+        group.children = [c for c in group.children
+                          if (prune(c) if c.is_group else id(c) in alive)]
+        grouped.update(map(id, group.children))
+        return bool(group.children)
+
+    groups = [g for g in old_instances if g.is_group and prune(g)]
+    result = [i for i in new_instances if id(i) not in grouped]
+    for inst in result:
+        inst.parent = None
+    return result + groups
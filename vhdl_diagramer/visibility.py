@@ -0,0 +1,154 @@
+# ============================================================================
+# visibility.py - Line-probe routing on a sparse orthogonal visibility graph
+# ============================================================================
+
+import bisect
+import heapq
+import math
+
+from itertools import compress
+from typing import Dict, List, Optional, Tuple
+
+from .routing import OccupancyGrid, Router, register_router
+
+
+def _lines(bounds: List[Tuple[int, int]], size: int) -> List[int]:
+    """Free lines just outside each (lo, hi) range, plus channel centres."""
+    lines = sorted({i for lo, hi in bounds for i in (lo - 1, hi + 1) if 0 <= i < size})
+    centres = {(a + b) // 2 for a, b in zip(lines, lines[1:]) if b - a > 1}
+    return sorted(centres.union(lines))
+
+
+def _with(lines: List[int], *extra: int) -> List[int]:
+    lines = list(lines)
+    for i in extra:
+        j = bisect.bisect_left(lines, i)
+        if j == len(lines) or lines[j] != i:
+            lines.insert(j, i)
+    return lines
+
+
+@register_router
+class VisibilityRouter(Router):
+    """A* on a sparse orthogonal visibility graph, Hightower line-probe style.
+
+    Rather than every grid cell, the search visits the crossings of a few
+    lines: the free columns and rows just outside each obstacle rectangle
+    (OccupancyGrid.rects), the centre lines of the channels between them,
+    and the lines through the two ends. From a node it probes along its
+    row or column to the next line in each direction, so one move crosses
+    a whole stretch of free space. Around rectangles these lines hold a
+    shortest path, so routes are as direct as on the grid, while a search
+    touches tens of nodes where the grid search expands hundreds.
+
+    A move costs its length in grid steps plus `wire_penalty` per cell of
+    another signal's wire it runs over, and the heuristic is the Manhattan
+    distance in pixels, as in GridRouter. Paths are the corner and
+    line-crossing points, which the Router compresses into segments.
+    """
+
+    name = 'visibility'
+    wire_penalty = 500
+
+    def __init__(self, grid_step: int = 10):
+        super().__init__(grid_step)
+        self.expanded = 0
+        self.pushes = 0
+        self._grid: Optional[OccupancyGrid] = None
+        self._rects = 0
+        self._cols: List[int] = []
+        self._rows: List[int] = []
+
+    def lines(self, occupancy: OccupancyGrid) -> Tuple[List[int], List[int]]:
+        """Column and row indices of the graph's lines, cached per grid."""
+        if occupancy is not self._grid or len(occupancy.rects) != self._rects:
+            self._grid, self._rects = occupancy, len(occupancy.rects)
+            self._cols = _lines([(c0, c1) for c0, c1, _, _ in occupancy.rects], occupancy.cols)
+            self._rows = _lines([(r0, r1) for _, _, r0, r1 in occupancy.rects], occupancy.rows)
+        return self._cols, self._rows
+
+    def find_path(self, start, goal, occupancy, wire_occupancy, signal, xmin, xmax, ymin, ymax, limit=None):
+        s, t = occupancy.index(*start), occupancy.index(*goal)
+        if s < 0 or t < 0:
+            return None
+        step = occupancy.step
+        rows = occupancy.rows
+        c_lo = max(0, math.ceil((xmin - occupancy.xmin) / step))
+        c_hi = min(occupancy.cols - 1, math.floor((xmax - occupancy.xmin) / step))
+        r_lo = max(0, math.ceil((ymin - occupancy.ymin) / step))
+        r_hi = min(rows - 1, math.floor((ymax - occupancy.ymin) / step))
+        sc, sr = divmod(s, rows)
+        gc, gr = divmod(t, rows)
+        cols, lines = self.lines(occupancy)
+        cols = [c for c in _with(cols, sc, gc) if c_lo <= c <= c_hi]
+        lines = [r for r in _with(lines, sr, gr) if r_lo <= r <= r_hi]
+        if not cols or not lines:
+            return None
+
+        blocked = occupancy.cells
+        cover = wire_occupancy.cover if wire_occupancy is not None else None
+        if cover is not None:
+            wires_at, looked_up = wire_occupancy.at, wire_occupancy._at
+        penalty = self.wire_penalty
+        g_score: Dict[int, int] = {s: 0}
+        parent: Dict[int, int] = {s: -1}
+        closed = set()
+        heap = [((abs(sc - gc) + abs(sr - gr)) * step, 0, s)]
+        expanded = 0
+        pushes = 1
+        try:
+            while heap:
+                _, g, cur = heapq.heappop(heap)
+                if cur in closed:
+                    continue
+                if cur == t:
+                    path = [occupancy.cell(cur)]
+                    while parent[cur] >= 0:
+                        cur = parent[cur]
+                        path.append(occupancy.cell(cur))
+                    path.reverse()
+                    return path
+                if expanded == limit:
+                    return None
+                closed.add(cur)
+                expanded += 1
+                c, r = divmod(cur, rows)
+                i = bisect.bisect_left(cols, c)
+                j = bisect.bisect_left(lines, r)
+                moves = []
+                if i + 1 < len(cols):
+                    moves.append((cols[i + 1], r, rows))
+                if i > 0:
+                    moves.append((cols[i - 1], r, rows))
+                if j + 1 < len(lines):
+                    moves.append((c, lines[j + 1], 1))
+                if j > 0:
+                    moves.append((c, lines[j - 1], 1))
+                for nc, nr, stride in moves:
+                    nb = nc * rows + nr
+                    if nb in closed:
+                        continue
+                    # The probe: cells strictly between, then the target
+                    between = slice(cur + stride, nb, stride) if nb > cur else slice(nb + stride, cur, stride)
+                    if 1 in blocked[between] or (blocked[nb] and nb != t):
+                        continue
+                    move = abs(nb - cur) // stride
+                    if cover is not None:
+                        hits = cover[between]
+                        probed = [nb] if cover[nb] else []
+                        if hits.count(0) != len(hits):
+                            probed.extend(compress(range(between.start, between.stop, stride), hits))
+                        for k in probed:
+                            others = looked_up.get(k) or wires_at(k)
+                            if signal not in others:
+                                move += len(others) * penalty
+                    ng = g + move
+                    if ng < g_score.get(nb, ng + 1):
+                        g_score[nb] = ng
+                        parent[nb] = cur
+                        heapq.heappush(heap, (ng + (abs(nc - gc) + abs(nr - gr)) * step, ng, nb))
+                        pushes += 1
+            return None
+        finally:
+            self.expanded += expanded
+            self.pushes += pushes
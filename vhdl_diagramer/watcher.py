@@ -0,0 +1,135 @@
+# ============================================================================
+# watcher.py - Polling file watcher with debouncing
+# ============================================================================
+
+import os
+import queue
+import threading
+import time
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# (mtime_ns, size), or None while the file is missing
+Signature = Optional[Tuple[int, int]]
+
+
+def file_signature(path: str) -> Signature:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class FileWatcher:
+    """Watches files for changes by polling their mtime and size.
+
+    Every tick stats at most `stats_per_tick` files, walking the watch list
+    round-robin, so the polling cost per tick is flat however many files
+    are watched; with N files each one is looked at every N / stats_per_tick
+    ticks. Files that changed are re-checked ahead of the sweep until their
+    signature has been stable for `debounce` seconds (editors often write a
+    file in several steps), and only then reported. Polling runs on a
+    daemon thread; the UI collects settled changes with poll().
+    """
+
+    def __init__(self, paths: Iterable[str] = (), interval: float = 0.5,
+                 debounce: float = 0.3, stats_per_tick: int = 64):
+        self.interval = interval
+        self.debounce = debounce
+        self.stats_per_tick = stats_per_tick
+        self._lock = threading.Lock()
+        self._paths: List[str] = []
+        self._known: Dict[str, Signature] = {}
+        self._pending: Dict[str, Tuple[Signature, float]] = {}  # path -> (signature, last change)
+        self._cursor = 0
+        self._changes: "queue.Queue[str]" = queue.Queue()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.set_paths(paths)
+
+    @property
+    def paths(self) -> List[str]:
+        with self._lock:
+            return list(self._paths)
+
+    def set_paths(self, paths: Iterable[str]) -> None:
+        """Replace the watch list. Files already watched keep their state."""
+        paths = list(dict.fromkeys(paths))
+        with self._lock:
+            old = dict(self._known)
+        known = {path: old[path] if path in old else file_signature(path) for path in paths}
+        with self._lock:
+            self._paths = paths
+            self._known = known
+            self._pending = {p: v for p, v in self._pending.items() if p in known}
+            self._cursor = 0
+
+    def start(self) -> 'FileWatcher':
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='file-watcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.interval * 2 + 1)
+            self._thread = None
+
+    def poll(self) -> List[str]:
+        """Paths whose changes have settled since the last poll."""
+        changed = []
+        try:
+            while True:
+                path = self._changes.get_nowait()
+                if path not in changed:
+                    changed.append(path)
+        except queue.Empty:
+            return changed
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.tick()
+
+    def tick(self, now: Optional[float] = None) -> int:
+        """Run one polling step; returns the number of files stat'ed.
+
+        Files waiting to settle are re-checked first, then the rest of the
+        per-tick budget continues the round-robin sweep.
+        """
+        if now is None:
+            now = time.monotonic()
+        with self._lock:
+            pending = list(self._pending)[:self.stats_per_tick]
+            n = len(self._paths)
+            batch = min(n, self.stats_per_tick - len(pending))
+            sweep = [self._paths[(self._cursor + i) % n] for i in range(batch)]
+            self._cursor = (self._cursor + batch) % n if n else 0
+        for path in pending:
+            self._check_pending(path, file_signature(path), now)
+        checked = set(pending)
+        for path in sweep:
+            if path in checked:
+                continue
+            checked.add(path)
+            sig = file_signature(path)
+            with self._lock:
+                if path in self._known and path not in self._pending and sig != self._known[path]:
+                    self._pending[path] = (sig, now)
+        return len(checked)
+
+    def _check_pending(self, path: str, sig: Signature, now: float) -> None:
+        with self._lock:
+            if path not in self._pending:
+                return  # unwatched meanwhile
+            last_sig, changed_at = self._pending.pop(path)
+            if sig != last_sig:
+                self._pending[path] = (sig, now)
+            elif sig is not None and now - changed_at >= self.debounce:
+                self._known[path] = sig
+                self._changes.put(path)
+            else:
+                # Still settling (or missing): back of the queue
+                self._pending[path] = (last_sig, changed_at)